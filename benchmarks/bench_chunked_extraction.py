@@ -0,0 +1,100 @@
+"""Compare single-call and page-chunked extraction of a long quotation against a simulated model.
+
+The fake client answers after a latency proportional to the number of pages it
+was sent, which is how generation time scales for long item tables.
+
+Usage:
+    python -m benchmarks.bench_chunked_extraction [--pages 60] [--items-per-page 6] [--seconds-per-page 0.05]
+        [--concurrency 4]
+"""
+import argparse
+import asyncio
+import io
+import json
+import pathlib
+import sys
+import tempfile
+import time
+
+import pypdf
+
+from config.settings import GEMINI_MAX_CONCURRENCY
+from core.pdf_processor import PDFProcessor, HEADER_PROMPT
+from core.rate_limit import RateLimiter
+from benchmarks.fake_gemini import scratch_storage
+from benchmarks.synthetic import make_po_data
+
+# Blank page widths encode the page number so the fake model can tell which pages it was sent
+BASE_PAGE_WIDTH = 500
+
+def make_pdf(num_pages):
+    writer = pypdf.PdfWriter()
+    for page_number in range(num_pages):
+        writer.add_blank_page(width=BASE_PAGE_WIDTH + page_number, height=800)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+class FakeModels:
+    def __init__(self, po_data, items_per_page, seconds_per_page):
+        self.po_data = po_data
+        self.items_per_page = items_per_page
+        self.seconds_per_page = seconds_per_page
+
+    async def generate_content(self, model, contents, config):
+        part, prompt = contents
+        reader = pypdf.PdfReader(io.BytesIO(part.inline_data.data))
+        page_numbers = [int(page.mediabox.width) - BASE_PAGE_WIDTH for page in reader.pages]
+        await asyncio.sleep(self.seconds_per_page * len(page_numbers))
+
+        response = {k: v for k, v in self.po_data.items() if k not in ('items', 'gui_data')}
+        if prompt is not HEADER_PROMPT:
+            items = self.po_data['items']
+            response['items'] = [
+                item
+                for page_number in page_numbers
+                for item in items[page_number * self.items_per_page:(page_number + 1) * self.items_per_page]
+            ]
+        return type('Response', (), {'text': json.dumps(response)})()
+
+class FakeClient:
+    def __init__(self, models):
+        self.aio = type('Aio', (), {'models': models})()
+
+async def extract(processor, pdf_path, gui_data, chunked):
+    start_time = time.perf_counter()
+    extracted_data = await processor.extract_po_data_async(pdf_path, gui_data, use_cache=False, chunked=chunked)
+    return extracted_data, time.perf_counter() - start_time
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=60)
+    parser.add_argument('--items-per-page', type=int, default=6)
+    parser.add_argument('--seconds-per-page', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=GEMINI_MAX_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    po_data = make_po_data(args.pages * args.items_per_page)
+    models = FakeModels(po_data, args.items_per_page, args.seconds_per_page)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = PDFProcessor(client=FakeClient(models), rate_limiter=RateLimiter(6000, args.concurrency),
+                                 **scratch_storage(tmp))
+        pdf_path = pathlib.Path(tmp) / "quotation.pdf"
+        pdf_path.write_bytes(make_pdf(args.pages))
+        single, single_seconds = asyncio.run(extract(processor, pdf_path, po_data['gui_data'], False))
+        chunked, chunked_seconds = asyncio.run(extract(processor, pdf_path, po_data['gui_data'], True))
+
+    print()
+    print(f"Single call:    {single_seconds:.2f}s, {len(single['items'])} items")
+    print(f"Page-chunked:   {chunked_seconds:.2f}s, {len(chunked['items'])} items")
+    print(f"Speedup: {single_seconds / chunked_seconds:.2f}x")
+
+    if chunked['items'] != po_data['items'] or single['items'] != po_data['items']:
+        print("❌ Extracted items differ from the source quotation")
+        return 1
+    print("✅ Chunked items match the single-call extraction")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Compare re-rendering a PO from scratch with patching the header of the last render.
+
+Usage:
+    python -m benchmarks.bench_header_update [--runs 10] [--items 40]
+"""
+import argparse
+import io
+import statistics
+import sys
+import time
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from benchmarks.synthetic import make_po_data
+from benchmarks.bench_xml_renderer import workbook_differences
+
+def edited_gui_data(gui_data, run):
+    return dict(
+        gui_data,
+        po_number=f"P-250719-{run:03d}M",
+        project_name=f"Benchmark Project rev {run}",
+        po_issue_date=f"{run % 28 + 1:02d}/08/2025",
+        director_manager=f"Manager {run}",
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--items', type=int, default=40)
+    args = parser.parse_args(argv)
+
+    po_data = make_po_data(args.items)
+    metrics = MetricsLog(enabled=False)
+    generator = ExcelGenerator(metrics=metrics)
+    generator.generate_po_excel(po_data, output_path=io.BytesIO())
+
+    full_timings = []
+    patch_timings = []
+    for run in range(args.runs):
+        gui_data = edited_gui_data(po_data['gui_data'], run)
+
+        full_output = io.BytesIO()
+        start_time = time.perf_counter()
+        ExcelGenerator(metrics=metrics).generate_po_excel(po_data, output_path=full_output, gui_data=gui_data)
+        full_timings.append(time.perf_counter() - start_time)
+
+        patch_output = io.BytesIO()
+        start_time = time.perf_counter()
+        generator.update_header(gui_data, output_path=patch_output)
+        patch_timings.append(time.perf_counter() - start_time)
+
+        differences = workbook_differences(full_output.getvalue(), patch_output.getvalue())
+        if differences:
+            print(f"❌ Patched PO differs from a full render: {', '.join(differences[:10])}")
+            return 1
+
+    full_ms = statistics.median(full_timings) * 1000
+    patch_ms = statistics.median(patch_timings) * 1000
+    print()
+    print(f"Full re-render:  {full_ms:.1f} ms median over {args.runs} runs")
+    print(f"Header patch:    {patch_ms:.1f} ms median over {args.runs} runs")
+    print(f"Speedup: {full_ms / patch_ms:.2f}x")
+    print("✅ Patched POs match full renders")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
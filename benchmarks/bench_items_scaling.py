@@ -0,0 +1,37 @@
+"""Measure render time as the number of line items grows.
+
+Usage:
+    python -m benchmarks.bench_items_scaling [--sizes 10 100 1000 5000]
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from benchmarks.synthetic import make_po_data
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    args = parser.parse_args(argv)
+
+    generator = ExcelGenerator(metrics=MetricsLog(enabled=False))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = pathlib.Path(tmp)
+        # Warm the template pool so the first size is not penalised
+        generator.generate_po_excel(make_po_data(1), output_path=output_dir / "warmup.xlsx")
+        for num_items in args.sizes:
+            po_data = make_po_data(num_items)
+            start_time = time.perf_counter()
+            generator.generate_po_excel(po_data, output_path=output_dir / f"po_{num_items}.xlsx")
+            results.append((num_items, time.perf_counter() - start_time))
+
+    print(f"{'items':>8} {'render (s)':>12} {'ms/item':>10}")
+    for num_items, seconds in results:
+        print(f"{num_items:>8} {seconds:>12.3f} {seconds * 1000 / num_items:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Measure how much slimming shrinks a scanned quotation and how much upload time it saves.
+
+The quotation is synthetic: scanned pages of grey noise at --dpi with an
+unused embedded font, a blank page and a trailing terms and conditions
+appendix. The fake client takes the upload time of a --upload-mbps link on
+top of its response latency, so the saving is measured rather than estimated.
+
+Usage:
+    python -m benchmarks.bench_pdf_slimming [--scanned-pages 3] [--dpi 300] [--upload-mbps 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+import pypdf
+from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from core.pdf_slimmer import slim_pdf, _pillow_available
+from benchmarks.fake_gemini import make_fake_processor
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+# Light grey speckle, as on a scanned white page; noise keeps Flate from shrinking it
+SPECKLE = bytes(224 + index % 32 for index in range(256))
+UNUSED_FONT_BYTES = 400 * 1024
+
+def _stream(writer, data, **entries):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    for key, value in entries.items():
+        stream[NameObject(f'/{key}')] = value
+    return writer._add_object(stream.flate_encode())
+
+def _add_page(writer, text_lines, image=None, font=None, unused_font=None):
+    page = writer.add_blank_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    content = b''
+    xobjects = DictionaryObject()
+    if image is not None:
+        xobjects[NameObject('/Im0')] = image
+        content += f"q {PAGE_WIDTH} 0 0 {PAGE_HEIGHT} 0 0 cm /Im0 Do Q\n".encode()
+    if text_lines:
+        content += b"BT /F1 14 Tf 72 740 Td 18 TL\n"
+        content += b''.join(f"({line}) '\n".encode('latin-1') for line in text_lines)
+        content += b"ET\n"
+    fonts = DictionaryObject({NameObject('/F1'): font})
+    if unused_font is not None:
+        fonts[NameObject('/F2')] = unused_font
+    page[NameObject('/Resources')] = DictionaryObject({
+        NameObject('/Font'): fonts,
+        NameObject('/XObject'): xobjects,
+    })
+    page[NameObject('/Contents')] = _stream(writer, content)
+    return page
+
+def make_scanned_quotation(scanned_pages, dpi):
+    """Return the bytes of a bloated quotation PDF"""
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/Type1'),
+        NameObject('/BaseFont'): NameObject('/Helvetica'),
+    }))
+    # A font subset the scanner software embedded but no page draws with
+    font_file = _stream(writer, os.urandom(UNUSED_FONT_BYTES), Length1=NumberObject(UNUSED_FONT_BYTES))
+    unused_font = writer._add_object(DictionaryObject({
+        NameObject('/Type'): NameObject('/Font'),
+        NameObject('/Subtype'): NameObject('/TrueType'),
+        NameObject('/BaseFont'): NameObject('/ScannerSans'),
+        NameObject('/FontDescriptor'): writer._add_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/FontDescriptor'),
+            NameObject('/FontName'): NameObject('/ScannerSans'),
+            NameObject('/Flags'): NumberObject(32),
+            NameObject('/FontBBox'): ArrayObject([NumberObject(0)] * 4),
+            NameObject('/FontFile2'): font_file,
+        })),
+    }))
+
+    width, height = PAGE_WIDTH * dpi // 72, PAGE_HEIGHT * dpi // 72
+    for index in range(scanned_pages):
+        image = _stream(
+            writer, os.urandom(width * height).translate(SPECKLE),
+            Type=NameObject('/XObject'), Subtype=NameObject('/Image'), Width=NumberObject(width),
+            Height=NumberObject(height), ColorSpace=NameObject('/DeviceGray'), BitsPerComponent=NumberObject(8),
+        )
+        text = ["QUOTATION Q-2024-0815", "Acme Industrial Supplies"] if index == 0 else []
+        _add_page(writer, text, image=image, font=font, unused_font=unused_font)
+        if index == 0:
+            writer.add_blank_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    for part in range(2):
+        _add_page(writer, [f"TERMS AND CONDITIONS OF SALE ({part + 1}/2)"]
+                  + [f"{clause}. The supplier shall not be liable for anything at all." for clause in range(30)],
+                  font=font)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def time_extraction(pdf_path, slim, upload_bytes_per_second):
+    processor, client = make_fake_processor(pdf_path.parent / f"slim_{slim}", latency_seconds=0.5, jitter=0.0,
+                                            upload_bytes_per_second=upload_bytes_per_second)
+    processor.slim = slim
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        extracted_data = processor.extract_po_data(pdf_path, None, use_cache=False)
+    return time.perf_counter() - start_time, client.bytes_uploaded, extracted_data
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scanned-pages', type=int, default=3)
+    parser.add_argument('--dpi', type=int, default=300, help="Resolution of the scanned page images")
+    parser.add_argument('--upload-mbps', type=float, default=5.0, help="Simulated upload speed in MB/s")
+    args = parser.parse_args(argv)
+    upload_bytes_per_second = args.upload_mbps * 1e6
+
+    pdf_bytes = make_scanned_quotation(args.scanned_pages, args.dpi)
+    result = slim_pdf(pdf_bytes)
+    print(f"Original: {len(pdf_bytes) / 1e6:.1f} MB, {result.pages} pages")
+    print(f"Slimmed:  {result.slimmed_bytes / 1e6:.1f} MB ({result.slimmed_bytes / len(pdf_bytes):.0%}) "
+          f"in {result.seconds:.2f}s")
+    print(f"  {result.pages_dropped} page(s) dropped, {result.images_downsampled} image(s) downsampled"
+          f"{'' if _pillow_available() else ' (Pillow is not installed)'}, "
+          f"{result.resources_dropped} unused resource(s) dropped")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = pathlib.Path(tmp) / "scanned_quotation.pdf"
+        pdf_path.write_bytes(pdf_bytes)
+        as_is_seconds, as_is_bytes, as_is_data = time_extraction(pdf_path, False, upload_bytes_per_second)
+        slimmed_seconds, slimmed_bytes, slimmed_data = time_extraction(pdf_path, True, upload_bytes_per_second)
+
+    estimated = result.saved_bytes / upload_bytes_per_second - result.seconds
+    print(f"\nExtraction at {args.upload_mbps:g} MB/s: as is {as_is_seconds:.2f}s ({as_is_bytes / 1e6:.1f} MB sent), "
+          f"slimmed {slimmed_seconds:.2f}s ({slimmed_bytes / 1e6:.1f} MB sent)")
+    print(f"Latency saved: {as_is_seconds - slimmed_seconds:.2f}s measured, {estimated:.2f}s estimated")
+    ok = (result.slimmed_bytes < len(pdf_bytes) and slimmed_seconds < as_is_seconds
+          and bool(as_is_data.get('items')) and bool(slimmed_data.get('items')))
+    print("✅ Slimming made the upload faster" if ok else "❌ Slimming did not pay off")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Compare render throughput on threads against the process pool as workers are added.
+
+Threads share one ExcelGenerator and take turns on the GIL; the process pool
+should scale close to linearly up to the number of cores. Worker start-up
+(including parsing the template) is excluded from the timings.
+
+Usage:
+    python -m benchmarks.bench_render_pool [--pos 32] [--items 100] [--workers 1 2 4 8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from core.render_pool import ProcessRenderPool
+from benchmarks.bench_xml_renderer import workbook_differences
+from benchmarks.synthetic import make_po_data
+
+def throughput(render, workloads, workers):
+    """POs per second rendering workloads with `workers` concurrent callers"""
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=workers) as pool:
+        start_time = time.perf_counter()
+        list(pool.map(lambda po_data: render(po_data), workloads))
+        return len(workloads) / (time.perf_counter() - start_time)
+
+def main(argv=None):
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pos', type=int, default=32, help="POs rendered per measurement")
+    parser.add_argument('--items', type=int, default=100, help="Items per PO")
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cpu_count}), help="Worker counts to measure")
+    parser.add_argument('--backend', choices=['openpyxl', 'xml'], default='openpyxl')
+    args = parser.parse_args(argv)
+
+    metrics = MetricsLog(enabled=False)
+    workloads = [make_po_data(args.items, seed=index) for index in range(args.pos)]
+    generator = ExcelGenerator(backend=args.backend, metrics=metrics)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.warm_up()
+        reference = generator.render(workloads[0]).data
+
+    print(f"{args.pos} POs of {args.items} items, {args.backend} backend, {cpu_count} CPU(s)")
+    print(f"{'workers':>8} {'threads PO/s':>13} {'processes PO/s':>15} {'process speedup':>16}")
+    single_process = None
+    ok = True
+    for workers in args.workers:
+        thread_rate = throughput(generator.render, workloads, workers)
+
+        pool = ProcessRenderPool(workers, args.backend, metrics=metrics)
+        try:
+            pool.warm_up()
+            with contextlib.redirect_stdout(io.StringIO()):
+                differences = workbook_differences(reference, pool.render(workloads[0]).data)
+            process_rate = throughput(pool.render, workloads, workers)
+        finally:
+            pool.shutdown()
+        if differences:
+            ok = False
+            print(f"❌ Process pool output differs: {', '.join(differences[:5])}")
+
+        single_process = single_process or process_rate
+        print(f"{workers:>8} {thread_rate:>13.1f} {process_rate:>15.1f} {process_rate / single_process:>15.2f}x")
+
+    if max(args.workers) > cpu_count:
+        print(f"Note: only {cpu_count} CPU(s) here, so more workers than that cannot run in parallel")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
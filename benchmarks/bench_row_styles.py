@@ -0,0 +1,70 @@
+"""Compare per-cell style copies with shared style references on a large quote.
+
+Usage:
+    python -m benchmarks.bench_row_styles [--items 2000]
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+import tracemalloc
+from copy import copy
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from benchmarks.synthetic import make_po_data
+
+class PerCellCopyExcelGenerator(ExcelGenerator):
+    """The previous _copy_row_style behaviour, kept as a baseline"""
+
+    def _copy_row_style(self, ws, source_row_num, dest_row_num, source_cells=None):
+        if source_cells is None:
+            source_cells = self._styled_cells(ws, source_row_num)
+
+        ws.row_dimensions[dest_row_num].height = ws.row_dimensions[source_row_num].height
+
+        for cell in source_cells:
+            new_cell = ws.cell(row=dest_row_num, column=cell.column)
+            new_cell.font = copy(cell.font)
+            new_cell.border = copy(cell.border)
+            new_cell.fill = copy(cell.fill)
+            new_cell.number_format = cell.number_format
+            new_cell.protection = copy(cell.protection)
+            new_cell.alignment = copy(cell.alignment)
+
+def measure(generator, po_data, output_path):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    generator.generate_po_excel(po_data, output_path=output_path)
+    seconds = time.perf_counter() - start_time
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak_bytes, output_path.stat().st_size
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    po_data = make_po_data(args.items)
+    metrics = MetricsLog(enabled=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = pathlib.Path(tmp)
+        ExcelGenerator(metrics=metrics).generate_po_excel(make_po_data(1), output_path=output_dir / "warmup.xlsx")
+        results = [
+            ("per-cell copies", measure(PerCellCopyExcelGenerator(metrics=metrics), po_data, output_dir / "copied.xlsx")),
+            ("shared styles", measure(ExcelGenerator(metrics=metrics), po_data, output_dir / "shared.xlsx")),
+        ]
+
+    print(f"{args.items} items")
+    print(f"{'strategy':<16} {'render (s)':>11} {'peak RAM (MB)':>14} {'file (KB)':>10}")
+    for name, (seconds, peak_bytes, file_size) in results:
+        print(f"{name:<16} {seconds:>11.2f} {peak_bytes / 2**20:>14.1f} {file_size / 1024:>10.1f}")
+
+    (_, (old_s, old_peak, old_size)), (_, (new_s, new_peak, new_size)) = results
+    print(f"Peak memory reduction: {(1 - new_peak / old_peak) * 100:.0f}%")
+    print(f"File size reduction:   {(1 - new_size / old_size) * 100:.0f}%")
+    print(f"Render speedup:        {old_s / new_s:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Simulate several purchasers sharing one PO server, and count the Gemini calls it makes.
+
+Every client uploads the same set of quotations at the same time, as when a
+quote is forwarded to the whole office. Without the server each copy of the
+app would send its own request for each quotation.
+
+Usage:
+    python -m benchmarks.bench_server [--clients 6] [--quotations 4] [--latency 1.0]
+"""
+import argparse
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from core.remote import RemoteBackend
+from core.server import POServer, POService
+from benchmarks.fake_gemini import make_fake_processor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=6)
+    parser.add_argument('--quotations', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=1.0, help="Fake Gemini latency in seconds")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        processor, client = make_fake_processor(tmp, latency_seconds=args.latency)
+        service = POService(processor, ExcelGenerator(metrics=MetricsLog(enabled=False)))
+        server = POServer(('127.0.0.1', 0), service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        pdf_paths = []
+        for index in range(args.quotations):
+            pdf_path = tmp / f"quotation_{index}.pdf"
+            pdf_path.write_bytes(f"%PDF-1.4 synthetic quotation {index}\n".encode())
+            pdf_paths.append(pdf_path)
+
+        backend = RemoteBackend(f"http://127.0.0.1:{server.server_address[1]}", metrics=MetricsLog(enabled=False))
+        uploads = [pdf_path for _ in range(args.clients) for pdf_path in pdf_paths]
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=len(uploads)) as pool:
+            results = list(pool.map(lambda pdf_path: backend.extract_po_data(pdf_path, None), uploads))
+        elapsed = time.perf_counter() - start_time
+        server.shutdown()
+        server.server_close()
+
+    health = service.health()
+    print(f"{args.clients} clients x {args.quotations} quotations = {len(uploads)} uploads in {elapsed:.2f}s")
+    print(f"Gemini calls: {client.requests} (without the server: {len(uploads)})")
+    print(f"Coalesced: {health['coalesced']}, extracted: {health['extractions']}")
+    ok = client.requests == args.quotations and all(result.get('items') for result in results)
+    print("✅ One Gemini call per quotation" if ok else "❌ Identical uploads were not coalesced")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Measure application startup: import-time breakdown and time to the first window.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+Time to first window needs a display; it is skipped when Tk cannot open one.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 15] [--max-import-ms 500] [--max-window-ms 2000]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_TARGET = "gui.app"
+FALLBACK_IMPORT_TARGET = "core.pdf_processor, core.excel_generator, core.jobs, core.prefetch"
+
+FIRST_WINDOW_SCRIPT = """
+import tkinter as tk
+from gui.app import POGUI
+root = tk.Tk()
+app = POGUI(root)
+root.update()
+print("window shown", flush=True)
+root.destroy()
+"""
+
+def import_times(target):
+    """Return {module: (self_us, cumulative_us)} from python -X importtime, or None if the import fails"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def time_to_first_window():
+    """Seconds from starting the interpreter to the first drawn window, or None without a display"""
+    start_time = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", FIRST_WINDOW_SCRIPT],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start_time
+    process.wait()
+    return elapsed if line.strip() == "window shown" else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--max-import-ms', type=float, default=None, help="Fail if the import takes longer")
+    parser.add_argument('--max-window-ms', type=float, default=None, help="Fail if the first window takes longer")
+    args = parser.parse_args(argv)
+
+    target = IMPORT_TARGET
+    runs = [import_times(target) for _ in range(args.runs)]
+    if runs[0] is None:
+        print(f"Cannot import {target} here (missing GUI dependencies?); measuring the core modules instead")
+        target = FALLBACK_IMPORT_TARGET
+        runs = [import_times(target) for _ in range(args.runs)]
+    targets = [name.strip() for name in target.split(",")]
+    total_ms = statistics.median(
+        sum(times[name][1] for name in targets if name in times) for times in runs
+    ) / 1000
+
+    print(f"\nimport {target}: {total_ms:.1f} ms median over {args.runs} runs")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    heaviest = sorted(runs[-1].items(), key=lambda entry: entry[1][1], reverse=True)[:args.top]
+    for module, (self_us, cumulative_us) in heaviest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+    window_timings = [time_to_first_window() for _ in range(args.runs)]
+    window_ms = None
+    if None in window_timings:
+        print("\nTime to first window: skipped (no display or GUI dependencies)")
+    else:
+        window_ms = statistics.median(window_timings) * 1000
+        print(f"\nTime to first window: {window_ms:.0f} ms median over {args.runs} runs")
+
+    failed = False
+    if args.max_import_ms is not None and total_ms > args.max_import_ms:
+        print(f"❌ Import time {total_ms:.1f} ms exceeds {args.max_import_ms:.0f} ms")
+        failed = True
+    if args.max_window_ms is not None and window_ms is not None and window_ms > args.max_window_ms:
+        print(f"❌ Time to first window {window_ms:.0f} ms exceeds {args.max_window_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
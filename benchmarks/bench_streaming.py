@@ -0,0 +1,97 @@
+"""Compare blocking and streamed extraction + rendering against a simulated streaming model.
+
+The fake client emits the response in small chunks at a fixed token rate, so
+the streamed path can report the header and items (and fill item rows) before
+the response is complete.
+
+Usage:
+    python -m benchmarks.bench_streaming [--items 40] [--chars-per-second 4000]
+"""
+import argparse
+import io
+import json
+import pathlib
+import sys
+import tempfile
+import time
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from core.pdf_processor import PDFProcessor
+from benchmarks.fake_gemini import scratch_storage
+from benchmarks.synthetic import make_po_data
+from benchmarks.bench_xml_renderer import workbook_differences
+
+CHUNK_CHARS = 64
+
+class FakeModels:
+    def __init__(self, response_text, chars_per_second):
+        self.response_text = response_text
+        self.chars_per_second = chars_per_second
+
+    def _chunks(self):
+        for start in range(0, len(self.response_text), CHUNK_CHARS):
+            time.sleep(CHUNK_CHARS / self.chars_per_second)
+            yield type('Chunk', (), {'text': self.response_text[start:start + CHUNK_CHARS]})()
+
+    def generate_content(self, **kwargs):
+        text = ''.join(chunk.text for chunk in self._chunks())
+        return type('Response', (), {'text': text})()
+
+    def generate_content_stream(self, **kwargs):
+        return self._chunks()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=40)
+    parser.add_argument('--chars-per-second', type=float, default=4000)
+    args = parser.parse_args(argv)
+
+    po_data = make_po_data(args.items)
+    gui_data = po_data['gui_data']
+    response = {k: v for k, v in po_data.items() if k != 'gui_data'}
+    response_text = f"```json\n{json.dumps(response, indent=2)}\n```"
+    client = type('Client', (), {'models': FakeModels(response_text, args.chars_per_second)})()
+    generator = ExcelGenerator(metrics=MetricsLog(enabled=False))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = PDFProcessor(client=client, **scratch_storage(tmp))
+        pdf_path = pathlib.Path(tmp) / "quotation.pdf"
+        pdf_path.write_bytes(b"%PDF-1.4\n")
+
+        start_time = time.perf_counter()
+        extracted_data = processor.extract_po_data(pdf_path, dict(gui_data), use_cache=False, chunked=False)
+        blocking_output = io.BytesIO()
+        generator.generate_po_excel(extracted_data, output_path=blocking_output)
+        blocking_seconds = time.perf_counter() - start_time
+
+        first_item = []
+        start_time = time.perf_counter()
+        streaming_po = generator.start_po(gui_data)
+
+        def on_item(index, item):
+            if not first_item:
+                first_item.append(time.perf_counter() - start_time)
+            streaming_po.add_item(index, item)
+
+        extracted_data = processor.extract_po_data(
+            pdf_path, dict(gui_data), use_cache=False, chunked=False,
+            on_header=streaming_po.set_header, on_item=on_item
+        )
+        streamed_output = io.BytesIO()
+        streaming_po.finish(extracted_data, output_path=streamed_output)
+        streamed_seconds = time.perf_counter() - start_time
+
+    print()
+    print(f"Blocking:  first feedback after {blocking_seconds:.2f}s, PO ready after {blocking_seconds:.2f}s")
+    print(f"Streamed:  first item after {first_item[0]:.2f}s, PO ready after {streamed_seconds:.2f}s")
+
+    differences = workbook_differences(blocking_output.getvalue(), streamed_output.getvalue())
+    if differences:
+        print(f"❌ Streamed PO differs: {', '.join(differences[:10])}")
+        return 1
+    print("✅ Streamed PO matches the blocking render")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
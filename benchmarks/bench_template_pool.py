@@ -0,0 +1,50 @@
+"""Compare cold (template re-parsed) and warm (pooled template) render latency.
+
+Usage:
+    python -m benchmarks.bench_template_pool [--runs 20] [--items 10]
+"""
+import argparse
+import pathlib
+import statistics
+import tempfile
+import time
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from core.template_pool import TemplatePool
+from benchmarks.synthetic import make_po_data
+
+def time_renders(generator, po_data, output_dir, runs, before_each=None):
+    timings = []
+    for run in range(runs):
+        if before_each:
+            before_each()
+        start_time = time.perf_counter()
+        generator.generate_po_excel(po_data, output_path=output_dir / f"po_{run}.xlsx")
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--items', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    po_data = make_po_data(args.items)
+    pool = TemplatePool()
+    generator = ExcelGenerator(template_pool=pool, metrics=MetricsLog(enabled=False))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = pathlib.Path(tmp)
+        cold = time_renders(generator, po_data, output_dir, args.runs, before_each=pool.invalidate)
+        generator.generate_po_excel(po_data, output_path=output_dir / "warmup.xlsx")
+        warm = time_renders(generator, po_data, output_dir, args.runs)
+
+    cold_ms = statistics.median(cold) * 1000
+    warm_ms = statistics.median(warm) * 1000
+    print(f"Cold render (template parsed every time): {cold_ms:.1f} ms median over {args.runs} runs")
+    print(f"Warm render (pooled template):            {warm_ms:.1f} ms median over {args.runs} runs")
+    print(f"Speedup: {cold_ms / warm_ms:.2f}x")
+
+if __name__ == "__main__":
+    main()
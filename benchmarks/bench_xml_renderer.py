@@ -0,0 +1,88 @@
+"""Check parity between the openpyxl and xml render backends and compare their speed.
+
+Usage:
+    python -m benchmarks.bench_xml_renderer [--runs 20] [--sizes 10 100 1000]
+"""
+import argparse
+import io
+import statistics
+import sys
+import time
+
+import openpyxl
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from benchmarks.synthetic import make_po_data
+
+def _cell_signature(cell):
+    value = cell.value
+    if isinstance(value, float):
+        value = round(value, 6)
+    return (value, cell.number_format, repr(cell.font), repr(cell.fill), repr(cell.border),
+            repr(cell.alignment), repr(cell.protection))
+
+def workbook_differences(expected_bytes, actual_bytes):
+    """Return a list of differences between two rendered POs as seen by openpyxl"""
+    expected = openpyxl.load_workbook(io.BytesIO(expected_bytes)).active
+    actual = openpyxl.load_workbook(io.BytesIO(actual_bytes)).active
+    differences = []
+
+    for row in range(1, max(expected.max_row, actual.max_row) + 1):
+        if expected.row_dimensions[row].height != actual.row_dimensions[row].height:
+            differences.append(f"row {row} height")
+        for column in range(1, max(expected.max_column, actual.max_column) + 1):
+            expected_cell = expected.cell(row, column)
+            if _cell_signature(expected_cell) != _cell_signature(actual.cell(row, column)):
+                differences.append(f"cell {expected_cell.coordinate}")
+
+    if sorted(map(str, expected.merged_cells.ranges)) != sorted(map(str, actual.merged_cells.ranges)):
+        differences.append("merged cells")
+    if [brk.id for brk in expected.row_breaks.brk] != [brk.id for brk in actual.row_breaks.brk]:
+        differences.append("row breaks")
+    return differences
+
+def render(generator, po_data):
+    output = io.BytesIO()
+    generator.generate_po_excel(po_data, output_path=output)
+    return output.getvalue()
+
+def median_ms(generator, po_data, runs):
+    timings = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        render(generator, po_data)
+        timings.append(time.perf_counter() - start_time)
+    return statistics.median(timings) * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 10, 11, 100, 1000])
+    args = parser.parse_args(argv)
+
+    openpyxl_generator = ExcelGenerator(backend="openpyxl", metrics=MetricsLog(enabled=False))
+    xml_generator = ExcelGenerator(backend="xml", metrics=MetricsLog(enabled=False))
+
+    failed = False
+    rows = []
+    for num_items in args.sizes:
+        po_data = make_po_data(num_items)
+        differences = workbook_differences(render(openpyxl_generator, po_data), render(xml_generator, po_data))
+        if differences:
+            failed = True
+            print(f"❌ {num_items} items: {len(differences)} difference(s), e.g. {differences[:5]}")
+        rows.append((
+            num_items,
+            median_ms(openpyxl_generator, po_data, args.runs),
+            median_ms(xml_generator, po_data, args.runs),
+            not differences,
+        ))
+
+    print(f"{'items':>6} {'openpyxl (ms)':>14} {'xml (ms)':>10} {'speedup':>8} {'parity':>7}")
+    for num_items, openpyxl_ms, xml_ms, parity in rows:
+        print(f"{num_items:>6} {openpyxl_ms:>14.1f} {xml_ms:>10.1f} {openpyxl_ms / xml_ms:>7.1f}x {'ok' if parity else 'FAIL':>7}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
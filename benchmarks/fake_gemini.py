@@ -0,0 +1,147 @@
+"""Offline stand-in for the Gemini client with configurable latency and error rates.
+
+The response for a PDF is a synthetic extraction seeded by the PDF's bytes, so
+the same file always yields the same items.
+"""
+import asyncio
+import hashlib
+import json
+import pathlib
+import random
+import threading
+import time
+
+from config.settings import GEMINI_MAX_CONCURRENCY
+from core.archive import ExtractionArchive
+from core.cache import ExtractionCache
+from core.metrics import MetricsLog
+from core.pdf_processor import PDFProcessor
+from core.rate_limit import RateLimiter
+from benchmarks.synthetic import make_extraction
+
+STREAM_CHUNK_CHARS = 256
+
+class FakeGeminiError(Exception):
+    """Raised like a google.genai APIError, with the HTTP status in .code"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+class FakeModels:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def generate_content(self, model, contents, config):
+        text, usage = self.backend.respond(contents)
+        time.sleep(self.backend.upload_seconds(contents) + self.backend.latency(text))
+        return FakeResponse(text, usage)
+
+    def generate_content_stream(self, model, contents, config):
+        text, usage = self.backend.respond(contents)
+        time.sleep(self.backend.upload_seconds(contents))
+        chunks = [text[start:start + STREAM_CHUNK_CHARS] for start in range(0, len(text), STREAM_CHUNK_CHARS)]
+        delay = self.backend.latency(text) / max(1, len(chunks))
+        for index, chunk in enumerate(chunks):
+            time.sleep(delay)
+            yield FakeResponse(chunk, usage if index == len(chunks) - 1 else None)
+
+class FakeAsyncModels:
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def generate_content(self, model, contents, config):
+        text, usage = self.backend.respond(contents)
+        await asyncio.sleep(self.backend.upload_seconds(contents) + self.backend.latency(text))
+        return FakeResponse(text, usage)
+
+class FakeAio:
+    def __init__(self, backend):
+        self.models = FakeAsyncModels(backend)
+
+class FakeGeminiClient:
+    """Answers extraction requests with synthetic quotations.
+
+    Latency is latency_seconds plus seconds_per_item for each returned item,
+    with +/- jitter. error_rate is the chance that a request fails with one of
+    error_codes (retryable 429/503 by default). With upload_bytes_per_second
+    set, sending the PDF takes its size divided by that on top.
+    """
+
+    def __init__(self, latency_seconds=0.5, seconds_per_item=0.0, jitter=0.2, error_rate=0.0,
+                 error_codes=(429, 503), num_items=10, item_options=None, seed=0, upload_bytes_per_second=None):
+        self.latency_seconds = latency_seconds
+        self.seconds_per_item = seconds_per_item
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.num_items = num_items
+        self.item_options = item_options or {}
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.requests = 0
+        self.bytes_uploaded = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = FakeModels(self)
+        self.aio = FakeAio(self)
+
+    def respond(self, contents):
+        """Return (response_text, usage) for a request, or raise an injected error"""
+        part, prompt = contents
+        pdf_bytes = part.inline_data.data
+        with self._lock:
+            self.requests += 1
+            self.bytes_uploaded += len(pdf_bytes)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+                code = self._rng.choice(self.error_codes)
+        if failed:
+            raise FakeGeminiError(code, "injected failure")
+
+        seed = int.from_bytes(hashlib.sha256(pdf_bytes).digest()[:4], 'big')
+        extraction = make_extraction(self.num_items, seed, **self.item_options)
+        text = f"```json\n{json.dumps(extraction, indent=2, ensure_ascii=False)}\n```"
+        usage = FakeUsage(len(pdf_bytes) // 4 + len(prompt) // 4, len(text) // 4)
+        return text, usage
+
+    def upload_seconds(self, contents):
+        if not self.upload_bytes_per_second:
+            return 0.0
+        return len(contents[0].inline_data.data) / self.upload_bytes_per_second
+
+    def latency(self, text):
+        num_items = text.count('"unitPrice"')
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, (self.latency_seconds + self.seconds_per_item * num_items) * (1 + jitter))
+
+def scratch_storage(workdir):
+    """PDFProcessor arguments keeping its cache and archive in workdir and its metrics out of the real log"""
+    workdir = pathlib.Path(workdir)
+    return {
+        'cache': ExtractionCache(workdir / "cache"),
+        'archive': ExtractionArchive(workdir / "archive.sqlite3"),
+        'metrics': MetricsLog(enabled=False),
+    }
+
+def make_fake_processor(workdir, requests_per_minute=6000, max_concurrency=GEMINI_MAX_CONCURRENCY, **client_options):
+    """Return a PDFProcessor backed by a FakeGeminiClient, plus the client for its counters.
+
+    Its cache and archive live in workdir, so benchmarks leave the real ones alone.
+    """
+    client = FakeGeminiClient(**client_options)
+    processor = PDFProcessor(client=client, rate_limiter=RateLimiter(requests_per_minute, max_concurrency),
+                             **scratch_storage(workdir))
+    return processor, client
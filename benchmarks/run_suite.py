@@ -0,0 +1,178 @@
+"""Run the offline benchmark suite and write the results to a JSON file.
+
+Covers rendering with both backends, number_to_ringgit, format_address_for_excel
+and end-to-end batch throughput against the fake Gemini backend. Pass
+--compare with an earlier results file to print the change per benchmark.
+
+Usage:
+    python -m benchmarks.run_suite [--output bench_results.json] [--compare old.json] [--full]
+"""
+import argparse
+import contextlib
+import io
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from core.batch import BatchRunner
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from core.utils import format_address_for_excel, number_to_ringgit, percentile
+from benchmarks.fake_gemini import make_fake_processor
+from benchmarks.synthetic import make_po_data, make_amounts, make_addresses
+
+QUICK_RENDER_SIZES = [1, 10, 100, 1000]
+FULL_RENDER_SIZES = [1, 10, 100, 1000, 5000]
+
+def summarize(timings, unit_scale=1000, unit='ms', **extra):
+    """Median/p95/min of a list of durations in seconds"""
+    result = {
+        'unit': unit,
+        'runs': len(timings),
+        'median': round(statistics.median(timings) * unit_scale, 4),
+        'p95': round(percentile(timings, 95) * unit_scale, 4),
+        'min': round(min(timings) * unit_scale, 4),
+    }
+    result.update(extra)
+    return result
+
+def quietly():
+    """Swallow the progress prints of the code under test"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def bench_render(backend, num_items, runs, options):
+    generator = ExcelGenerator(backend=backend, metrics=MetricsLog(enabled=False))
+    po_data = make_po_data(num_items, **options)
+    timings = []
+    with quietly():
+        generator.generate_po_excel(po_data, output_path=io.BytesIO())
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            generator.generate_po_excel(po_data, output_path=io.BytesIO())
+            timings.append(time.perf_counter() - start_time)
+    return summarize(timings, items=num_items)
+
+def bench_per_call(function, inputs, runs):
+    """Time function over every input; reports microseconds per call"""
+    timings = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        for value in inputs:
+            function(value)
+        timings.append((time.perf_counter() - start_time) / len(inputs))
+    return summarize(timings, unit_scale=1e6, unit='us/call', calls_per_run=len(inputs))
+
+def bench_batch(num_pdfs, workers, latency_seconds, error_rate, backend):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        processor, client = make_fake_processor(
+            tmp, latency_seconds=latency_seconds, error_rate=error_rate, max_concurrency=workers
+        )
+        pdf_paths = []
+        for index in range(num_pdfs):
+            pdf_path = tmp / f"quotation_{index:03d}.pdf"
+            pdf_path.write_bytes(f"%PDF-1.4 synthetic quotation {index}\n".encode())
+            pdf_paths.append(pdf_path)
+        manifest = {'*': {'po_number': 'P-250719-001M', 'po_issue_date': '19/07/2025'}}
+        runner = BatchRunner(tmp / "output", max_workers=workers, use_cache=False,
+                             pdf_processor=processor, backend=backend)
+        runner.excel_generator.metrics = MetricsLog(enabled=False)
+        with quietly():
+            summary = runner.run(pdf_paths, manifest)
+    return {
+        'unit': 'POs/minute',
+        'median': summary['pos_per_minute'],
+        'wall_seconds': summary['wall_seconds'],
+        'latency_p50_seconds': summary['latency_p50_seconds'],
+        'latency_p95_seconds': summary['latency_p95_seconds'],
+        'succeeded': summary['succeeded'],
+        'failed': summary['failed'],
+        'gemini_requests': client.requests,
+        'injected_errors': client.errors,
+        'pdfs': num_pdfs,
+        'workers': workers,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(args):
+    results = {}
+    sizes = FULL_RENDER_SIZES if args.full else QUICK_RENDER_SIZES
+    for backend in ('openpyxl', 'xml'):
+        for num_items in sizes:
+            runs = args.runs if num_items <= 1000 else max(1, args.runs // 5)
+            name = f"render_{backend}_{num_items}_items"
+            print(f"Running {name}...")
+            results[name] = bench_render(backend, num_items, runs, {})
+    print("Running render_openpyxl_100_items_unicode...")
+    results['render_openpyxl_100_items_unicode'] = bench_render(
+        'openpyxl', 100, args.runs, {'long_address': True, 'unicode_descriptions': True}
+    )
+
+    print("Running number_to_ringgit...")
+    results['number_to_ringgit'] = bench_per_call(number_to_ringgit, make_amounts(2000), args.runs)
+    print("Running format_address_for_excel...")
+    results['format_address_for_excel'] = bench_per_call(format_address_for_excel, make_addresses(2000), args.runs)
+
+    for error_rate in (0.0, 0.05):
+        name = f"batch_throughput_errors_{int(error_rate * 100)}pct"
+        print(f"Running {name}...")
+        results[name] = bench_batch(args.batch_pdfs, args.workers, args.latency, error_rate, 'openpyxl')
+    return results
+
+def print_results(results, previous=None):
+    print()
+    print(f"{'benchmark':<42} {'median':>12} {'unit':<11} {'change':>8}")
+    for name, result in results.items():
+        change = ''
+        old = (previous or {}).get(name)
+        if old and old.get('median'):
+            change = f"{(result['median'] - old['median']) / old['median'] * 100:+.1f}%"
+        print(f"{name:<42} {result['median']:>12.3f} {result['unit']:<11} {change:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the results")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--full', action='store_true', help="Include the 5,000 item renders")
+    parser.add_argument('--batch-pdfs', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.3, help="Fake Gemini latency in seconds")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args)
+    report = {
+        'meta': {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)['results']
+    print_results(results, previous)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
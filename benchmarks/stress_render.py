@@ -0,0 +1,103 @@
+"""Stress-test concurrent renders on one shared ExcelGenerator and check for cross-talk.
+
+Every task renders a different PO (its own PO number, purchaser, supplier and
+item count). The same POs are first rendered one at a time with a separate
+generator; each concurrent result must match its serial reference cell for
+cell, carry its own item count and total, and land in its own file.
+
+Usage:
+    python -m benchmarks.stress_render [--threads 8] [--renders 64] [--backend openpyxl xml]
+"""
+import argparse
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.excel_generator import ExcelGenerator
+from core.metrics import MetricsLog
+from benchmarks.bench_xml_renderer import workbook_differences
+from benchmarks.synthetic import make_po_data
+
+def quietly():
+    """Swallow the progress prints of the renders"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def make_task(index):
+    po_data = make_po_data(1 + index % 25, seed=index)
+    po_data['companyName'] = f"Supplier {index} Sdn. Bhd."
+    gui_data = dict(
+        po_data['gui_data'],
+        po_number=f"P-{index:06d}-001M",
+        purchaser_name=f"Purchaser {index}",
+    )
+    total = sum(item['quantity'] * item['unitPrice'] for item in po_data['items'])
+    return po_data, gui_data, total
+
+def stress(backend, threads, renders, output_dir):
+    tasks = [make_task(index) for index in range(renders)]
+
+    serial_generator = ExcelGenerator(backend=backend, metrics=MetricsLog(enabled=False))
+    start_time = time.perf_counter()
+    with quietly():
+        references = [serial_generator.render(po_data, gui_data).data for po_data, gui_data, _ in tasks]
+    serial_seconds = time.perf_counter() - start_time
+
+    shared_generator = ExcelGenerator(backend=backend, metrics=MetricsLog(enabled=False))
+    barrier = threading.Barrier(threads)
+
+    def render(index):
+        # Line the first wave up so the threads really overlap
+        if index < threads:
+            barrier.wait()
+        po_data, gui_data, _ = tasks[index]
+        # Every other task also saves, to check that concurrent writes stay apart
+        output_path = output_dir / f"{backend}_{index}.xlsx" if index % 2 else None
+        return shared_generator.render(po_data, gui_data, output_path=output_path)
+
+    start_time = time.perf_counter()
+    with quietly(), ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(render, range(renders)))
+    concurrent_seconds = time.perf_counter() - start_time
+
+    failures = []
+    for index, (rendered, reference, (po_data, _, total)) in enumerate(zip(results, references, tasks)):
+        differences = workbook_differences(reference, rendered.data)
+        if differences:
+            failures.append(f"render {index}: {', '.join(differences[:5])}")
+        if rendered.item_count != len(po_data['items']):
+            failures.append(f"render {index}: item count {rendered.item_count}, expected {len(po_data['items'])}")
+        if abs(rendered.total - total) > 1e-6:
+            failures.append(f"render {index}: total {rendered.total}, expected {total}")
+        if index % 2 and (rendered.path is None or rendered.path.read_bytes() != rendered.data):
+            failures.append(f"render {index}: saved file does not match the rendered bytes")
+
+    print(f"{backend:<9} {renders} renders: serial {serial_seconds:.2f}s, "
+          f"{threads} threads {concurrent_seconds:.2f}s, {len(failures)} failure(s)")
+    for failure in failures[:20]:
+        print(f"  ❌ {failure}")
+    return not failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--renders', type=int, default=64)
+    parser.add_argument('--backend', nargs='+', default=['openpyxl', 'xml'], choices=['openpyxl', 'xml'])
+    args = parser.parse_args(argv)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as output_dir:
+        for backend in args.backend:
+            threads = max(1, args.threads)
+            passed = stress(backend, threads, max(threads, args.renders), pathlib.Path(output_dir))
+            ok = ok and passed
+
+    print("✅ No cross-talk between concurrent renders" if ok else "❌ Concurrent renders interfered")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
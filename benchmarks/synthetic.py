@@ -0,0 +1,80 @@
+"""Synthetic extraction payloads shaped like PDFProcessor.extract_po_data output"""
+import random
+
+UNITS = ['pcs', 'lot', 'kgs', 'm']
+
+UNICODE_DESCRIPTIONS = [
+    "Injap bebola keluli tahan karat ½\" — gred 316",
+    "不锈钢法兰 DN50 PN16",
+    "Câble blindé 4×2.5 mm² (résistant aux UV)",
+    "Sensor suhu PT100 ±0.1 °C, kabel 3 m",
+    "Pam empar 5.5 kW – 2900 rpm — IE3",
+    "ステンレス製ボルト M12×50 (A2-70)",
+    "Σ-series servo drive 400 V ⚡",
+]
+
+LONG_ADDRESS = (
+    "Lot 1234-A, Tingkat 3, Blok C, Kompleks Perindustrian Bersepadu Sungai Buloh Fasa 2, "
+    "Jalan Industri Sungai Buloh 7/9, Kawasan Perindustrian Sungai Buloh, 47000 Sungai Buloh, "
+    "Selangor Darul Ehsan, Malaysia"
+)
+
+def make_item(rng, index, unicode_descriptions=False):
+    quantity = rng.randint(1, 50)
+    unit = rng.choice(UNITS)
+    if unicode_descriptions:
+        description = f"{rng.choice(UNICODE_DESCRIPTIONS)} #{index + 1}"
+    else:
+        description = f"Item {index + 1} - stainless steel fitting, grade 316, {rng.randint(10, 200)}mm"
+    return {
+        'quantity': quantity,
+        'unit': unit,
+        'description': description,
+        'unitPrice': round(rng.uniform(1, 5000), 2),
+    }
+
+def make_po_data(num_items=10, seed=0, long_address=False, unicode_descriptions=False):
+    """Build a po_data dict (including gui_data) with num_items line items"""
+    rng = random.Random(seed)
+    items = [make_item(rng, index, unicode_descriptions) for index in range(num_items)]
+
+    return {
+        'companyName': 'Syarikat Contoh Sdn. Bhd.',
+        'address': LONG_ADDRESS if long_address else
+                   'No. 12, Jalan Perindustrian 3, Taman Perindustrian Maju, 47100 Puchong, Selangor, Malaysia',
+        'quotationNumber': f"Q-{seed:04d}",
+        'pic': {'name': 'Ahmad bin Ali', 'email': 'ahmad@example.com', 'phone': '+60123456789'},
+        'terms': {'payment': '30 Days', 'deliveryWeeks': 4},
+        'items': items,
+        'gui_data': {
+            'po_number': 'P-250719-001M',
+            'project_number': 'P-250719',
+            'project_name': 'Benchmark Project',
+            'po_issue_date': '19/07/2025',
+            'purchaser_name': 'Siti Aminah',
+            'purchaser_phone': '+60198765432',
+            'director_manager': 'Tan Wei Ming',
+        },
+    }
+
+def make_extraction(num_items=10, seed=0, **options):
+    """Build the model's side of a po_data dict, i.e. without gui_data"""
+    po_data = make_po_data(num_items, seed, **options)
+    del po_data['gui_data']
+    return po_data
+
+def make_amounts(count, seed=0):
+    """Ringgit amounts from cents up to tens of millions"""
+    rng = random.Random(seed)
+    return [round(rng.choice([rng.uniform(0, 1), rng.uniform(1, 1000), rng.uniform(1000, 5e7)]), 2)
+            for _ in range(count)]
+
+def make_addresses(count, seed=0):
+    """Addresses of mixed length, with and without commas"""
+    rng = random.Random(seed)
+    addresses = []
+    for index in range(count):
+        street = f"No. {rng.randint(1, 999)}, Jalan {rng.choice(['Ampang', 'Bukit Bintang', 'Tun Razak'])} {index}"
+        city = rng.choice(['50450 Kuala Lumpur', '10200 George Town, Pulau Pinang', '80000 Johor Bahru, Johor'])
+        addresses.append(rng.choice([street, f"{street}, {city}", f"{street} {city} Malaysia", LONG_ADDRESS]))
+    return addresses
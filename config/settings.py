@@ -1,11 +1,13 @@
 import os
-import json
 from pathlib import Path
 
 # Base paths
 BASE_DIR = Path(__file__).parent.parent
 TEMP_DIR = BASE_DIR / "temp"
 JSONS_DIR = BASE_DIR / "jsons"
+CACHE_DIR = BASE_DIR / "cache"
+METRICS_DIR = BASE_DIR / "metrics"
+RECORDINGS_DIR = BASE_DIR / "recordings"
 TEMPLATE_DIR = BASE_DIR / "data" / "templates"
 CONFIG_DIR = BASE_DIR / "config"
 
@@ -18,11 +20,103 @@ GEMINI_MODEL = "gemini-2.5-flash"
 GEMINI_TEMPERATURE = 0.2
 GEMINI_TOP_P = 0.9
 
+# Gemini rate limiting and retries
+GEMINI_REQUESTS_PER_MINUTE = 60
+GEMINI_MAX_CONCURRENCY = 4
+GEMINI_MAX_RETRIES = 5
+GEMINI_BACKOFF_BASE_SECONDS = 1.0
+GEMINI_BACKOFF_MAX_SECONDS = 60.0
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = 180
+GEMINI_REQUEST_DEADLINE_SECONDS = 600
+
+# Gemini record/replay: None talks to the API, "record" also saves every response
+# to RECORDINGS_DIR, "replay" serves saved responses without the network
+GEMINI_RESPONSE_MODE = None
+GEMINI_REPLAY_SIMULATE_LATENCY = False
+
+# Page-chunked extraction for long quotations
+PDF_CHUNKED_EXTRACTION_MIN_PAGES = 30
+PDF_CHUNK_PAGES = 8
+PDF_CHUNK_OVERLAP_PAGES = 1
+
+# Pre-upload slimming of quotation PDFs of at least PDF_SLIM_MIN_BYTES
+PDF_SLIM_ENABLED = True
+PDF_SLIM_MIN_BYTES = 2 * 1024 * 1024
+# Larger images are downsampled to this resolution at full-page size and re-encoded as JPEG (needs Pillow)
+PDF_SLIM_MAX_IMAGE_DPI = 150
+PDF_SLIM_JPEG_QUALITY = 75
+PDF_SLIM_DROP_BLANK_PAGES = True
+# Trailing pages headed by one of these are dropped, e.g. a terms and conditions appendix
+PDF_SLIM_BOILERPLATE_PATTERNS = [
+    r'terms\s+(and|&)\s+conditions',
+    r'general\s+conditions\s+of\s+(sale|supply|contract)',
+    r'conditions\s+of\s+sale',
+]
+# Used to estimate the upload time saved by slimming, in bytes per second
+PDF_SLIM_UPLOAD_BYTES_PER_SECOND = 1024 * 1024
+
+# Metrics log configuration
+METRICS_ENABLED = True
+METRICS_FILE = METRICS_DIR / "metrics.jsonl"
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+METRICS_BACKUP_COUNT = 3
+
+# Extraction archive: every extraction, indexed by quotation, supplier, PO number, PDF hash and date
+ARCHIVE_PATH = JSONS_DIR / "extractions.sqlite3"
+# Entries older than this are pruned; None keeps everything
+ARCHIVE_RETENTION_DAYS = 365
+ARCHIVE_COMPRESSION_LEVEL = 6
+
+# Extraction cache configuration
+EXTRACTION_CACHE_ENABLED = True
+EXTRACTION_CACHE_MAX_BYTES = 200 * 1024 * 1024
+EXTRACTION_CACHE_MAX_AGE_DAYS = 30
+
 # Excel configuration
 EXCEL_START_ROW = 31
 EXCEL_TABLE_END_ROW = 50
 ROWS_PER_ITEM = 2
 ADDRESS_MAX_LENGTH = 45
+# "openpyxl" renders through openpyxl's object model, "xml" fills the template's sheet XML directly
+EXCEL_RENDER_BACKEND = "openpyxl"
+# Batch renders in this many worker processes, each holding the parsed template; 0 renders on threads
+EXCEL_RENDER_PROCESSES = 0
+
+# Orphaned PO files in TEMP_DIR older than this are deleted at startup
+TEMP_SWEEP_MIN_AGE_SECONDS = 60 * 60
+
+# Batch configuration
+BATCH_MAX_WORKERS = 4
+
+# PO server (python -m core.server): one cache, rate limiter and template for the whole office
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+# The GUI extracts through the server at this URL (e.g. "http://po-server:8765") instead of calling Gemini
+SERVER_URL = None
+SERVER_REQUEST_TIMEOUT_SECONDS = GEMINI_REQUEST_DEADLINE_SECONDS + 60
+
+# Watch-folder mode (python -m core.watcher)
+WATCH_DIR = BASE_DIR / "watch"
+WATCH_INBOX_DIR = WATCH_DIR / "inbox"
+WATCH_DONE_DIR = WATCH_DIR / "done"
+WATCH_FAILED_DIR = WATCH_DIR / "failed"
+# Content hashes of the quotations already processed, so a quotation saved twice gets one PO
+WATCH_LEDGER_PATH = WATCH_DIR / "processed.json"
+WATCH_POLL_INTERVAL_SECONDS = 2.0
+# A PDF is processed once it has not changed for this long
+WATCH_SETTLE_SECONDS = 3.0
+# A PDF still without a trailer after this long unchanged is moved to the failed folder
+WATCH_INCOMPLETE_TIMEOUT_SECONDS = 5 * 60
+# Quotations taken from the inbox at a time; the rest wait there
+WATCH_MAX_IN_FLIGHT = 6
+
+# Concurrent jobs in the GUI job queue
+JOB_QUEUE_MAX_WORKERS = 3
+
+# The GUI applies progress events from worker threads this often, at most this many at a time
+PROGRESS_POLL_INTERVAL_MS = 50
+PROGRESS_MAX_EVENTS_PER_POLL = 500
 
 # Default user settings
 DEFAULT_USER_SETTINGS = {
@@ -35,27 +129,9 @@ DEFAULT_USER_SETTINGS = {
     "remember_details": False
 }
 
+# Remembered details are written this long after the last change
+SETTINGS_SAVE_DEBOUNCE_SECONDS = 0.5
+
 # Create necessary directories
-for directory in [TEMP_DIR, JSONS_DIR, TEMPLATE_DIR, CONFIG_DIR]:
+for directory in [TEMP_DIR, JSONS_DIR, CACHE_DIR, METRICS_DIR, TEMPLATE_DIR, CONFIG_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
-
-def load_user_settings():
-    """Load user settings from JSON file"""
-    try:
-        if USER_SETTINGS_PATH.exists():
-            with open(USER_SETTINGS_PATH, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading user settings: {e}")
-    
-    return DEFAULT_USER_SETTINGS.copy()
-
-def save_user_settings(settings):
-    """Save user settings to JSON file"""
-    try:
-        with open(USER_SETTINGS_PATH, 'w') as f:
-            json.dump(settings, f, indent=2)
-        return True
-    except Exception as e:
-        print(f"Error saving user settings: {e}")
-        return False
\ No newline at end of file
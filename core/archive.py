@@ -0,0 +1,321 @@
+"""Indexed, compressed archive of every extraction, replacing one JSON file per run.
+
+Extractions are appended to a SQLite database with indexes on quotation
+number, supplier name, PDF hash and date; the POs generated from them are
+linked by PO number. Entries older than ARCHIVE_RETENTION_DAYS are pruned.
+
+Usage:
+    python -m core.archive find [--quotation Q-1234] [--supplier "Acme"] [--po P-250719-001M] [--pdf quote.pdf]
+    python -m core.archive show ID
+    python -m core.archive migrate [--keep-files]
+    python -m core.archive prune [--days 365]
+"""
+import argparse
+import contextlib
+import json
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+from config.settings import ARCHIVE_PATH, ARCHIVE_RETENTION_DAYS, ARCHIVE_COMPRESSION_LEVEL, JSONS_DIR
+from core.cache import pdf_sha256
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    pdf_sha256 TEXT,
+    source_file TEXT,
+    quotation_number TEXT,
+    supplier_name TEXT COLLATE NOCASE,
+    item_count INTEGER,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS extractions_quotation_number ON extractions (quotation_number);
+CREATE INDEX IF NOT EXISTS extractions_supplier_name ON extractions (supplier_name);
+CREATE INDEX IF NOT EXISTS extractions_pdf_sha256 ON extractions (pdf_sha256);
+CREATE INDEX IF NOT EXISTS extractions_created_at ON extractions (created_at);
+
+CREATE TABLE IF NOT EXISTS purchase_orders (
+    extraction_id INTEGER NOT NULL REFERENCES extractions (id) ON DELETE CASCADE,
+    po_number TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS purchase_orders_po_number ON purchase_orders (po_number);
+CREATE INDEX IF NOT EXISTS purchase_orders_extraction_id ON purchase_orders (extraction_id);
+"""
+
+SUMMARY_COLUMNS = "id, created_at, pdf_sha256, source_file, quotation_number, supplier_name, item_count"
+
+def _compress(extracted_data, level=ARCHIVE_COMPRESSION_LEVEL):
+    payload = json.dumps(extracted_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(payload, level)
+
+def _decompress(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+class ExtractionArchive:
+    """Append-only store of extractions; safe to share between threads"""
+
+    def __init__(self, path=ARCHIVE_PATH, retention_days=ARCHIVE_RETENTION_DAYS):
+        self.path = pathlib.Path(path)
+        self.retention_days = retention_days
+        self._pruned = False
+        self._prune_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            # WAL lets readers and the GUI/job threads write without blocking each other
+            connection.execute("PRAGMA journal_mode=WAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per call, so no connection is shared between threads
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA foreign_keys=ON")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def add(self, extracted_data, pdf_bytes=None, source_file=None, po_number=None, created_at=None, sha256=None,
+            prune=True):
+        """Append an extraction and return its id; prune=False leaves retention to a later write"""
+        if sha256 is None and pdf_bytes is not None:
+            sha256 = pdf_sha256(pdf_bytes)
+        created_at = time.time() if created_at is None else created_at
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO extractions (created_at, pdf_sha256, source_file, quotation_number, supplier_name,"
+                " item_count, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    created_at,
+                    sha256,
+                    str(source_file) if source_file else None,
+                    extracted_data.get('quotationNumber'),
+                    extracted_data.get('companyName'),
+                    len(extracted_data.get('items') or []),
+                    _compress(extracted_data),
+                )
+            )
+            extraction_id = cursor.lastrowid
+            if po_number:
+                connection.execute(
+                    "INSERT INTO purchase_orders (extraction_id, po_number, created_at) VALUES (?, ?, ?)",
+                    (extraction_id, po_number, created_at)
+                )
+        if prune:
+            self._prune_once()
+        return extraction_id
+
+    def contains(self, sha256):
+        """Return True if an extraction of the PDF with this hash is archived"""
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT 1 FROM extractions WHERE pdf_sha256 = ? LIMIT 1", (sha256,)
+            ).fetchone() is not None
+
+    def link_po(self, po_number, pdf_bytes=None, sha256=None):
+        """Record that po_number was generated from the latest extraction of this PDF.
+
+        Returns the extraction id, or None when the PDF was never archived.
+        """
+        if sha256 is None:
+            sha256 = pdf_sha256(pdf_bytes)
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT id FROM extractions WHERE pdf_sha256 = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                (sha256,)
+            ).fetchone()
+            if row is None or not po_number:
+                return None
+            connection.execute(
+                "INSERT INTO purchase_orders (extraction_id, po_number, created_at) VALUES (?, ?, ?)",
+                (row[0], po_number, time.time())
+            )
+        return row[0]
+
+    def find(self, quotation_number=None, supplier_name=None, po_number=None, pdf_bytes=None, sha256=None,
+             since=None, until=None, limit=50):
+        """Return summaries of matching extractions, newest first.
+
+        supplier_name matches case-insensitively on a prefix; since/until are
+        datetimes bounding the extraction date.
+        """
+        if sha256 is None and pdf_bytes is not None:
+            sha256 = pdf_sha256(pdf_bytes)
+        conditions, parameters = [], []
+        if quotation_number:
+            conditions.append("quotation_number = ?")
+            parameters.append(quotation_number)
+        if supplier_name:
+            conditions.append("supplier_name LIKE ? ESCAPE '\\'")
+            escaped = supplier_name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            parameters.append(f"{escaped}%")
+        if po_number:
+            conditions.append("id IN (SELECT extraction_id FROM purchase_orders WHERE po_number = ?)")
+            parameters.append(po_number)
+        if sha256:
+            conditions.append("pdf_sha256 = ?")
+            parameters.append(sha256)
+        if since is not None:
+            conditions.append("created_at >= ?")
+            parameters.append(since.timestamp())
+        if until is not None:
+            conditions.append("created_at < ?")
+            parameters.append(until.timestamp())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._connect() as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM extractions {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+                parameters + [limit]
+            ).fetchall()
+            summaries = [dict(row) for row in rows]
+            for summary in summaries:
+                summary['po_numbers'] = [po for (po,) in connection.execute(
+                    "SELECT po_number FROM purchase_orders WHERE extraction_id = ? ORDER BY created_at",
+                    (summary['id'],)
+                )]
+        return summaries
+
+    def get(self, extraction_id):
+        """Return the archived extraction, or None"""
+        with self._connect() as connection:
+            row = connection.execute("SELECT data FROM extractions WHERE id = ?", (extraction_id,)).fetchone()
+        return _decompress(row[0]) if row else None
+
+    def prune(self, max_age_days=None):
+        """Delete extractions older than max_age_days (default: the retention policy) and return how many"""
+        max_age_days = self.retention_days if max_age_days is None else max_age_days
+        if max_age_days is None:
+            return 0
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self._connect() as connection:
+            deleted = connection.execute("DELETE FROM extractions WHERE created_at < ?", (cutoff,)).rowcount
+        return deleted
+
+    def _prune_once(self):
+        # Retention is applied on the first write of each run rather than on every write
+        with self._prune_lock:
+            if self._pruned:
+                return
+            self._pruned = True
+        try:
+            deleted = self.prune()
+        except sqlite3.Error as e:
+            print(f"Could not prune the extraction archive: {e}")
+            return
+        if deleted:
+            print(f"Pruned {deleted} archived extraction(s) older than {self.retention_days} days")
+
+    def migrate_json_files(self, directory=JSONS_DIR, keep_files=False):
+        """Import the output_<timestamp>.json files written by earlier versions and return how many.
+
+        Files are deleted once imported unless keep_files is set; unreadable
+        files and files older than the retention period are left in place.
+        """
+        cutoff = None if self.retention_days is None else time.time() - self.retention_days * 24 * 60 * 60
+        imported = 0
+        for json_path in sorted(pathlib.Path(directory).glob("output_*.json")):
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    extracted_data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {json_path.name}: {e}")
+                continue
+            if not isinstance(extracted_data, dict):
+                print(f"Skipping {json_path.name}: not an extraction")
+                continue
+
+            # Older runs saved the GUI inputs alongside the extraction
+            gui_data = extracted_data.pop('gui_data', None) or {}
+            source_file = gui_data.get('quotation_file')
+            try:
+                created_at = datetime.strptime(json_path.stem, "output_%Y%m%d_%H%M%S").timestamp()
+            except ValueError:
+                created_at = json_path.stat().st_mtime
+            if cutoff is not None and created_at < cutoff:
+                # Imported, it would be pruned on the next write and the file lost with it
+                print(f"Skipping {json_path.name}: older than the {self.retention_days}-day retention period")
+                continue
+            sha256 = None
+            if source_file and pathlib.Path(source_file).is_file():
+                sha256 = pdf_sha256(pathlib.Path(source_file).read_bytes())
+
+            # Pruning mid-import could delete rows whose files are then unlinked
+            self.add(extracted_data, source_file=source_file, po_number=gui_data.get('po_number'),
+                     created_at=created_at, sha256=sha256, prune=False)
+            imported += 1
+            if not keep_files:
+                json_path.unlink()
+        return imported
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+def print_summaries(summaries):
+    if not summaries:
+        print("No matching extractions.")
+        return
+    print(f"{'id':>6}  {'date':<16}  {'quotation':<16} {'supplier':<28} {'items':>5}  PO numbers")
+    for summary in summaries:
+        date = datetime.fromtimestamp(summary['created_at']).strftime("%Y-%m-%d %H:%M")
+        print(f"{summary['id']:>6}  {date:<16}  {summary['quotation_number'] or '':<16} "
+              f"{(summary['supplier_name'] or '')[:28]:<28} {summary['item_count']:>5}  "
+              f"{', '.join(summary['po_numbers'])}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search and maintain the extraction archive")
+    parser.add_argument('--archive', default=ARCHIVE_PATH, help="Archive database to use")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    find_parser = subparsers.add_parser('find', help="List matching extractions, newest first")
+    find_parser.add_argument('--quotation', help="Quotation number")
+    find_parser.add_argument('--supplier', help="Supplier name or its beginning")
+    find_parser.add_argument('--po', help="PO number generated from the extraction")
+    find_parser.add_argument('--pdf', help="Quotation PDF, matched by content")
+    find_parser.add_argument('--since', type=_parse_date, help="YYYY-MM-DD")
+    find_parser.add_argument('--until', type=_parse_date, help="YYYY-MM-DD (exclusive)")
+    find_parser.add_argument('--limit', type=int, default=50)
+
+    show_parser = subparsers.add_parser('show', help="Print an archived extraction as JSON")
+    show_parser.add_argument('id', type=int)
+
+    migrate_parser = subparsers.add_parser('migrate', help="Import output_*.json files from the jsons folder")
+    migrate_parser.add_argument('--directory', default=JSONS_DIR)
+    migrate_parser.add_argument('--keep-files', action='store_true', help="Leave the JSON files in place")
+
+    prune_parser = subparsers.add_parser('prune', help="Delete extractions past the retention period")
+    prune_parser.add_argument('--days', type=float, default=ARCHIVE_RETENTION_DAYS)
+    args = parser.parse_args(argv)
+
+    archive = ExtractionArchive(args.archive)
+    if args.command == 'find':
+        pdf_bytes = pathlib.Path(args.pdf).read_bytes() if args.pdf else None
+        print_summaries(archive.find(args.quotation, args.supplier, args.po, pdf_bytes,
+                                     since=args.since, until=args.until, limit=args.limit))
+    elif args.command == 'show':
+        extracted_data = archive.get(args.id)
+        if extracted_data is None:
+            print(f"No archived extraction with id {args.id}.")
+            return 1
+        print(json.dumps(extracted_data, indent=2, ensure_ascii=False))
+    elif args.command == 'migrate':
+        print(f"Imported {archive.migrate_json_files(args.directory, args.keep_files)} file(s) into {archive.path}")
+    elif args.command == 'prune':
+        print(f"Deleted {archive.prune(args.days)} extraction(s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
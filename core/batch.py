@@ -0,0 +1,256 @@
+"""Headless batch mode: turn a folder of quotation PDFs into purchase orders.
+
+Usage:
+    python -m core.batch "quotes/*.pdf" --manifest headers.csv --output out/
+"""
+import argparse
+import asyncio
+import csv
+import functools
+import glob
+import json
+import pathlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config.settings import (
+    BATCH_MAX_WORKERS, GEMINI_REQUESTS_PER_MINUTE, EXCEL_RENDER_BACKEND, EXCEL_RENDER_PROCESSES,
+    GEMINI_RESPONSE_MODE, RECORDINGS_DIR
+)
+from core.pdf_processor import PDFProcessor
+from core.excel_generator import ExcelGenerator
+from core.rate_limit import RateLimiter
+from core.render_pool import ProcessRenderPool
+from core.utils import extract_project_number, percentile, safe_filename
+
+HEADER_FIELDS = [
+    'po_number',
+    'project_name',
+    'po_issue_date',
+    'purchaser_name',
+    'purchaser_phone',
+    'director_manager',
+]
+
+def collect_pdfs(sources):
+    """Expand directories and glob patterns into a sorted list of PDF paths"""
+    pdfs = set()
+    for source in sources:
+        path = pathlib.Path(source)
+        if path.is_dir():
+            pdfs.update(p for p in path.iterdir() if p.suffix.lower() == '.pdf')
+        else:
+            pdfs.update(pathlib.Path(match) for match in glob.glob(source))
+    return sorted(pdfs)
+
+def load_manifest(manifest_path):
+    """Load header fields keyed by PDF file name from a CSV or JSON manifest.
+
+    Each row names its quotation in a 'file' column (file name or stem);
+    a row with file '*' supplies defaults for every quotation.
+    """
+    manifest_path = pathlib.Path(manifest_path)
+    if manifest_path.suffix.lower() == '.json':
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = [dict(row, file=name) for name, row in rows.items()]
+    else:
+        with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    manifest = {}
+    for row in rows:
+        name = (row.get('file') or '').strip()
+        if name:
+            manifest[name] = {k: v for k, v in row.items() if k != 'file' and v not in (None, '')}
+    return manifest
+
+def build_gui_data(pdf_path, manifest):
+    """Build the gui_data dict the GUI would have produced for this quotation"""
+    row = dict(manifest.get('*', {}))
+    row.update(manifest.get(pdf_path.name, manifest.get(pdf_path.stem, {})))
+
+    gui_data = {field: str(row.get(field, '')) for field in HEADER_FIELDS}
+    if not gui_data['po_issue_date']:
+        gui_data['po_issue_date'] = datetime.now().strftime("%d/%m/%Y")
+    gui_data['project_number'] = extract_project_number(gui_data['po_number'])
+    gui_data['quotation_file'] = str(pdf_path)
+    return gui_data
+
+class BatchRunner:
+    def __init__(self, output_dir, max_workers=BATCH_MAX_WORKERS, use_cache=True, refresh_cache=False,
+                 requests_per_minute=GEMINI_REQUESTS_PER_MINUTE, pdf_processor=None, backend=EXCEL_RENDER_BACKEND,
+                 response_mode=GEMINI_RESPONSE_MODE, recordings_dir=RECORDINGS_DIR,
+                 render_processes=EXCEL_RENDER_PROCESSES):
+        self.output_dir = pathlib.Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.use_cache = use_cache
+        self.refresh_cache = refresh_cache
+        self.pdf_processor = pdf_processor or PDFProcessor(
+            rate_limiter=None if response_mode == 'replay' else RateLimiter(requests_per_minute, max_workers),
+            response_mode=response_mode,
+            recordings_dir=recordings_dir
+        )
+        # With render processes, openpyxl renders run in parallel instead of taking turns on the GIL
+        self.process_pool = ProcessRenderPool(render_processes, backend) if render_processes else None
+        self.excel_generator = self.process_pool or ExcelGenerator(backend=backend)
+
+    def run(self, pdf_paths, manifest):
+        """Process every PDF with a bounded worker pool and return the summary report"""
+        jobs = []
+        used_names = set()
+        for pdf_path in pdf_paths:
+            gui_data = build_gui_data(pdf_path, manifest)
+            jobs.append((pdf_path, gui_data, self._output_path(pdf_path, gui_data, used_names)))
+
+        start_time = time.perf_counter()
+        if self.process_pool is not None:
+            # Workers parse the template while the first extractions are in flight
+            self.process_pool.warm_up(wait=False)
+        try:
+            results = asyncio.run(self._run_async(jobs))
+        finally:
+            if self.process_pool is not None:
+                self.process_pool.shutdown()
+        wall_seconds = time.perf_counter() - start_time
+
+        return self._summarize(results, wall_seconds)
+
+    async def _run_async(self, jobs):
+        # Extraction is awaited under the shared rate limiter, rendering runs on a thread pool
+        semaphore = asyncio.Semaphore(self.max_workers)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as render_pool:
+            async def bounded(job):
+                async with semaphore:
+                    return await self._process_one(render_pool, *job)
+            return await asyncio.gather(*(bounded(job) for job in jobs))
+
+    def _output_path(self, pdf_path, gui_data, used_names):
+        """Name the PO after its PO number, adding the PDF name and then a counter on clashes"""
+        stem = safe_filename(pdf_path.stem)
+        base_name = safe_filename(gui_data['po_number'] or '') or stem
+        if base_name.lower() in used_names:
+            base_name = f"{base_name}_{stem}"
+        # Compared case-insensitively, as on Windows and macOS file systems
+        name = base_name
+        counter = 1
+        while name.lower() in used_names:
+            counter += 1
+            name = f"{base_name}_{counter}"
+        used_names.add(name.lower())
+        return self.output_dir / f"{name}.xlsx"
+
+    async def _process_one(self, render_pool, pdf_path, gui_data, output_path):
+        result = {
+            'file': str(pdf_path),
+            'po_number': gui_data['po_number'],
+            'output': None,
+            'status': 'failed',
+            'error': None,
+        }
+        start_time = time.perf_counter()
+        try:
+            extracted_data = await self.pdf_processor.extract_po_data_async(
+                pdf_path, gui_data, use_cache=self.use_cache, refresh_cache=self.refresh_cache
+            )
+            extracted_time = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(
+                render_pool,
+                functools.partial(self.excel_generator.render, extracted_data, output_path=output_path)
+            )
+            finished_time = time.perf_counter()
+
+            result.update({
+                'output': str(output_path),
+                'status': 'done',
+                'item_count': len(extracted_data.get('items', [])),
+                'extract_seconds': round(extracted_time - start_time, 3),
+                'render_seconds': round(finished_time - extracted_time, 3),
+            })
+        except Exception as e:
+            result['error'] = str(e) or type(e).__name__
+        result['total_seconds'] = round(time.perf_counter() - start_time, 3)
+        return result
+
+    def _summarize(self, results, wall_seconds):
+        succeeded = [r for r in results if r['status'] == 'done']
+        latencies = [r['total_seconds'] for r in succeeded]
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'workers': self.max_workers,
+            'total': len(results),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'wall_seconds': round(wall_seconds, 3),
+            'pos_per_minute': round(len(succeeded) / wall_seconds * 60, 2) if wall_seconds > 0 else 0.0,
+            'latency_p50_seconds': round(percentile(latencies, 50), 3),
+            'latency_p95_seconds': round(percentile(latencies, 95), 3),
+            'jobs': results,
+        }
+
+def print_summary(summary):
+    print()
+    print(f"Processed {summary['total']} quotation(s): "
+          f"{summary['succeeded']} succeeded, {summary['failed']} failed")
+    print(f"Wall time: {summary['wall_seconds']:.1f}s with {summary['workers']} worker(s)")
+    print(f"Throughput: {summary['pos_per_minute']:.2f} POs/minute")
+    print(f"Latency: p50 {summary['latency_p50_seconds']:.2f}s, p95 {summary['latency_p95_seconds']:.2f}s")
+    for job in summary['jobs']:
+        if job['status'] != 'done':
+            print(f"❌ {job['file']}: {job['error']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate purchase orders for a batch of quotation PDFs")
+    parser.add_argument('sources', nargs='+', help="PDF files, directories or glob patterns")
+    parser.add_argument('-m', '--manifest', required=True, help="CSV or JSON manifest of header fields")
+    parser.add_argument('-o', '--output', default='output', help="Directory for the generated POs")
+    parser.add_argument('-w', '--workers', type=int, default=BATCH_MAX_WORKERS, help="Number of concurrent jobs")
+    parser.add_argument('--rpm', type=int, default=GEMINI_REQUESTS_PER_MINUTE, help="Gemini requests per minute")
+    parser.add_argument('--backend', choices=['openpyxl', 'xml'], default=EXCEL_RENDER_BACKEND,
+                        help="Excel render backend")
+    parser.add_argument('--render-processes', type=int, default=EXCEL_RENDER_PROCESSES,
+                        help="Render in this many worker processes (0 renders on threads)")
+    parser.add_argument('--no-cache', action='store_true', help="Bypass the extraction cache")
+    parser.add_argument('--refresh-cache', action='store_true', help="Re-extract and overwrite cached results")
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--record', action='store_const', const='record', dest='response_mode',
+                            help="Save every Gemini response for later replay (implies --refresh-cache)")
+    mode_group.add_argument('--replay', action='store_const', const='replay', dest='response_mode',
+                            help="Serve recorded Gemini responses instead of calling the API")
+    parser.add_argument('--recordings', default=RECORDINGS_DIR, help="Directory of recorded responses")
+    parser.set_defaults(response_mode=GEMINI_RESPONSE_MODE)
+    args = parser.parse_args(argv)
+
+    pdf_paths = collect_pdfs(args.sources)
+    if not pdf_paths:
+        print("No PDF files found.")
+        return 1
+
+    runner = BatchRunner(
+        args.output,
+        max_workers=max(1, args.workers),
+        use_cache=not args.no_cache,
+        # A cache hit sends no request, so there would be nothing to record
+        refresh_cache=args.refresh_cache or args.response_mode == 'record',
+        requests_per_minute=args.rpm,
+        backend=args.backend,
+        response_mode=args.response_mode,
+        recordings_dir=args.recordings,
+        render_processes=args.render_processes,
+    )
+    summary = runner.run(pdf_paths, load_manifest(args.manifest))
+
+    summary_path = runner.output_dir / "summary.json"
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+    print_summary(summary)
+    print(f"Summary report: {summary_path}")
+    return 0 if summary['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
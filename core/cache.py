@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+
+from config.settings import CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES, EXTRACTION_CACHE_MAX_AGE_DAYS
+
+def pdf_sha256(pdf_bytes):
+    """Return the hex SHA-256 digest of the PDF bytes"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+class ExtractionCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+                 max_age_days=EXTRACTION_CACHE_MAX_AGE_DAYS):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+
+    @staticmethod
+    def make_key(pdf_bytes, prompt, model, temperature, top_p):
+        """Build the cache key from the PDF content and everything that affects the response"""
+        fingerprint = {
+            'pdf_sha256': pdf_sha256(pdf_bytes),
+            'prompt': prompt,
+            'model': model,
+            'temperature': temperature,
+            'top_p': top_p,
+        }
+        payload = json.dumps(fingerprint, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached extraction for key, or None on a miss"""
+        entry_path = self._entry_path(key)
+        try:
+            if time.time() - entry_path.stat().st_mtime > self.max_age_seconds:
+                entry_path.unlink()
+                return None
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            # Touch the entry so size-based eviction drops the least recently used first
+            os.utime(entry_path)
+            return entry['extraction']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def contains(self, key):
+        """Return whether an unexpired extraction is cached under key, without reading it"""
+        try:
+            return time.time() - self._entry_path(key).stat().st_mtime <= self.max_age_seconds
+        except OSError:
+            return False
+
+    def put(self, key, extracted_data):
+        """Store an extraction under key and evict old entries"""
+        entry = {
+            'created_at': time.time(),
+            'extraction': extracted_data,
+        }
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            print(f"Error writing extraction cache: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then the least recently used until under max_bytes"""
+        now = time.time()
+        entries = []
+        for entry_path in self.cache_dir.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                self._remove(entry_path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            self._remove(entry_path)
+            total_size -= size
+
+    def clear(self):
+        """Remove every cached extraction"""
+        for entry_path in self.cache_dir.glob("*.json"):
+            self._remove(entry_path)
+
+    @staticmethod
+    def _remove(entry_path):
+        try:
+            entry_path.unlink()
+        except OSError:
+            pass
@@ -1,50 +1,175 @@
+import io
 import os
-import shutil
+import pathlib
+import threading
+import time
 from copy import copy
-import openpyxl
-from openpyxl.worksheet.pagebreak import Break, PageBreak
 from datetime import datetime, timedelta
 
-from config.settings import TEMPLATE_PATH, TEMP_DIR, EXCEL_START_ROW, EXCEL_TABLE_END_ROW, ROWS_PER_ITEM
+from config.settings import (
+    TEMP_DIR, TEMP_SWEEP_MIN_AGE_SECONDS, EXCEL_START_ROW, EXCEL_TABLE_END_ROW, ROWS_PER_ITEM, EXCEL_RENDER_BACKEND
+)
+from core.metrics import default_metrics
+from core.progress import publish, ROWS_WRITTEN
+from core.template_pool import default_template_pool
+from core.xml_renderer import default_xml_template
 from core.utils import format_address_for_excel, number_to_ringgit
 
+# Files earlier versions left in TEMP_DIR when a save was cancelled
+TEMP_FILE_PATTERNS = ("temp_po_*.xlsx", "po_job*.xlsx")
+
+def sweep_temp_files(directory=TEMP_DIR, min_age_seconds=TEMP_SWEEP_MIN_AGE_SECONDS):
+    """Delete orphaned PO files from the temp folder and return how many were removed"""
+    removed = 0
+    cutoff = time.time() - min_age_seconds
+    for pattern in TEMP_FILE_PATTERNS:
+        for path in pathlib.Path(directory).glob(pattern):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass  # In use or already gone
+    return removed
+
+class RenderedPO:
+    """A finished workbook held in memory until it is saved.
+
+    Carries the workbook bytes, the path once saved, the item count, the total
+    of the item lines and the per-stage render timings in seconds.
+    """
+
+    def __init__(self, data, item_count, total=0, timings=None):
+        self.data = data
+        self.item_count = item_count
+        self.total = total
+        self.timings = dict(timings or {})
+        self.path = None
+
+    def save(self, path):
+        """Write the workbook to path in one go, replacing any existing file atomically"""
+        path = pathlib.Path(path)
+        # Unique per thread, so concurrent saves to one destination never share a temp file
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self.path = path
+        return path
+
+    def deliver(self, output):
+        """Save to a path or write into a file object; None keeps the workbook in memory only"""
+        if output is None:
+            return self
+        if hasattr(output, 'write'):
+            output.write(self.data)
+        else:
+            self.save(output)
+        return self
+
 class ExcelGenerator:
-    def __init__(self):
-        self.temp_filepath = None
+    """Fills the PO template from an extraction.
+
+    render() keeps no state, so one generator can serve any number of threads
+    against the shared template. generate_po_excel() also remembers the PO for
+    update_header(), which is what the single-PO GUI flow needs.
+    """
 
-    def generate_po_excel(self, po_data):
+    def __init__(self, template_pool=None, backend=EXCEL_RENDER_BACKEND, xml_template=None, metrics=None):
+        self.last_render = None
+        self.template_pool = template_pool or default_template_pool
+        self.backend = backend
+        self.xml_template = xml_template or default_xml_template
+        self.metrics = metrics or default_metrics
+
+    def render(self, po_data, gui_data=None, output_path=None):
+        """Render the PO and return a RenderedPO, also saved to output_path when one is given.
+
+        Safe to call from several threads at once on the same generator.
+        """
+        return self._render(po_data, gui_data, output_path)[0]
+
+    def generate_po_excel(self, po_data, output_path=None, gui_data=None, streaming_po=None):
+        """Render the PO like render() and keep it for update_header().
+
+        streaming_po, from start_po(), completes a PO already filled in while
+        the extraction streamed in.
+        """
+        rendered, workbook = self._render(po_data, gui_data, output_path, streaming_po)
+        self.last_render = (po_data, workbook, rendered.total)
+        return rendered
+
+    def _render(self, po_data, gui_data, output_path, streaming_po=None):
         print("Converting JSON to Excel...")
-        
-        # Create temporary file
-        self.temp_filepath = TEMP_DIR / f"temp_po_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        gui_data = po_data.get('gui_data', {})
-        
-        try:
-            workbook = openpyxl.load_workbook(TEMPLATE_PATH)
-            sheet = workbook.active
+        if streaming_po is None:
+            # Header fields come from gui_data when given, otherwise from the extraction
+            if gui_data is None:
+                gui_data = po_data.get('gui_data', {})
+            streaming_po = self.start_po(gui_data)
+        return streaming_po.finish(po_data, output_path), streaming_po.workbook
 
-            # Populate header with GUI data
-            self._populate_header(sheet, gui_data)
-            
-            # Populate supplier information from quote
-            self._populate_supplier_info(sheet, po_data, gui_data)
-            
-            # Populate items table
-            total_cost = self._populate_items_table(sheet, po_data)
-            
-            # Add totals and formatting
-            self._add_totals_and_formatting(sheet, total_cost, po_data)
-            
-            # Save to temporary file
-            workbook.save(self.temp_filepath)
-            print(f"✅ Successfully created temporary PO: {self.temp_filepath}")
-            
-            return self.temp_filepath
+    def start_po(self, gui_data):
+        """Begin a PO whose extraction is still arriving; see StreamingPO"""
+        return StreamingPO(self, gui_data)
 
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            raise
+    def warm_up(self):
+        """Parse the template ahead of the first render"""
+        if self.backend == "xml":
+            self.xml_template.compiled()
+        else:
+            self.template_pool.checkout()
+
+    def update_header(self, gui_data, output_path=None):
+        """Re-render the last PO with new header fields, patching only the cells that depend on them"""
+        if self.last_render is None:
+            raise ValueError("No purchase order has been generated yet")
+        po_data, workbook, total = self.last_render
+        po_data = dict(po_data, gui_data=gui_data)
+        if workbook is None:
+            # The XML backend renders in a single pass, so rendering again is just as cheap
+            return self.generate_po_excel(po_data, output_path)
+
+        print("Updating PO header...")
+        with self.metrics.record('header_update', item_count=len(po_data.get('items', []))) as record:
+            with record.stage('header'):
+                sheet = workbook.active
+                self._populate_header(sheet, gui_data)
+                self._write_delivery_date(sheet, po_data, gui_data)
+                self._write_signatures(sheet, gui_data, self._final_table_row(len(po_data.get('items', []))))
+            with record.stage('save'):
+                data = save_to_bytes(workbook)
+        rendered = RenderedPO(data, len(po_data.get('items', [])), total, record.stages).deliver(output_path)
+        self.last_render = (po_data, workbook, total)
+        report_created(output_path)
+        return rendered
+
+    def _render_xml(self, po_data, gui_data, output):
+        """Render through the direct XML backend, writing the same cells as the openpyxl path"""
+        # The _populate/_write helpers only assign sheet[coordinate], so a dict collects the values
+        cell_values = {}
+        self._populate_header(cell_values, gui_data)
+        self._populate_supplier_info(cell_values, po_data, gui_data)
+
+        items_list = po_data.get('items', [])
+        total_cost = self._write_items(cell_values, items_list)
+        final_table_row = self._final_table_row(len(items_list))
+        self._write_totals(cell_values, total_cost, gui_data, final_table_row)
+
+        self.xml_template.render(
+            output,
+            cell_values,
+            insert_at=EXCEL_TABLE_END_ROW + 1,
+            insert_rows=final_table_row - EXCEL_TABLE_END_ROW,
+            style_rows=(EXCEL_TABLE_END_ROW - 1, EXCEL_TABLE_END_ROW),
+            page_break_row=self._page_break_row(final_table_row)
+        )
+        return total_cost
 
     def _populate_header(self, sheet, gui_data):
         """Populate header information from GUI data"""
@@ -70,7 +195,12 @@ class ExcelGenerator:
         sheet['A18'] = 'N/A'
         sheet['A21'] = po_data.get('terms', {}).get('payment')
         
-        # Calculate delivery date
+        self._write_delivery_date(sheet, po_data, gui_data)
+        
+        sheet['D29'] = f"With reference to your quotation {po_data.get('quotationNumber', '')}:"
+
+    def _write_delivery_date(self, sheet, po_data, gui_data):
+        """Write the delivery date, counted from the PO issue date"""
         delivery_weeks_str = str(po_data.get('terms', {}).get('deliveryWeeks', '0'))
         delivery_weeks_int = int(delivery_weeks_str) if delivery_weeks_str.isdigit() else 0
         if delivery_weeks_int > 0:
@@ -78,71 +208,88 @@ class ExcelGenerator:
             issue_date_obj = datetime.strptime(po_issue_date, "%d/%m/%Y")
             delivery_date = issue_date_obj + timedelta(weeks=delivery_weeks_int)
             sheet['H24'] = delivery_date.strftime("%d/%m/%Y")
-        
-        sheet['D29'] = f"With reference to your quotation {po_data.get('quotationNumber', '')}:"
-
-    def _populate_items_table(self, sheet, po_data):
-        """Populate items table and return total cost"""
-        items_list = po_data.get('items', [])
-        start_row = EXCEL_START_ROW
-        table_end_row = EXCEL_TABLE_END_ROW
-        
-        num_items_to_add = len(items_list)
-        available_item_slots = (table_end_row - start_row + 1) // ROWS_PER_ITEM
-
-        # Expand table if needed
-        if num_items_to_add > available_item_slots:
-            self._expand_items_table(sheet, num_items_to_add, available_item_slots, table_end_row)
 
+    def _write_items(self, sheet, items_list, first_index=0):
+        """Write item rows from EXCEL_START_ROW and return the total cost"""
         total_cost_calculated = 0
+        total_rows = first_index + len(items_list)
+        # About a hundred progress events per PO, however many items it has
+        report_every = max(1, total_rows // 100)
         
         # Populate items data
-        for index, item in enumerate(items_list):
-            current_row = start_row + index * 2
-            quantity = item.get('quantity') or 0
-            unit_price = item.get('unitPrice') or 0
-            line_total = quantity * unit_price
-            total_cost_calculated += line_total
-
-            sheet[f'A{current_row}'] = index + 1
-            sheet[f'B{current_row}'] = quantity
-            sheet[f'C{current_row}'] = item.get('unit')
-            sheet[f'D{current_row}'] = item.get('description')
-            sheet[f'H{current_row}'] = unit_price
-            sheet[f'I{current_row}'] = line_total
+        for index, item in enumerate(items_list, first_index):
+            total_cost_calculated += self._write_item(sheet, index, item)
+            if (index + 1) % report_every == 0 or index + 1 == total_rows:
+                publish(ROWS_WRITTEN, done=index + 1, total=total_rows)
 
         return total_cost_calculated
 
+    def _write_item(self, sheet, index, item):
+        """Write one item row and return its line total"""
+        current_row = EXCEL_START_ROW + index * 2
+        quantity = item.get('quantity') or 0
+        unit_price = item.get('unitPrice') or 0
+        line_total = quantity * unit_price
+
+        sheet[f'A{current_row}'] = index + 1
+        sheet[f'B{current_row}'] = quantity
+        sheet[f'C{current_row}'] = item.get('unit')
+        sheet[f'D{current_row}'] = item.get('description')
+        sheet[f'H{current_row}'] = unit_price
+        sheet[f'I{current_row}'] = line_total
+        return line_total
+
     def _expand_items_table(self, sheet, num_items_to_add, available_item_slots, table_end_row):
         """Expand the items table if there are more items than available slots"""
         num_rows_to_insert = (num_items_to_add - available_item_slots) * ROWS_PER_ITEM
         insertion_point = table_end_row + 1
 
-        merges_to_shift = []
-        for merged_range in sheet.merged_cells.ranges:
-            if merged_range.min_row >= insertion_point:
-                merges_to_shift.append(merged_range)
-
-        # Unmerge cells before inserting rows
-        for merged_range in merges_to_shift:
-            sheet.unmerge_cells(str(merged_range))
+        # Move the footer to its final position in a single pass
+        self._shift_rows_down(sheet, insertion_point, num_rows_to_insert)
 
-        # Insert blank rows
-        sheet.insert_rows(insertion_point, amount=num_rows_to_insert)
-
-        # Re-apply merges at new locations
-        for merged_range in merges_to_shift:
-            merged_range.shift(0, num_rows_to_insert)
-            sheet.merge_cells(str(merged_range))
-
-        # Copy styles to new rows
+        # Style the new rows from the table's last blank/item row pair
+        blank_row_cells = self._styled_cells(sheet, table_end_row - 1)
+        item_row_cells = self._styled_cells(sheet, table_end_row)
         for i in range(0, num_rows_to_insert, ROWS_PER_ITEM):
             new_blank_row_num = table_end_row + i + 1
             new_item_row_num = table_end_row + i + 2
-            self._copy_row_style(sheet, table_end_row - 1, new_blank_row_num)
-            self._copy_row_style(sheet, table_end_row, new_item_row_num)
+            self._copy_row_style(sheet, table_end_row - 1, new_blank_row_num, blank_row_cells)
+            self._copy_row_style(sheet, table_end_row, new_item_row_num, item_row_cells)
+
+    def _shift_rows_down(self, sheet, first_row, offset):
+        """Move every cell, merged range and row height from first_row downwards by offset rows"""
+        shifted_cells = {}
+        for (row, column), cell in sheet._cells.items():
+            if row >= first_row:
+                row += offset
+                cell.row = row
+            shifted_cells[(row, column)] = cell
+        sheet._cells = shifted_cells
+
+        merged_ranges = list(sheet.merged_cells.ranges)
+        for merged_range in merged_ranges:
+            if merged_range.min_row >= first_row:
+                merged_range.shift(0, offset)
+        # Shifting changes the ranges' hashes, so rebuild the set
+        sheet.merged_cells.ranges = set(merged_ranges)
+
+        moved_dimensions = [
+            (row, dimension) for row, dimension in sheet.row_dimensions.items() if row >= first_row
+        ]
+        for row, _ in moved_dimensions:
+            del sheet.row_dimensions[row]
+        for row, dimension in moved_dimensions:
+            dimension.index = row + offset
+            sheet.row_dimensions[row + offset] = dimension
+
+    def _styled_cells(self, sheet, row_num):
+        """Return the styled cells of a row, left to right"""
+        return sorted(
+            (cell for (row, _), cell in sheet._cells.items() if row == row_num and cell.has_style),
+            key=lambda cell: cell.column
+        )
 
-    def _add_totals_and_formatting(self, sheet, total_cost, po_data):
+    def _add_totals_and_formatting(self, sheet, total_cost, po_data, gui_data):
         """Add totals, formatting, and signatures"""
         items_list = po_data.get('items', [])
         num_items = len(items_list)
@@ -150,11 +297,28 @@ class ExcelGenerator:
         print(f"Avaliable item slots: {(EXCEL_TABLE_END_ROW - EXCEL_START_ROW + 1) // ROWS_PER_ITEM}")
         if num_items > ((EXCEL_TABLE_END_ROW - EXCEL_START_ROW + 1) // ROWS_PER_ITEM):
             print("Expanding table for totals and formatting...")
-            final_table_row = EXCEL_START_ROW + (num_items * ROWS_PER_ITEM) - 1
         else:
             print("Using existing table for totals and formatting...")
-            final_table_row = EXCEL_TABLE_END_ROW
-        
+        final_table_row = self._final_table_row(num_items)
+
+        self._write_totals(sheet, total_cost, gui_data, final_table_row)
+
+        # Add page break
+        from openpyxl.worksheet.pagebreak import Break, PageBreak
+        sheet.row_breaks = PageBreak()
+        sheet.row_breaks.append(Break(id=self._page_break_row(final_table_row)))
+
+    def _final_table_row(self, num_items):
+        """Return the last row of the items table for num_items items"""
+        if num_items > ((EXCEL_TABLE_END_ROW - EXCEL_START_ROW + 1) // ROWS_PER_ITEM):
+            return EXCEL_START_ROW + (num_items * ROWS_PER_ITEM) - 1
+        return EXCEL_TABLE_END_ROW
+
+    def _page_break_row(self, final_table_row):
+        return final_table_row + 13
+
+    def _write_totals(self, sheet, total_cost, gui_data, final_table_row):
+        """Write the total, total in words and signature names below the items table"""
         # Add total cost
         total_cost_row = final_table_row + 1
         sheet[f'I{total_cost_row}'] = f"=SUM(I{EXCEL_START_ROW}:I{final_table_row})"
@@ -163,39 +327,130 @@ class ExcelGenerator:
         total_cost_in_words_row = final_table_row + 3
         sheet[f'E{total_cost_in_words_row}'] = number_to_ringgit(total_cost)
         
-        # Add signatures
+        self._write_signatures(sheet, gui_data, final_table_row)
+
+    def _write_signatures(self, sheet, gui_data, final_table_row):
+        """Write the purchaser and manager names in the signature block"""
         name_rows = final_table_row + 10
-        gui_data = po_data.get('gui_data', {})
         sheet[f'G{name_rows}'] = gui_data.get('purchaser_name', '')
         sheet[f'H{name_rows}'] = gui_data.get('director_manager', '')
 
-        # Add page break
-        sheet.row_breaks = PageBreak()
-        page_break_row = final_table_row + 13
-        sheet.row_breaks.append(Break(id=page_break_row))
-
-    def _copy_row_style(self, ws, source_row_num, dest_row_num):
+    def _copy_row_style(self, ws, source_row_num, dest_row_num, source_cells=None):
         """Copy row style from source to destination"""
-        source_row = ws[source_row_num]
-        dest_row = ws[dest_row_num]
+        if source_cells is None:
+            source_cells = self._styled_cells(ws, source_row_num)
 
         ws.row_dimensions[dest_row_num].height = ws.row_dimensions[source_row_num].height
 
-        for cell in source_row:
-            new_cell = dest_row[cell.col_idx - 1]
-            if cell.has_style:
-                new_cell.font = copy(cell.font)
-                new_cell.border = copy(cell.border)
-                new_cell.fill = copy(cell.fill)
-                new_cell.number_format = cell.number_format
-                new_cell.protection = copy(cell.protection)
-                new_cell.alignment = copy(cell.alignment)
-
-    def cleanup_temp_file(self):
-        """Clean up temporary file"""
-        if self.temp_filepath and os.path.exists(self.temp_filepath):
-            try:
-                os.remove(self.temp_filepath)
-            except:
-                pass  # Ignore cleanup errors
-        self.temp_filepath = None
\ No newline at end of file
+        for cell in source_cells:
+            # Share the source cell's style indices instead of copying each style object
+            ws.cell(row=dest_row_num, column=cell.column)._style = copy(cell._style)
+
+
+def report_created(output_path):
+    print(f"✅ Successfully created PO: {output_path if output_path is not None else 'in memory'}")
+
+def save_to_bytes(workbook):
+    """Serialise an openpyxl workbook without touching the disk"""
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+class StreamingPO:
+    """A PO filled in while its extraction streams in.
+
+    With the openpyxl backend the template is checked out straight away, the
+    supplier header is written when it arrives and items go into the template's
+    item slots as they arrive. Items beyond the slots are laid out by finish()
+    in one pass once the table size is known. The XML backend renders in a
+    single pass, so it simply collects the data until finish().
+    """
+
+    def __init__(self, generator, gui_data):
+        self.generator = generator
+        self.gui_data = gui_data
+        self.written_items = []
+        self.total_cost = 0
+        self.workbook = None
+        self.sheet = None
+        self.record = generator.metrics.start('render', backend=generator.backend)
+        if generator.backend != "xml":
+            with self.record.stage('template_load'):
+                self.workbook = generator.template_pool.checkout()
+                self.sheet = self.workbook.active
+            with self.record.stage('header'):
+                generator._populate_header(self.sheet, gui_data)
+
+    @property
+    def available_item_slots(self):
+        return (EXCEL_TABLE_END_ROW - EXCEL_START_ROW + 1) // ROWS_PER_ITEM
+
+    def set_header(self, header):
+        """Write the supplier details from the header fields of the extraction"""
+        if self.sheet is not None:
+            with self.record.stage('header'):
+                self.generator._populate_supplier_info(self.sheet, header, self.gui_data)
+
+    def add_item(self, index, item):
+        """Write an item into its template slot if it has one, otherwise leave it for finish()"""
+        if self.sheet is not None and index == len(self.written_items) and index < self.available_item_slots:
+            with self.record.stage('items'):
+                self.total_cost += self.generator._write_item(self.sheet, index, item)
+            self.written_items.append(item)
+            # The item count is only known once the extraction is complete
+            publish(ROWS_WRITTEN, done=index + 1, total=None)
+
+    def finish(self, po_data, output_path=None):
+        """Complete the PO from the full extraction and return it as a RenderedPO"""
+        generator = self.generator
+        record = self.record
+        items_list = po_data.get('items', [])
+        record.note(item_count=len(items_list))
+
+        try:
+            if self.sheet is None:
+                with record.stage('render_xml'):
+                    buffer = io.BytesIO()
+                    total_cost = generator._render_xml(po_data, self.gui_data, buffer)
+                with record.stage('save'):
+                    rendered = RenderedPO(buffer.getvalue(), len(items_list), total_cost).deliver(output_path)
+                rendered.timings = dict(record.stages)
+                record.finish()
+                report_created(output_path)
+                return rendered
+
+            sheet = self.sheet
+
+            # Populate supplier information from quote
+            with record.stage('header'):
+                generator._populate_supplier_info(sheet, po_data, self.gui_data)
+
+            # Populate the items not yet written, expanding the table if needed
+            items_written = len(self.written_items)
+            if items_list[:items_written] != self.written_items:
+                # The final items disagree with the streamed ones, so rewrite them all
+                items_written = 0
+                self.total_cost = 0
+            if len(items_list) > self.available_item_slots:
+                with record.stage('expand_table'):
+                    generator._expand_items_table(sheet, len(items_list), self.available_item_slots, EXCEL_TABLE_END_ROW)
+            with record.stage('items'):
+                total_cost = self.total_cost + generator._write_items(sheet, items_list[items_written:], items_written)
+
+            # Add totals and formatting
+            with record.stage('totals'):
+                generator._add_totals_and_formatting(sheet, total_cost, po_data, self.gui_data)
+
+            # Serialise in memory; the file is written once, at its final destination
+            with record.stage('save'):
+                rendered = RenderedPO(save_to_bytes(self.workbook), len(items_list), total_cost).deliver(output_path)
+            rendered.timings = dict(record.stages)
+            record.finish()
+            report_created(output_path)
+
+            return rendered
+
+        except Exception as e:
+            record.finish(error=e)
+            print(f"An unexpected error occurred: {e}")
+            raise
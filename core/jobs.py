@@ -0,0 +1,188 @@
+import itertools
+import pathlib
+import queue
+import threading
+import time
+
+from config.settings import JOB_QUEUE_MAX_WORKERS
+
+JOB_QUEUED = 'queued'
+JOB_EXTRACTING = 'extracting'
+JOB_RENDERING = 'rendering'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = {JOB_DONE, JOB_FAILED, JOB_CANCELLED}
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    """One quotation to turn into a purchase order, with its own header fields"""
+
+    def __init__(self, job_id, gui_data, refresh_cache=False):
+        self.id = job_id
+        self.gui_data = gui_data
+        self.refresh_cache = refresh_cache
+        self.status = JOB_QUEUED
+        self.error = None
+        # The finished RenderedPO, kept in memory until the user saves it
+        self.result = None
+        self.items_received = 0
+        self.extract_seconds = None
+        self.render_seconds = None
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+
+    @property
+    def quotation_file(self):
+        return self.gui_data['quotation_file']
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def elapsed_seconds(self):
+        """Seconds since the job started running, up to when it finished"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+class JobQueue:
+    """Run PO jobs on a bounded pool of worker threads.
+
+    on_change(job) is called from the worker threads whenever a job's status or
+    progress changes, so a GUI must hand it over to its own thread. Workers are
+    daemon threads: closing the application does not wait for Gemini.
+    """
+
+    def __init__(self, pdf_processor, excel_generator, max_workers=JOB_QUEUE_MAX_WORKERS, on_change=None):
+        self.pdf_processor = pdf_processor
+        self.excel_generator = excel_generator
+        self.on_change = on_change
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        for _ in range(max_workers):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+
+    def submit(self, gui_data, refresh_cache=False):
+        """Queue a job for the quotation in gui_data['quotation_file'] and return it"""
+        with self._lock:
+            job = Job(next(self._ids), dict(gui_data), refresh_cache)
+            self.jobs[job.id] = job
+        self._pending.put(job)
+        self._notify(job)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or discard the result of a running one"""
+        job = self.jobs[job_id]
+        with self._lock:
+            if job.finished:
+                return False
+            job.cancel_requested.set()
+            if job.status == JOB_QUEUED:
+                self._finish(job, JOB_CANCELLED)
+        self._notify(job)
+        return True
+
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again"""
+        job = self.jobs[job_id]
+        with self._lock:
+            if job.status not in (JOB_FAILED, JOB_CANCELLED):
+                return False
+            job.status = JOB_QUEUED
+            job.error = None
+            job.items_received = 0
+            job.extract_seconds = job.render_seconds = None
+            job.started_at = job.finished_at = None
+            job.submitted_at = time.perf_counter()
+            job.cancel_requested = threading.Event()
+        self._pending.put(job)
+        self._notify(job)
+        return True
+
+    def remove(self, job_id):
+        """Forget a finished job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.finished:
+                del self.jobs[job_id]
+                return True
+        return False
+
+    def _notify(self, job):
+        if self.on_change is None:
+            return
+        try:
+            self.on_change(job)
+        except Exception as e:
+            # A failing listener must not take a worker thread down with it
+            print(f"Error handling a change to job {job.id}: {e}")
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.perf_counter()
+
+    def _set_status(self, job, status):
+        # A cancel between stages wins over the next stage
+        with self._lock:
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            job.status = status
+        self._notify(job)
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            # A job retried after a cancel while queued is in the queue twice; whoever claims it first runs it
+            with self._lock:
+                if job.status != JOB_QUEUED:
+                    continue
+                job.status = JOB_EXTRACTING
+                job.started_at = time.perf_counter()
+            self._notify(job)
+            try:
+                self._run(job)
+            except JobCancelled:
+                with self._lock:
+                    self._finish(job, JOB_CANCELLED)
+            except Exception as e:
+                with self._lock:
+                    self._finish(job, JOB_CANCELLED if job.cancel_requested.is_set() else JOB_FAILED,
+                                 str(e) or type(e).__name__)
+            self._notify(job)
+
+    def _run(self, job):
+        def on_item(index, item):
+            job.items_received = index + 1
+            self._notify(job)
+
+        start_time = time.perf_counter()
+        extracted_data = self.pdf_processor.extract_po_data(
+            pathlib.Path(job.quotation_file), None, refresh_cache=job.refresh_cache, on_item=on_item
+        )
+        job.extract_seconds = time.perf_counter() - start_time
+
+        self._set_status(job, JOB_RENDERING)
+        start_time = time.perf_counter()
+        # Every job keeps its own workbook in memory, so finished POs never overwrite each other
+        rendered = self.excel_generator.render(extracted_data, gui_data=job.gui_data)
+        job.render_seconds = time.perf_counter() - start_time
+        self.pdf_processor.record_po(job.quotation_file, job.gui_data.get('po_number'))
+
+        with self._lock:
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            job.result = rendered
+            self._finish(job, JOB_DONE)
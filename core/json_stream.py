@@ -0,0 +1,123 @@
+import json
+
+class ExtractionStreamParser:
+    """Incremental parser for a streamed extraction response.
+
+    Text chunks are fed as they arrive; on_header is called with the fields
+    seen before the "items" array once it opens, and on_item(index, item) as
+    soon as each entry of the array is complete. Code fences and any text
+    around the JSON object are ignored, as in the non-streaming path.
+    """
+
+    def __init__(self, on_header=None, on_item=None):
+        self.on_header = on_header
+        self.on_item = on_item
+        self.items_received = 0
+        self._header_sent = False
+        self.restart()
+
+    def restart(self):
+        """Start over on a retried stream without re-reporting the header or items already seen"""
+        self._item_index = 0
+        self._chunks = []
+        # Only the text a pending key, item or header still needs is kept for scanning
+        self._buffer = ''
+        self._buffer_start = 0
+        self._position = 0
+        self._object_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_key = None
+        self._items_depth = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        """Consume the next chunk of response text"""
+        if not chunk:
+            return
+        self._chunks.append(chunk)
+        self._buffer += chunk
+        self._scan()
+        self._trim()
+
+    @property
+    def text(self):
+        """The response text received so far"""
+        return ''.join(self._chunks)
+
+    def _slice(self, start, end):
+        return self._buffer[start - self._buffer_start:end - self._buffer_start]
+
+    def _scan(self):
+        text = self._buffer
+        offset = self._buffer_start
+        for position in range(self._position, offset + len(text)):
+            char = text[position - offset]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = self._slice(self._string_start + 1, position)
+                continue
+
+            if self._object_start is None:
+                if char == '{':
+                    self._object_start = position
+                    self._depth = 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+            elif char in '{[':
+                self._depth += 1
+                if char == '[' and self._depth == 2 and self._last_key == 'items':
+                    self._items_depth = 2
+                    self._emit_header(position)
+                elif char == '{' and self._items_depth is not None and self._depth == self._items_depth + 1:
+                    self._item_start = position
+            elif char in '}]':
+                if char == '}' and self._item_start is not None and self._depth == self._items_depth + 1:
+                    self._emit_item(self._slice(self._item_start, position + 1))
+                    self._item_start = None
+                elif char == ']' and self._depth == self._items_depth:
+                    self._items_depth = None
+                self._depth -= 1
+        self._position = offset + len(text)
+
+    def _trim(self):
+        keep = self._position
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if self._item_start is not None:
+            keep = min(keep, self._item_start)
+        if self._object_start is not None and not self._header_sent and self.on_header is not None:
+            keep = min(keep, self._object_start)
+        if keep > self._buffer_start:
+            self._buffer = self._buffer[keep - self._buffer_start:]
+            self._buffer_start = keep
+
+    def _emit_header(self, items_position):
+        if self._header_sent:
+            return
+        self._header_sent = True
+        if self.on_header is None:
+            return
+        header = json.loads(self._slice(self._object_start, items_position) + '[]}')
+        header.pop('items', None)
+        self.on_header(header)
+
+    def _emit_item(self, item_text):
+        index = self._item_index
+        self._item_index += 1
+        if index < self.items_received:
+            return
+        self.items_received += 1
+        if self.on_item is not None:
+            self.on_item(index, json.loads(item_text))
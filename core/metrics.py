@@ -0,0 +1,226 @@
+"""Per-stage timings of extractions and renders, appended to a rotating JSONL file.
+
+Usage:
+    python -m core.metrics report [--kind extract] [--last 500]
+"""
+import argparse
+import contextlib
+import contextvars
+import json
+import pathlib
+import sys
+import threading
+import time
+from datetime import datetime
+
+from config.settings import METRICS_ENABLED, METRICS_FILE, METRICS_MAX_BYTES, METRICS_BACKUP_COUNT
+from core.progress import publish, STAGE_STARTED, STAGE_FINISHED
+from core.utils import percentile
+
+_current_record = contextvars.ContextVar('metrics_record', default=None)
+
+class MetricsRecord:
+    """Stage durations and facts about one extraction or render"""
+
+    def __init__(self, log, kind, **fields):
+        self.log = log
+        self.kind = kind
+        self.fields = fields
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+        self._finished = False
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the enclosed block; repeated stages add up. Also published as progress events"""
+        publish(STAGE_STARTED, record=self.kind, stage=name)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            publish(STAGE_FINISHED, record=self.kind, stage=name, seconds=elapsed)
+
+    def note(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def add_usage(self, usage_metadata):
+        """Add the token counts of a Gemini response"""
+        if usage_metadata is None:
+            return
+        with self._lock:
+            for field, attribute in (('prompt_tokens', 'prompt_token_count'),
+                                     ('response_tokens', 'candidates_token_count')):
+                count = getattr(usage_metadata, attribute, None)
+                if count is not None:
+                    self.fields[field] = self.fields.get(field, 0) + count
+
+    def finish(self, error=None):
+        """Write the record once; later calls are ignored"""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            entry = {
+                'timestamp': datetime.now().isoformat(timespec='milliseconds'),
+                'kind': self.kind,
+                'status': 'failed' if error else 'ok',
+                'total_seconds': round(time.perf_counter() - self._start_time, 6),
+                'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            }
+            entry.update(self.fields)
+            if error:
+                entry['error'] = str(error) or type(error).__name__
+        self.log.write(entry)
+
+class MetricsLog:
+    """Append-only JSONL metrics file, rotated to .1, .2, ... once it exceeds max_bytes"""
+
+    def __init__(self, path=METRICS_FILE, max_bytes=METRICS_MAX_BYTES, backup_count=METRICS_BACKUP_COUNT,
+                 enabled=METRICS_ENABLED):
+        self.path = pathlib.Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def record(self, kind, **fields):
+        """Collect a record for the enclosed block, which stage() and note() calls below it report to"""
+        record = MetricsRecord(self, kind, **fields)
+        token = _current_record.set(record)
+        try:
+            yield record
+        except BaseException as e:
+            record.finish(error=e)
+            raise
+        finally:
+            _current_record.reset(token)
+        record.finish()
+
+    def start(self, kind, **fields):
+        """Begin a record that outlives a single block; call finish() on it when done"""
+        return MetricsRecord(self, kind, **fields)
+
+    def write(self, entry):
+        if not self.enabled:
+            return
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except OSError as e:
+            # Metrics must never break a PO
+            print(f"Could not write metrics: {e}")
+
+    def _rotate(self):
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                source.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def read(self):
+        """Return every entry, oldest first, including rotated files"""
+        paths = [self.path.with_name(f"{self.path.name}.{index}") for index in range(self.backup_count, 0, -1)]
+        entries = []
+        for path in paths + [self.path]:
+            if not path.exists():
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return entries
+
+def stage(name):
+    """Time the enclosed block as a stage of the current record, if there is one"""
+    record = _current_record.get()
+    if record is None:
+        return contextlib.nullcontext()
+    return record.stage(name)
+
+def note(**fields):
+    """Add fields to the current record, if there is one"""
+    record = _current_record.get()
+    if record is not None:
+        record.note(**fields)
+
+def note_usage(usage_metadata):
+    """Add a Gemini response's token counts to the current record, if there is one"""
+    record = _current_record.get()
+    if record is not None:
+        record.add_usage(usage_metadata)
+
+def summarize(entries):
+    """Return {kind: {stage: [seconds, ...]}} with the overall duration under 'total'"""
+    durations = {}
+    for entry in entries:
+        stages = durations.setdefault(entry.get('kind', '?'), {})
+        for name, seconds in entry.get('stages', {}).items():
+            stages.setdefault(name, []).append(seconds)
+        stages.setdefault('total', []).append(entry.get('total_seconds', 0.0))
+    return durations
+
+def print_report(entries):
+    for kind, stages in sorted(summarize(entries).items()):
+        kind_entries = [entry for entry in entries if entry.get('kind') == kind]
+        failed = sum(1 for entry in kind_entries if entry.get('status') != 'ok')
+        print(f"\n{kind}: {len(kind_entries)} record(s), {failed} failed")
+        print(f"  {'stage':<16} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        for name, values in sorted(stages.items(), key=lambda entry: entry[0] == 'total'):
+            print(f"  {name:<16} {len(values):>6} "
+                  f"{percentile(values, 50) * 1000:>10.1f} "
+                  f"{percentile(values, 95) * 1000:>10.1f} "
+                  f"{percentile(values, 99) * 1000:>10.1f}")
+
+        cache_known = [entry['cache_hit'] for entry in kind_entries if entry.get('cache_hit') is not None]
+        if cache_known:
+            print(f"  cache hit rate: {sum(cache_known) / len(cache_known):.0%} of {len(cache_known)}")
+        for field in ('pdf_bytes', 'slimmed_bytes', 'item_count', 'prompt_tokens', 'response_tokens'):
+            values = [entry[field] for entry in kind_entries if entry.get(field) is not None]
+            if values:
+                print(f"  {field}: p50 {percentile(values, 50):.0f}, p95 {percentile(values, 95):.0f}")
+        seconds_saved = [entry['upload_seconds_saved'] for entry in kind_entries
+                         if entry.get('upload_seconds_saved') is not None]
+        if seconds_saved:
+            print(f"  upload time saved by slimming: {sum(seconds_saved):.1f}s over {len(seconds_saved)} PDF(s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the PO generator metrics log")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report_parser = subparsers.add_parser('report', help="Print p50/p95/p99 per stage")
+    report_parser.add_argument('--kind', help="Only report this kind of record (extract, render, ...)")
+    report_parser.add_argument('--last', type=int, help="Only report the most recent N records")
+    report_parser.add_argument('--file', default=METRICS_FILE, help="Metrics file to read")
+    args = parser.parse_args(argv)
+
+    entries = MetricsLog(args.file).read()
+    if args.kind:
+        entries = [entry for entry in entries if entry.get('kind') == args.kind]
+    if args.last:
+        entries = entries[-args.last:]
+    if not entries:
+        print("No metrics recorded yet.")
+        return 1
+    print_report(entries)
+    return 0
+
+# Shared by every PDFProcessor and ExcelGenerator in the process
+default_metrics = MetricsLog()
+
+if __name__ == "__main__":
+    sys.exit(main())
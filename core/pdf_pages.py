@@ -0,0 +1,43 @@
+import io
+
+def _pypdf():
+    try:
+        import pypdf
+    except ImportError as e:
+        raise ImportError("Reading PDF pages requires pypdf: pip install pypdf") from e
+    return pypdf
+
+def count_pages(pdf_bytes):
+    """Return the number of pages in the PDF"""
+    return len(_pypdf().PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+def page_ranges(num_pages, pages_per_chunk, overlap_pages=0):
+    """Split num_pages into (start, end) page ranges, end exclusive, overlapping by overlap_pages"""
+    if num_pages <= pages_per_chunk:
+        return [(0, num_pages)]
+    step = max(1, pages_per_chunk - overlap_pages)
+    ranges = []
+    start = 0
+    while True:
+        end = min(start + pages_per_chunk, num_pages)
+        ranges.append((start, end))
+        if end == num_pages:
+            return ranges
+        start += step
+
+def split_pdf(pdf_bytes, ranges):
+    """Return one standalone PDF (as bytes) per (start, end) page range"""
+    reader = _pypdf().PdfReader(io.BytesIO(pdf_bytes))
+    return [_write_pages(reader, range(start, end)) for start, end in ranges]
+
+def select_pages(pdf_bytes, page_numbers):
+    """Return a standalone PDF (as bytes) holding the given 0-based pages in order"""
+    return _write_pages(_pypdf().PdfReader(io.BytesIO(pdf_bytes)), page_numbers)
+
+def _write_pages(reader, page_numbers):
+    writer = _pypdf().PdfWriter()
+    for page_number in page_numbers:
+        writer.add_page(reader.pages[page_number])
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
@@ -1,55 +1,432 @@
+import asyncio
+import contextvars
+import importlib
 import json
 import os
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 import pathlib
-from datetime import datetime
+import threading
+import time
 
-from config.settings import GEMINI_MODEL, GEMINI_TEMPERATURE, GEMINI_TOP_P, JSONS_DIR
+from config.settings import (
+    GEMINI_MODEL, GEMINI_TEMPERATURE, GEMINI_TOP_P, EXTRACTION_CACHE_ENABLED,
+    GEMINI_ATTEMPT_TIMEOUT_SECONDS, GEMINI_REQUEST_DEADLINE_SECONDS,
+    GEMINI_RESPONSE_MODE, GEMINI_REPLAY_SIMULATE_LATENCY, RECORDINGS_DIR,
+    PDF_CHUNKED_EXTRACTION_MIN_PAGES, PDF_CHUNK_PAGES, PDF_CHUNK_OVERLAP_PAGES, PDF_SLIM_ENABLED,
+    PDF_SLIM_MIN_BYTES, PDF_SLIM_UPLOAD_BYTES_PER_SECOND
+)
+from core.archive import ExtractionArchive
+from core.cache import ExtractionCache, pdf_sha256
+from core.json_stream import ExtractionStreamParser
+from core.metrics import default_metrics, stage, note, note_usage
+from core.progress import publish, UPLOAD_STARTED, BYTES_UPLOADED, CHUNK_FINISHED, ITEMS_RECEIVED
+from core.pdf_pages import count_pages, page_ranges, split_pdf, select_pages
+from core.pdf_slimmer import slim_pdf
+from core.rate_limit import RateLimiter, call_with_retry, call_with_retry_async
+from core.recorder import RESPONSE_MODES, ResponseStore, RecordingClient, ReplayClient
+
+EXTRACTION_PROMPT = """
+Extract the following information from the quotation provided below and return it as a valid JSON object. Do not include any text or formatting outside of the JSON object.
+
+JSON Structure:
+{
+"companyName": "The name of the company providing the quotation.",
+"address": "The full mailing address of the company.",
+"quotationNumber": "The unique quotation number or reference ID.",
+"pic": {
+    "name": "The name of the Person-in-Charge or contact person. Use null if not found.",
+    "email": "The contact person's email address. Use null if not found.",
+    "phone": "The contact person's phone number. Use null if not found."
+},
+"terms": {
+    "payment": "The payment terms (e.g., 'COD', '30 Days', '50% Upfront').",
+    "deliveryWeeks": "The delivery lead time, converted to a number of weeks (e.g., '14 days' becomes 2, '4 weeks' becomes 4). If the delivery time is a range (e.g., '2-4 weeks', '6-8 weeks'), **always select the lower number** to represent the shortest possible lead time (e.g., '2-4 weeks' becomes 2, '6-8 weeks' becomes 6). Use null if not specified or cannot be converted."
+},
+"items": [
+    {
+    "quantity": "The numerical quantity of the item.",
+    "unit": "The unit of measure (e.g., 'pcs', 'kgs', 'lot').",
+    "description": "The full description of the item.",
+    "unitPrice": "The price per unit as a number."
+    }
+]
+}
+"""
+
+HEADER_PROMPT = """
+Extract the following information from the quotation provided below and return it as a valid JSON object. Do not extract the line items. Do not include any text or formatting outside of the JSON object.
+
+JSON Structure:
+{
+"companyName": "The name of the company providing the quotation.",
+"address": "The full mailing address of the company.",
+"quotationNumber": "The unique quotation number or reference ID.",
+"pic": {
+    "name": "The name of the Person-in-Charge or contact person. Use null if not found.",
+    "email": "The contact person's email address. Use null if not found.",
+    "phone": "The contact person's phone number. Use null if not found."
+},
+"terms": {
+    "payment": "The payment terms (e.g., 'COD', '30 Days', '50% Upfront').",
+    "deliveryWeeks": "The delivery lead time, converted to a number of weeks (e.g., '14 days' becomes 2, '4 weeks' becomes 4). If the delivery time is a range (e.g., '2-4 weeks', '6-8 weeks'), **always select the lower number** to represent the shortest possible lead time (e.g., '2-4 weeks' becomes 2, '6-8 weeks' becomes 6). Use null if not specified or cannot be converted."
+}
+}
+"""
+
+ITEMS_PROMPT = """
+The document below is an excerpt of consecutive pages from a longer quotation. Extract every line item on these pages, in the order they appear, and return them as a valid JSON object. Skip a row only if it is cut off at the very end of the last page. Do not include any text or formatting outside of the JSON object.
+
+JSON Structure:
+{
+"items": [
+    {
+    "quantity": "The numerical quantity of the item.",
+    "unit": "The unit of measure (e.g., 'pcs', 'kgs', 'lot').",
+    "description": "The full description of the item.",
+    "unitPrice": "The price per unit as a number."
+    }
+]
+}
+"""
+
+# Chunked extractions are cached under both prompts and the chunking they were made with
+CHUNK_CACHE_PROMPT = f"{HEADER_PROMPT}{ITEMS_PROMPT}pages={PDF_CHUNK_PAGES},overlap={PDF_CHUNK_OVERLAP_PAGES}"
+
+def _item_key(item):
+    description = ' '.join(str(item.get('description') or '').lower().split())
+    return description, item.get('quantity'), item.get('unitPrice')
+
+def merge_chunk_items(chunk_items):
+    """Concatenate per-chunk item lists in page order, dropping rows repeated across chunk boundaries.
+
+    Overlapping pages make the tail of one chunk reappear at the head of the
+    next; the longest such run is removed, so identical rows elsewhere survive.
+    """
+    merged = []
+    for items in chunk_items:
+        keys = [_item_key(item) for item in items]
+        merged_keys = [_item_key(item) for item in merged[-len(items):]] if items else []
+        overlap = 0
+        for size in range(min(len(merged_keys), len(keys)), 0, -1):
+            if merged_keys[-size:] == keys[:size]:
+                overlap = size
+                break
+        merged.extend(items[overlap:])
+    return merged
 
 class PDFProcessor:
-    def __init__(self):
-        load_dotenv()
-        self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    def __init__(self, cache=None, client=None, rate_limiter=None, metrics=None,
+                 response_mode=GEMINI_RESPONSE_MODE, recordings_dir=RECORDINGS_DIR, archive=None,
+                 slim=PDF_SLIM_ENABLED):
+        if response_mode is not None and response_mode not in RESPONSE_MODES:
+            raise ValueError(f"Unknown response mode: {response_mode!r}")
+        self.response_mode = response_mode
+        self.recordings = ResponseStore(recordings_dir) if response_mode else None
+        if response_mode == 'replay':
+            client = ReplayClient(self.recordings, simulate_latency=GEMINI_REPLAY_SIMULATE_LATENCY)
+        elif response_mode == 'record' and client is not None:
+            client = RecordingClient(client, self.recordings)
+        # Any object exposing models.generate_content / aio.models.generate_content works, e.g. a fake for offline runs
+        self._client = client
+        self._client_lock = threading.Lock()
         self.model = GEMINI_MODEL
+        if cache is None and EXTRACTION_CACHE_ENABLED:
+            cache = ExtractionCache()
+        self.cache = cache
+        self.archive = archive or ExtractionArchive()
+        # Replayed responses come from disk, so they are not rate limited unless asked
+        self.rate_limiter = rate_limiter or (None if response_mode == 'replay' else RateLimiter())
+        self.metrics = metrics or default_metrics
+        # Slim PDFs of at least PDF_SLIM_MIN_BYTES before they are uploaded
+        self.slim = slim
+
+    @property
+    def client(self):
+        """The Gemini client, created on first use because importing google.genai takes most of a second"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from dotenv import load_dotenv
+                    from google import genai
+                    load_dotenv()
+                    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+                    if self.response_mode == 'record':
+                        client = RecordingClient(client, self.recordings)
+                    self._client = client
+        return self._client
+
+    def warm_up(self):
+        """Create the client and import the request types ahead of the first extraction"""
+        # google.genai.types alone takes about half a second to import
+        importlib.import_module("google.genai.types")
+        return self.client
+
+    def extract_po_data(self, filepath, gui_data, use_cache=True, refresh_cache=False, chunked=None,
+                        on_header=None, on_item=None):
+        """Extract PO data from the quotation PDF, reusing a cached extraction when available.
+
+        chunked=None picks page-chunked extraction for PDFs of at least
+        PDF_CHUNKED_EXTRACTION_MIN_PAGES pages; True/False forces the mode.
+        When on_header(header) or on_item(index, item) is given the response is
+        streamed and they are called as each part arrives; cached and chunked
+        extractions call them once the result is complete.
+        """
+        with self.metrics.record('extract', file=filepath.name):
+            with stage('read_pdf'):
+                pdf_bytes = filepath.read_bytes()
+            return self._extract_bytes(pdf_bytes, filepath, gui_data, use_cache, refresh_cache, chunked,
+                                       on_header, on_item)
+
+    def extract_pdf_bytes(self, pdf_bytes, filename, gui_data=None, use_cache=True, refresh_cache=False,
+                          chunked=None, on_header=None, on_item=None):
+        """Like extract_po_data for a PDF already in memory, e.g. an upload; filename is only recorded"""
+        filepath = pathlib.Path(filename)
+        with self.metrics.record('extract', file=filepath.name):
+            return self._extract_bytes(pdf_bytes, filepath, gui_data, use_cache, refresh_cache, chunked,
+                                       on_header, on_item)
+
+    def _extract_bytes(self, pdf_bytes, filepath, gui_data, use_cache, refresh_cache, chunked, on_header, on_item):
+        note(pdf_bytes=len(pdf_bytes))
+        if self._use_chunks(pdf_bytes, chunked, use_cache, refresh_cache):
+            extracted_data = asyncio.run(self._extract_chunked(filepath, pdf_bytes, gui_data, use_cache, refresh_cache))
+            return self._replay(extracted_data, on_header, on_item)
 
-    def extract_po_data(self, filepath, gui_data):
+        cache_key, cached_data = self._lookup_cache(pdf_bytes, use_cache, refresh_cache)
+        if cached_data is not None:
+            return self._replay(self._finish_extraction(cached_data, gui_data, filepath, pdf_bytes, fresh=False), on_header, on_item)
+
+        upload_bytes = self._prepare_upload(pdf_bytes)
         print("Sending request to Gemini...")
+        with stage('gemini'):
+            if on_header is None and on_item is None:
+                note(mode='single')
+                response_text = call_with_retry(lambda: self._generate(upload_bytes), self.rate_limiter)
+            else:
+                note(mode='stream')
+                parser = ExtractionStreamParser(on_header, self._publishing_items(on_item))
+                response_text = call_with_retry(lambda: self._generate_stream(upload_bytes, parser), self.rate_limiter)
+        return self._finish_extraction(self._parse_response(response_text, cache_key), gui_data, filepath, pdf_bytes)
+
+    async def extract_po_data_async(self, filepath, gui_data, use_cache=True, refresh_cache=False,
+                                    deadline=GEMINI_REQUEST_DEADLINE_SECONDS, chunked=None):
+        """Async variant of extract_po_data with rate limiting, retries and an overall deadline.
+
+        Cancelling the awaiting task aborts the in-flight request and any pending retry.
+        """
+        with self.metrics.record('extract', file=filepath.name):
+            with stage('read_pdf'):
+                pdf_bytes = await asyncio.get_running_loop().run_in_executor(None, filepath.read_bytes)
+            note(pdf_bytes=len(pdf_bytes))
+            if self._use_chunks(pdf_bytes, chunked, use_cache, refresh_cache):
+                return await self._extract_chunked(filepath, pdf_bytes, gui_data, use_cache, refresh_cache, deadline)
+
+            cache_key, cached_data = self._lookup_cache(pdf_bytes, use_cache, refresh_cache)
+            if cached_data is not None:
+                return self._finish_extraction(cached_data, gui_data, filepath, pdf_bytes, fresh=False)
+
+            upload_bytes = await self._prepare_upload_async(pdf_bytes)
+            print("Sending request to Gemini...")
+            note(mode='single')
+            with stage('gemini'):
+                response_text = await asyncio.wait_for(
+                    self._generate_with_retry_async(upload_bytes, EXTRACTION_PROMPT),
+                    deadline
+                )
+            return self._finish_extraction(self._parse_response(response_text, cache_key), gui_data, filepath, pdf_bytes)
+
+    def _use_chunks(self, pdf_bytes, chunked, use_cache, refresh_cache):
+        if chunked is not None:
+            return chunked
+        # A cached extraction was made one way or the other, so a cache hit needs no page count
+        if self.cache is not None and use_cache and not refresh_cache:
+            for prompt, is_chunked in ((EXTRACTION_PROMPT, False), (CHUNK_CACHE_PROMPT, True)):
+                cache_key = self.cache.make_key(pdf_bytes, prompt, self.model, GEMINI_TEMPERATURE, GEMINI_TOP_P)
+                if self.cache.contains(cache_key):
+                    return is_chunked
+        if b'%PDF' not in pdf_bytes[:1024]:
+            # Not a PDF pypdf could count; Gemini gets it whole and reports what it makes of it
+            return False
+        try:
+            return count_pages(pdf_bytes) >= PDF_CHUNKED_EXTRACTION_MIN_PAGES
+        except Exception:
+            # Without pypdf, or for PDFs it cannot parse, send the whole file in one call
+            return False
+
+    async def _extract_chunked(self, filepath, pdf_bytes, gui_data, use_cache, refresh_cache,
+                               deadline=GEMINI_REQUEST_DEADLINE_SECONDS):
+        """Extract the header and the items of each page chunk with concurrent requests.
+
+        The header request only sees the first chunk and the last page, where
+        supplier details and terms are printed, so it finishes with the chunks.
+        """
+        cache_key, cached_data = self._lookup_cache(pdf_bytes, use_cache, refresh_cache, CHUNK_CACHE_PROMPT)
+        if cached_data is not None:
+            return self._finish_extraction(cached_data, gui_data, filepath, pdf_bytes, fresh=False)
+
+        # Slimming may drop pages, so the chunks are cut from what is actually sent
+        upload_bytes = await self._prepare_upload_async(pdf_bytes)
+        with stage('split_pdf'):
+            num_pages = count_pages(upload_bytes)
+            ranges = page_ranges(num_pages, PDF_CHUNK_PAGES, PDF_CHUNK_OVERLAP_PAGES)
+            chunks = split_pdf(upload_bytes, ranges)
+            header_pages = sorted(set(range(ranges[0][1])) | {num_pages - 1})
+            header_bytes = select_pages(upload_bytes, header_pages)
+        note(mode='chunked', pages=num_pages, chunks=len(chunks))
+        print(f"Sending header request and {len(chunks)} page chunk(s) to Gemini...")
+
+        requests_done = 0
+        items_received = 0
+
+        async def timed(chunk_bytes, prompt):
+            nonlocal requests_done, items_received
+            start_time = time.perf_counter()
+            response_text = await self._generate_with_retry_async(chunk_bytes, prompt)
+            chunk_data = self._decode_json(response_text)
+            requests_done += 1
+            items_received += len(chunk_data.get('items') or [])
+            publish(CHUNK_FINISHED, done=requests_done, total=len(chunks) + 1)
+            publish(ITEMS_RECEIVED, count=items_received)
+            return chunk_data, time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        with stage('gemini'):
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    timed(header_bytes, HEADER_PROMPT),
+                    *(timed(chunk_bytes, ITEMS_PROMPT) for chunk_bytes in chunks)
+                ),
+                deadline
+            )
+        (extracted_data, header_seconds), chunk_results = results[0], results[1:]
 
-        prompt = """
-        Extract the following information from the quotation provided below and return it as a valid JSON object. Do not include any text or formatting outside of the JSON object.
-
-        JSON Structure:
-        {
-        "companyName": "The name of the company providing the quotation.",
-        "address": "The full mailing address of the company.",
-        "quotationNumber": "The unique quotation number or reference ID.",
-        "pic": {
-            "name": "The name of the Person-in-Charge or contact person. Use null if not found.",
-            "email": "The contact person's email address. Use null if not found.",
-            "phone": "The contact person's phone number. Use null if not found."
-        },
-        "terms": {
-            "payment": "The payment terms (e.g., 'COD', '30 Days', '50% Upfront').",
-            "deliveryWeeks": "The delivery lead time, converted to a number of weeks (e.g., '14 days' becomes 2, '4 weeks' becomes 4). If the delivery time is a range (e.g., '2-4 weeks', '6-8 weeks'), **always select the lower number** to represent the shortest possible lead time (e.g., '2-4 weeks' becomes 2, '6-8 weeks' becomes 6). Use null if not specified or cannot be converted."
-        },
-        "items": [
-            {
-            "quantity": "The numerical quantity of the item.",
-            "unit": "The unit of measure (e.g., 'pcs', 'kgs', 'lot').",
-            "description": "The full description of the item.",
-            "unitPrice": "The price per unit as a number."
-            }
-        ]
-        }
+        print(f"Header: {header_seconds:.1f}s")
+        for index, ((start, end), (chunk_data, seconds)) in enumerate(zip(ranges, chunk_results)):
+            print(f"Chunk {index + 1}/{len(ranges)} (pages {start + 1}-{end}): "
+                  f"{seconds:.1f}s, {len(chunk_data.get('items') or [])} items")
+        print(f"Chunked extraction finished in {time.perf_counter() - start_time:.1f}s")
+
+        extracted_data['items'] = merge_chunk_items([chunk_data.get('items') or [] for chunk_data, _ in chunk_results])
+        if cache_key is not None:
+            with stage('cache_write'):
+                self.cache.put(cache_key, extracted_data)
+        return self._finish_extraction(extracted_data, gui_data, filepath, pdf_bytes)
+
+    async def _generate_with_retry_async(self, pdf_bytes, prompt):
+        return await call_with_retry_async(
+            lambda: self._generate_async(pdf_bytes, prompt),
+            self.rate_limiter,
+            attempt_timeout=GEMINI_ATTEMPT_TIMEOUT_SECONDS
+        )
+
+    def _prepare_upload(self, pdf_bytes):
+        """Return the bytes to send to Gemini: pdf_bytes slimmed, if that makes them smaller.
+
+        The cache and the archive still key on the original bytes, so a
+        quotation is recognised whatever the slimming settings were.
         """
+        if not self.slim or len(pdf_bytes) < PDF_SLIM_MIN_BYTES:
+            return pdf_bytes
+        try:
+            with stage('slim_pdf'):
+                result = slim_pdf(pdf_bytes)
+        except Exception as e:
+            # Gemini may still read a PDF that pypdf cannot rewrite
+            print(f"Could not slim the PDF, sending it as is: {e}")
+            return pdf_bytes
+        if result.saved_bytes <= 0:
+            note(slimmed_bytes=len(pdf_bytes), upload_seconds_saved=0.0)
+            return pdf_bytes
+
+        seconds_saved = result.saved_bytes / PDF_SLIM_UPLOAD_BYTES_PER_SECOND - result.seconds
+        note(slimmed_bytes=result.slimmed_bytes, slim_pages_dropped=result.pages_dropped,
+             slim_images_downsampled=result.images_downsampled, upload_seconds_saved=round(seconds_saved, 2))
+        print(f"Slimmed the PDF from {len(pdf_bytes) / 1e6:.1f} MB to {result.slimmed_bytes / 1e6:.1f} MB "
+              f"({result.pages_dropped} page(s) dropped, {result.images_downsampled} image(s) downsampled) "
+              f"in {result.seconds:.1f}s")
+        return result.data
+
+    async def _prepare_upload_async(self, pdf_bytes):
+        # Slimming is CPU-bound; the copied context lets its stage() and note() reach the current record
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(None, context.run, self._prepare_upload, pdf_bytes)
+
+    def _lookup_cache(self, pdf_bytes, use_cache, refresh_cache, prompt=EXTRACTION_PROMPT):
+        """Return (cache_key, cached_data); cache_key is None when the cache is bypassed"""
+        # use_cache=False bypasses the cache entirely, refresh_cache=True skips the lookup but stores the result
+        if self.cache is None or not use_cache:
+            return None, None
+        with stage('cache_lookup'):
+            cache_key = self.cache.make_key(pdf_bytes, prompt, self.model, GEMINI_TEMPERATURE, GEMINI_TOP_P)
+            if refresh_cache:
+                return cache_key, None
+            cached_data = self.cache.get(cache_key)
+        note(cache_hit=cached_data is not None)
+        if cached_data is not None:
+            print("Using cached extraction...")
+        return cache_key, cached_data
+
+    def _parse_response(self, response_text, cache_key):
+        """Decode the model response and store it in the cache"""
+        with stage('parse_json'):
+            extracted_data = self._decode_json(response_text)
+        if cache_key is not None:
+            with stage('cache_write'):
+                self.cache.put(cache_key, extracted_data)
+        return extracted_data
+
+    @staticmethod
+    def _decode_json(response_text):
+        try:
+            cleaned_response = response_text.strip().replace('```json', '').replace('```', '')
+            return json.loads(cleaned_response)
+        except json.JSONDecodeError as e:
+            print(f"Error decoding JSON: {e}")
+            print("Raw response from API:", response_text)
+            raise
+
+    @staticmethod
+    def _publishing_items(on_item):
+        """Wrap on_item so every streamed item is also published as progress"""
+        def forward_item(index, item):
+            publish(ITEMS_RECEIVED, count=index + 1)
+            if on_item is not None:
+                on_item(index, item)
+        return forward_item
+
+    @staticmethod
+    def _replay(extracted_data, on_header, on_item):
+        """Report an already complete extraction to streaming callbacks"""
+        if on_header is not None:
+            on_header({k: v for k, v in extracted_data.items() if k not in ('items', 'gui_data')})
+        if on_item is not None:
+            for index, item in enumerate(extracted_data.get('items', [])):
+                on_item(index, item)
+        return extracted_data
 
-        response = self.client.models.generate_content(
+    def _finish_extraction(self, extracted_data, gui_data, filepath, pdf_bytes, fresh=True):
+        item_count = len(extracted_data.get('items') or [])
+        note(item_count=item_count)
+        publish(ITEMS_RECEIVED, count=item_count, final=True)
+
+        # Archive the extraction for reference, independently of the header inputs
+        with stage('archive'):
+            self._archive_extraction(extracted_data, gui_data, filepath, pdf_bytes, fresh)
+
+        # gui_data=None leaves it to the caller, e.g. when extracting before the header is filled in
+        if gui_data is None:
+            return extracted_data
+        return self.attach_gui_data(extracted_data, gui_data)
+
+    def attach_gui_data(self, extracted_data, gui_data):
+        """Return a copy of the extraction with the GUI header fields added"""
+        return dict(extracted_data, gui_data=gui_data)
+
+    def _request_kwargs(self, pdf_bytes, prompt=EXTRACTION_PROMPT):
+        from google.genai import types
+        return dict(
             model=self.model,
             contents=[
                 types.Part.from_bytes(
-                    data=filepath.read_bytes(),
+                    data=pdf_bytes,
                     mime_type='application/pdf',
                 ),
                 prompt
@@ -61,26 +438,72 @@ class PDFProcessor:
             )
         )
 
+    def _generate(self, pdf_bytes, prompt=EXTRACTION_PROMPT):
+        """Send the PDF and extraction prompt to Gemini and return the raw response text"""
+        publish(UPLOAD_STARTED, bytes=len(pdf_bytes))
         try:
-            cleaned_response = response.text.strip().replace('```json', '').replace('```', '')
-            extracted_data = json.loads(cleaned_response)
-            
-            # Add GUI data to the extracted data
-            extracted_data['gui_data'] = gui_data
-            
-            # Save extracted JSON for reference
-            self._save_extracted_json(extracted_data)
-            
-            return extracted_data
+            response = self.client.models.generate_content(**self._request_kwargs(pdf_bytes, prompt))
+        finally:
+            # A failed attempt is done with its upload too, so a retry starts the count afresh
+            publish(BYTES_UPLOADED, bytes=len(pdf_bytes))
+        note_usage(getattr(response, 'usage_metadata', None))
+        return response.text
 
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON: {e}")
-            print("Raw response from API:", response.text)
-            raise
+    def _generate_stream(self, pdf_bytes, parser):
+        """Stream the response into parser and return the full response text"""
+        # A retried stream starts from scratch; the parser skips what it already reported
+        parser.restart()
+        usage_metadata = None
+        publish(UPLOAD_STARTED, bytes=len(pdf_bytes))
+        uploaded = False
+        try:
+            for chunk in self.client.models.generate_content_stream(**self._request_kwargs(pdf_bytes)):
+                if not uploaded:
+                    # The PDF goes inline with the request, so it is all on the server once a reply arrives
+                    publish(BYTES_UPLOADED, bytes=len(pdf_bytes))
+                    uploaded = True
+                parser.feed(chunk.text)
+                # Every chunk carries the running totals, so only the last one counts
+                usage_metadata = getattr(chunk, 'usage_metadata', None) or usage_metadata
+        finally:
+            if not uploaded:
+                publish(BYTES_UPLOADED, bytes=len(pdf_bytes))
+        note_usage(usage_metadata)
+        return parser.text
+
+    async def _generate_async(self, pdf_bytes, prompt=EXTRACTION_PROMPT):
+        """Async counterpart of _generate using the client's aio interface"""
+        publish(UPLOAD_STARTED, bytes=len(pdf_bytes))
+        try:
+            response = await self.client.aio.models.generate_content(**self._request_kwargs(pdf_bytes, prompt))
+        finally:
+            publish(BYTES_UPLOADED, bytes=len(pdf_bytes))
+        note_usage(getattr(response, 'usage_metadata', None))
+        return response.text
+
+    def _archive_extraction(self, extracted_data, gui_data, filepath, pdf_bytes, fresh=True):
+        """Append the extraction to the archive; a failure here never fails the extraction.
 
-    def _save_extracted_json(self, extracted_data):
-        """Save extracted JSON data for reference"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        json_path = JSONS_DIR / f"output_{timestamp}.json"
-        with open(json_path, 'w') as f:
-            json.dump(extracted_data, f, indent=2)
\ No newline at end of file
+        A cached extraction is only appended if the archive no longer has one
+        for the PDF, so cache hits and prefetches do not add duplicates.
+        """
+        po_number = (gui_data or {}).get('po_number')
+        try:
+            sha256 = pdf_sha256(pdf_bytes)
+            if not fresh and self.archive.contains(sha256):
+                if po_number:
+                    self.archive.link_po(po_number, sha256=sha256)
+                return
+            self.archive.add(extracted_data, sha256=sha256, source_file=filepath, po_number=po_number)
+        except Exception as e:
+            print(f"Error archiving extraction: {e}")
+
+    def record_po(self, filepath, po_number, sha256=None):
+        """Link po_number to the archived extraction of the quotation it was generated from"""
+        try:
+            if sha256 is None:
+                self.archive.link_po(po_number, pdf_bytes=pathlib.Path(filepath).read_bytes())
+            else:
+                self.archive.link_po(po_number, sha256=sha256)
+        except Exception as e:
+            print(f"Error archiving PO number: {e}")
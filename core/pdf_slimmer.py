@@ -0,0 +1,242 @@
+"""Shrink a quotation PDF before it is uploaded to Gemini.
+
+Scanned quotations are often tens of megabytes of 300-600 dpi page images,
+and some end in pages of terms and conditions. Gemini needs neither the full
+resolution nor the appendix. slim_pdf() rebuilds the PDF from the pages worth
+sending, which also drops attachments, JavaScript, outlines and XMP metadata.
+It removes page thumbnails and fonts or images a page never draws, downsamples
+oversized images (with Pillow installed) and merges identical objects.
+"""
+import importlib.util
+import io
+import re
+import time
+
+from config.settings import (
+    PDF_SLIM_MAX_IMAGE_DPI, PDF_SLIM_JPEG_QUALITY, PDF_SLIM_DROP_BLANK_PAGES, PDF_SLIM_BOILERPLATE_PATTERNS
+)
+from core.pdf_pages import _pypdf
+
+# Page entries that only help PDF viewers
+VIEWER_ONLY_KEYS = ('/Thumb', '/PieceInfo', '/Metadata')
+# A boilerplate page starts with its heading, so only the top of the page is matched
+BOILERPLATE_HEADING_CHARS = 300
+# Shorter pages may be a quotation's own payment and delivery terms, which Gemini extracts
+BOILERPLATE_MIN_CHARS = 1500
+# Content streams this short with no text or images draw at most a stray line
+BLANK_CONTENT_BYTES = 200
+NAME_RE = re.compile(rb'/([^\s/\[\]()<>{}%]+)')
+NAME_ESCAPE_RE = re.compile(rb'#([0-9A-Fa-f]{2})')
+
+class SlimResult:
+    """The slimmed PDF and what was done to it"""
+
+    def __init__(self, data, original_bytes, pages, pages_dropped, images_downsampled, resources_dropped, seconds):
+        self.data = data
+        self.original_bytes = original_bytes
+        self.pages = pages
+        self.pages_dropped = pages_dropped
+        self.images_downsampled = images_downsampled
+        self.resources_dropped = resources_dropped
+        self.seconds = seconds
+
+    @property
+    def slimmed_bytes(self):
+        return len(self.data)
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - len(self.data)
+
+def _pillow_available():
+    return importlib.util.find_spec("PIL") is not None
+
+def _page_text(page):
+    try:
+        return page.extract_text() or ''
+    except Exception:
+        # Text extraction is only used to decide what to drop, so keep pages it cannot read
+        return None
+
+def _content_bytes(page):
+    contents = page.get_contents()
+    return contents.get_data() if contents is not None else b''
+
+def _image_names(page):
+    resources = page.get('/Resources')
+    xobjects = resources.get_object().get('/XObject') if resources is not None else None
+    if xobjects is None:
+        return []
+    xobjects = xobjects.get_object()
+    return [name for name in xobjects if xobjects[name].get_object().get('/Subtype') == '/Image']
+
+def _is_blank(page, text):
+    return (text is not None and not text.strip() and not _image_names(page)
+            and '/Annots' not in page and len(_content_bytes(page).strip()) < BLANK_CONTENT_BYTES)
+
+def _is_boilerplate(text, patterns):
+    return (text is not None and len(text) >= BOILERPLATE_MIN_CHARS
+            and any(pattern.search(text[:BOILERPLATE_HEADING_CHARS]) for pattern in patterns))
+
+def pages_to_keep(reader, drop_blank=True, boilerplate_patterns=()):
+    """Return the indices of the pages worth sending.
+
+    Blank pages go anywhere; boilerplate pages only at the end of the document
+    and only when they are a page of small print, so a page that merely
+    mentions the terms is never dropped. The first page always stays.
+    """
+    patterns = [re.compile(pattern, re.I) for pattern in boilerplate_patterns]
+    texts = [_page_text(page) for page in reader.pages]
+    kept = [index for index, page in enumerate(reader.pages)
+            if index == 0 or not (drop_blank and _is_blank(page, texts[index]))]
+    while len(kept) > 1 and _is_boilerplate(texts[kept[-1]], patterns):
+        kept.pop()
+    return kept
+
+def _drop_unused_resources(pages):
+    """Remove fonts and XObjects that none of pages using the resource dictionary draws"""
+    # Pages can share one /Resources dictionary, so collect every name it must keep first
+    used_names = {}
+    resources_by_id = {}
+    for page in pages:
+        resources = page.get('/Resources')
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        key = id(resources)
+        resources_by_id[key] = resources
+        used_names.setdefault(key, set()).update(
+            NAME_ESCAPE_RE.sub(lambda match: bytes.fromhex(match.group(1).decode()), name)
+            for name in NAME_RE.findall(_content_bytes(page))
+        )
+
+    dropped = 0
+    for key, resources in resources_by_id.items():
+        for category in ('/Font', '/XObject'):
+            entries = resources.get(category)
+            if entries is None:
+                continue
+            entries = entries.get_object()
+            for name in list(entries):
+                # pypdf decodes names as UTF-8 where it can, and as Latin-1 otherwise
+                spellings = {name[1:].encode('utf-8'), name[1:].encode('latin-1', 'replace')}
+                if not spellings & used_names[key]:
+                    del entries[name]
+                    dropped += 1
+    return dropped
+
+# Colour spaces a decoded image can be handed to Pillow in as it is
+PIL_MODES = {'/DeviceGray': 'L', '/DeviceRGB': 'RGB'}
+ICC_PIL_MODES = {1: 'L', 3: 'RGB'}
+
+def _pil_mode(image):
+    color_space = image.get('/ColorSpace')
+    color_space = color_space.get_object() if color_space is not None else None
+    if isinstance(color_space, list):
+        if color_space[0] == '/ICCBased':
+            return ICC_PIL_MODES.get(color_space[1].get_object().get('/N'))
+        return None
+    return PIL_MODES.get(color_space)
+
+def _decode_image(page, name, image, size):
+    """Return image as a PIL image, decoding JPEGs at the nearest scale above size"""
+    from PIL import Image
+
+    filters = image.get('/Filter')
+    filters = list(filters) if isinstance(filters, list) else [filters] if filters is not None else []
+    mode = _pil_mode(image)
+    if mode and filters == ['/DCTDecode']:
+        # pypdf passes JPEG data through undecoded
+        pil_image = Image.open(io.BytesIO(image.get_data()))
+        if pil_image.mode == mode:
+            pil_image.draft(mode, size)
+            return pil_image
+    elif mode and filters in ([], ['/FlateDecode']) and image.get('/BitsPerComponent') == 8:
+        return Image.frombytes(mode, (image['/Width'], image['/Height']), image.get_data())
+    # Indexed, CMYK and other encodings; pypdf decodes these itself, more slowly
+    return page.images[name].image
+
+def _jpeg_stream(pil_image, jpeg_quality):
+    from pypdf.generic import DecodedStreamObject, NameObject, NumberObject
+
+    if pil_image.mode not in ('RGB', 'L'):
+        pil_image = pil_image.convert('RGB')
+    output = io.BytesIO()
+    pil_image.save(output, 'JPEG', quality=jpeg_quality)
+    # set_data() stores the bytes as they are, so they go out DCT-encoded
+    stream = DecodedStreamObject()
+    stream.set_data(output.getvalue())
+    stream.update({
+        NameObject('/Type'): NameObject('/XObject'),
+        NameObject('/Subtype'): NameObject('/Image'),
+        NameObject('/Width'): NumberObject(pil_image.width),
+        NameObject('/Height'): NumberObject(pil_image.height),
+        NameObject('/ColorSpace'): NameObject('/DeviceGray' if pil_image.mode == 'L' else '/DeviceRGB'),
+        NameObject('/BitsPerComponent'): NumberObject(8),
+        NameObject('/Filter'): NameObject('/DCTDecode'),
+    })
+    return stream
+
+def _downsample_images(writer, max_dpi, jpeg_quality):
+    """Re-encode images larger than max_dpi at full-page size; returns how many were replaced"""
+    replaced = set()
+    for page in writer.pages:
+        # No image is drawn larger than the page, in either orientation, so this never goes below max_dpi
+        max_pixels = max(float(page.mediabox.width), float(page.mediabox.height)) / 72 * max_dpi
+        names = _image_names(page)
+        xobjects = page['/Resources'].get_object()['/XObject'].get_object() if names else {}
+        for name in names:
+            reference = xobjects.raw_get(name)
+            # Pages of one scan often share an image; only the first needs replacing
+            if not hasattr(reference, 'idnum') or reference.idnum in replaced:
+                continue
+            image = reference.get_object()
+            width, height = image['/Width'], image['/Height']
+            scale = max_pixels / max(width, height)
+            # Bi-level scans are already compact, and masks and decode arrays would be lost in a JPEG
+            if scale >= 1 or image.get('/BitsPerComponent') == 1 or any(
+                    key in image for key in ('/SMask', '/Mask', '/Decode', '/ImageMask')):
+                continue
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            pil_image = _decode_image(page, name, image, size).resize(size, reducing_gap=3.0)
+            # Replacing the object in place keeps every page and form that draws it pointing at it
+            writer._replace_object(reference, _jpeg_stream(pil_image, jpeg_quality))
+            replaced.add(reference.idnum)
+    return len(replaced)
+
+def slim_pdf(pdf_bytes, max_image_dpi=PDF_SLIM_MAX_IMAGE_DPI, jpeg_quality=PDF_SLIM_JPEG_QUALITY,
+             drop_blank_pages=PDF_SLIM_DROP_BLANK_PAGES, boilerplate_patterns=PDF_SLIM_BOILERPLATE_PATTERNS):
+    """Return a SlimResult with a smaller PDF holding what Gemini needs from pdf_bytes.
+
+    max_image_dpi=None keeps images as they are; so does a missing Pillow.
+    """
+    start_time = time.perf_counter()
+    pypdf = _pypdf()
+    reader = pypdf.PdfReader(io.BytesIO(pdf_bytes))
+    kept = pages_to_keep(reader, drop_blank_pages, boilerplate_patterns)
+
+    # Pruned before copying, since the writer copies every object a page still reaches
+    pages = [reader.pages[index] for index in kept]
+    for page in pages:
+        for key in VIEWER_ONLY_KEYS:
+            if key in page:
+                del page[key]
+    resources_dropped = _drop_unused_resources(pages)
+
+    # A new writer takes only the pages, leaving attachments, scripts and outlines behind
+    writer = pypdf.PdfWriter()
+    for page in pages:
+        writer.add_page(page)
+    images_downsampled = 0
+    if max_image_dpi and _pillow_available():
+        images_downsampled = _downsample_images(writer, max_image_dpi, jpeg_quality)
+    for page in writer.pages:
+        page.compress_content_streams()
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return SlimResult(
+        output.getvalue(), len(pdf_bytes), len(reader.pages), len(reader.pages) - len(kept),
+        images_downsampled, resources_dropped, time.perf_counter() - start_time
+    )
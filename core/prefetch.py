@@ -0,0 +1,146 @@
+import contextvars
+import pathlib
+import threading
+from concurrent.futures import Future
+
+class _Received:
+    """The header and items of a prefetch so far, replayed to listeners that join it late"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.header = None
+        self.items = []
+        self._listeners = []
+
+    def listen(self, on_header=None, on_item=None):
+        # Under the lock, so nothing arriving meanwhile is missed or delivered twice
+        with self._lock:
+            if on_header is not None and self.header is not None:
+                on_header(self.header)
+            if on_item is not None:
+                for index, item in enumerate(self.items):
+                    on_item(index, item)
+            self._listeners.append((on_header, on_item))
+
+    def add_header(self, header):
+        with self._lock:
+            self.header = header
+            for on_header, _ in self._listeners:
+                if on_header is not None:
+                    on_header(header)
+
+    def add_item(self, index, item):
+        with self._lock:
+            self.items.append(item)
+            for _, on_item in self._listeners:
+                if on_item is not None:
+                    on_item(index, item)
+
+class ExtractionPrefetcher:
+    """Extract the selected quotation in the background before it is needed.
+
+    start() is called as soon as a PDF is chosen; result() joins that
+    extraction if it is for the same file, so the Gemini round trip overlaps
+    with filling in the PO header. result() also hands over the header and
+    items streamed in so far, then the rest as they arrive, so the PO can be
+    filled in before the extraction ends. Choosing another file discards the
+    previous prefetch; a request already in flight still completes into the
+    extraction cache but its result is dropped. The extraction runs in a copy of the
+    caller's context, so it publishes progress wherever start() was reporting.
+    """
+
+    def __init__(self, pdf_processor):
+        self.pdf_processor = pdf_processor
+        self._lock = threading.Lock()
+        self._current = None
+
+    def _key(self, filepath, refresh_cache):
+        # A file replaced on disk after it was selected gets a different key
+        stat = filepath.stat()
+        return str(filepath.resolve()), stat.st_mtime_ns, stat.st_size, refresh_cache
+
+    def start(self, filepath, refresh_cache=False, on_item=None):
+        """Begin extracting filepath in a background thread, discarding any other prefetch"""
+        filepath = pathlib.Path(filepath)
+        key = self._key(filepath, refresh_cache)
+        with self._lock:
+            if self._current is not None and self._current[0] == key and not self._failed(self._current[1]):
+                return
+            self._discard()
+            future = Future()
+            received = _Received()
+            received.listen(on_item=on_item)
+            self._current = (key, future, received)
+
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(self._run, future, filepath, refresh_cache, received))
+        thread.daemon = True
+        thread.start()
+
+    def discard(self):
+        """Drop the current prefetch"""
+        with self._lock:
+            self._discard()
+
+    def _discard(self):
+        if self._current is not None:
+            self._current[1].cancel()
+            self._current = None
+
+    @staticmethod
+    def _failed(future):
+        return future.done() and future.exception() is not None
+
+    def _is_current(self, future):
+        with self._lock:
+            return self._current is not None and self._current[1] is future
+
+    def _run(self, future, filepath, refresh_cache, received):
+        if not future.set_running_or_notify_cancel():
+            return
+
+        def forward_header(header):
+            if self._is_current(future):
+                received.add_header(header)
+
+        def forward_item(index, item):
+            if self._is_current(future):
+                received.add_item(index, item)
+
+        try:
+            extracted_data = self.pdf_processor.extract_po_data(
+                filepath, None, refresh_cache=refresh_cache, on_header=forward_header, on_item=forward_item
+            )
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(extracted_data)
+
+    def _matching(self, filepath, refresh_cache):
+        key = self._key(pathlib.Path(filepath), refresh_cache)
+        with self._lock:
+            return self._current if self._current is not None and self._current[0] == key else None
+
+    def finished(self, filepath, refresh_cache=False):
+        """Return the extraction of filepath if its prefetch has already finished, otherwise None"""
+        current = self._matching(filepath, refresh_cache)
+        if current is None or not current[1].done() or self._failed(current[1]):
+            return None
+        return current[1].result()
+
+    def result(self, filepath, refresh_cache=False, on_header=None, on_item=None):
+        """Return the extraction of filepath, joining the prefetch if there is one for it.
+
+        on_header(header) and on_item(index, item) are called with what has
+        already arrived and then as the rest of the extraction streams in.
+        """
+        current = self._matching(filepath, refresh_cache)
+        if current is not None:
+            current[2].listen(on_header, on_item)
+            try:
+                return current[1].result()
+            except Exception as e:
+                print(f"Background extraction failed ({e}); extracting again...")
+
+        return self.pdf_processor.extract_po_data(pathlib.Path(filepath), None, refresh_cache=refresh_cache,
+                                                  on_header=on_header, on_item=on_item)
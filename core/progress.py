@@ -0,0 +1,176 @@
+"""Progress events from extractions and renders, picked up by a UI thread.
+
+Work running under ProgressChannel.reporting() publishes events into that
+channel from whatever thread it is on; the GUI drains the channel from the Tk
+loop, so worker threads never touch widgets. Outside reporting(), publish()
+does nothing, which keeps batch runs free of any overhead.
+"""
+import contextlib
+import contextvars
+import queue
+import time
+
+STAGE_STARTED = 'stage_started'
+STAGE_FINISHED = 'stage_finished'
+UPLOAD_STARTED = 'upload_started'
+BYTES_UPLOADED = 'bytes_uploaded'
+CHUNK_FINISHED = 'chunk_finished'
+ITEMS_RECEIVED = 'items_received'
+ROWS_WRITTEN = 'rows_written'
+TASK_FINISHED = 'task_finished'
+JOB_CHANGED = 'job_changed'
+
+_current_reporter = contextvars.ContextVar('progress_reporter', default=None)
+
+class ProgressEvent:
+    """One thing that happened in a task, with kind-specific fields"""
+
+    __slots__ = ('task', 'kind', 'fields', 'timestamp')
+
+    def __init__(self, task, kind, fields):
+        self.task = task
+        self.kind = kind
+        self.fields = fields
+        self.timestamp = time.perf_counter()
+
+class ProgressChannel:
+    """Unbounded queue of ProgressEvents; publish from any thread, drain from one"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def publish(self, task, kind, **fields):
+        self._queue.put(ProgressEvent(task, kind, fields))
+
+    def drain(self, max_events=None):
+        """Return the events published so far, oldest first, without blocking"""
+        events = []
+        while max_events is None or len(events) < max_events:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    @contextlib.contextmanager
+    def reporting(self, task):
+        """Publish the events of the enclosed block, and of threads it starts with its context, as task"""
+        token = _current_reporter.set((self, task))
+        try:
+            yield
+        finally:
+            _current_reporter.reset(token)
+
+def publish(kind, **fields):
+    """Publish an event to the current channel, if there is one"""
+    reporter = _current_reporter.get()
+    if reporter is not None:
+        channel, task = reporter
+        channel.publish(task, kind, **fields)
+
+class ProgressTracker:
+    """Folds the events of one PO into a fraction done and per-stage timings.
+
+    The bar is split into phases: reading the PDF, uploading it, receiving the
+    response and rendering. The response has no known size, so a single
+    request only counts the items streamed so far towards part of its share;
+    a chunked extraction advances as each chunk completes.
+    """
+
+    PHASES = (('read', 0.05), ('upload', 0.15), ('response', 0.5), ('render', 0.3))
+    # Streamed items approach, but never fill, the share of a response still in flight
+    ITEMS_HALF_WAY = 20
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # (record, stage) -> [seconds so far, start time of the running block or None]
+        self.stages = {}
+        self.read_done = False
+        self.upload_total = 0
+        self.uploaded = 0
+        self.chunks_done = 0
+        self.chunks_total = 0
+        self.items = 0
+        self.extraction_done = False
+        self.reset_render()
+
+    def reset_render(self):
+        """Forget the last render, e.g. before rendering the same extraction again"""
+        self.rows_done = 0
+        self.rows_total = 0
+        self.render_done = False
+        self.stages = {key: value for key, value in self.stages.items() if key[0] == 'extract'}
+
+    def apply(self, event):
+        fields = event.fields
+        if event.kind == STAGE_STARTED:
+            timing = self.stages.setdefault((fields['record'], fields['stage']), [0.0, None])
+            timing[1] = event.timestamp
+        elif event.kind == STAGE_FINISHED:
+            key = (fields['record'], fields['stage'])
+            timing = self.stages.setdefault(key, [0.0, None])
+            timing[0] += fields['seconds']
+            timing[1] = None
+            if key == ('extract', 'read_pdf'):
+                self.read_done = True
+            elif key[0] != 'extract' and key[1] == 'save':
+                self.render_done = True
+        elif event.kind == UPLOAD_STARTED:
+            self.upload_total += fields['bytes']
+        elif event.kind == BYTES_UPLOADED:
+            self.uploaded += fields['bytes']
+        elif event.kind == CHUNK_FINISHED:
+            self.chunks_done = fields['done']
+            self.chunks_total = fields['total']
+        elif event.kind == ITEMS_RECEIVED:
+            self.items = fields['count']
+            if fields.get('final'):
+                self.extraction_done = True
+        elif event.kind == ROWS_WRITTEN:
+            self.rows_done = fields['done']
+            self.rows_total = fields['total'] or self.rows_total
+
+    def phase_fractions(self):
+        if self.extraction_done:
+            read = upload = response = 1.0
+        else:
+            read = 1.0 if self.read_done else 0.0
+            upload = self.uploaded / self.upload_total if self.upload_total else 0.0
+            if self.chunks_total:
+                response = self.chunks_done / self.chunks_total
+            else:
+                response = 0.9 * self.items / (self.items + self.ITEMS_HALF_WAY)
+        if self.render_done:
+            render = 1.0
+        else:
+            # The last fifth of a render is serialising the workbook
+            render = 0.8 * self.rows_done / self.rows_total if self.rows_total else 0.0
+        return {'read': read, 'upload': upload, 'response': response, 'render': render}
+
+    @property
+    def fraction(self):
+        """Share of the PO done, from 0.0 to 1.0"""
+        fractions = self.phase_fractions()
+        return sum(weight * fractions[phase] for phase, weight in self.PHASES)
+
+    def stage_timings(self, now=None):
+        """Return [(label, seconds, running)] in the order the stages started"""
+        now = time.perf_counter() if now is None else now
+        timings = []
+        for (record, name), (seconds, started_at) in self.stages.items():
+            running = started_at is not None
+            if running:
+                seconds += now - started_at
+            label = name if record == 'extract' else f"{record} {name}"
+            timings.append((label, seconds, running))
+        return timings
+
+    def describe_stages(self, min_seconds=0.05):
+        """One line of the stage timings, leaving out stages too quick to matter"""
+        parts = []
+        for label, seconds, running in self.stage_timings():
+            if running or seconds >= min_seconds:
+                parts.append(f"{label} {seconds:.1f}s{'…' if running else ''}")
+        return " · ".join(parts)
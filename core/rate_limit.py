@@ -0,0 +1,184 @@
+import asyncio
+import collections
+import contextlib
+import random
+import threading
+import time
+
+from config.settings import (
+    GEMINI_REQUESTS_PER_MINUTE, GEMINI_MAX_CONCURRENCY, GEMINI_MAX_RETRIES,
+    GEMINI_BACKOFF_BASE_SECONDS, GEMINI_BACKOFF_MAX_SECONDS
+)
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+class ConcurrencyLimit:
+    """At most limit holders at once, counted across threads and every event loop, served in arrival order"""
+
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self._active = 0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    def _acquire_or_wait(self, wake):
+        """Take a free slot and return True, or queue wake() to be called when one is handed over"""
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def acquire(self):
+        event = threading.Event()
+        if not self._acquire_or_wait(event.set):
+            event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(_resolve, future)
+
+        if self._acquire_or_wait(wake):
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = wake not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(wake)
+            if handed_over:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                wake = self._waiters.popleft()
+                try:
+                    # The slot passes straight to the waiter, so the count stays the same
+                    wake()
+                    return
+                except RuntimeError:
+                    # The waiter's event loop has closed
+                    continue
+            self._active -= 1
+
+class RateLimiter:
+    """Token bucket for requests-per-minute combined with a concurrency cap.
+
+    One instance is meant to be shared by every request in the process, from
+    threads (slot) or coroutines (slot_async); both count towards one
+    max_concurrency, whichever thread or event loop they run on.
+    """
+
+    def __init__(self, requests_per_minute=GEMINI_REQUESTS_PER_MINUTE, max_concurrency=GEMINI_MAX_CONCURRENCY):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, min(float(requests_per_minute), float(max_concurrency)))
+        self.max_concurrency = max_concurrency
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._concurrency = ConcurrencyLimit(max_concurrency)
+
+    def _reserve(self):
+        """Take one token and return how long to wait before it becomes valid"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _refund(self):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Block until a request may be sent from this thread"""
+        self._concurrency.acquire()
+        try:
+            delay = self._reserve()
+            if delay:
+                time.sleep(delay)
+            yield
+        finally:
+            self._concurrency.release()
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self):
+        """Wait until a request may be sent from this coroutine"""
+        await self._concurrency.acquire_async()
+        try:
+            delay = self._reserve()
+            if delay:
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    self._refund()
+                    raise
+            yield
+        finally:
+            self._concurrency.release()
+
+def is_retryable(error):
+    """Return True for rate-limit, server-side and timeout errors"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    return code in RETRYABLE_STATUS_CODES
+
+def backoff_delay(attempt, base=GEMINI_BACKOFF_BASE_SECONDS, maximum=GEMINI_BACKOFF_MAX_SECONDS):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+def call_with_retry(call, rate_limiter=None, max_retries=GEMINI_MAX_RETRIES):
+    """Call call() under the rate limiter, retrying retryable errors with backoff"""
+    attempt = 0
+    while True:
+        try:
+            if rate_limiter is None:
+                return call()
+            with rate_limiter.slot():
+                return call()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Gemini request failed ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            attempt += 1
+
+async def call_with_retry_async(call, rate_limiter=None, max_retries=GEMINI_MAX_RETRIES, attempt_timeout=None):
+    """Await call() under the rate limiter, retrying retryable errors with backoff.
+
+    attempt_timeout bounds each attempt; wrap the whole call in asyncio.wait_for
+    to put a deadline on the request including its retries.
+    """
+    attempt = 0
+    while True:
+        try:
+            if rate_limiter is None:
+                return await asyncio.wait_for(call(), attempt_timeout)
+            async with rate_limiter.slot_async():
+                return await asyncio.wait_for(call(), attempt_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt)
+            print(f"Gemini request failed ({e!r}); retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,171 @@
+"""Record Gemini responses to disk and replay them without the network.
+
+A recording is keyed by the same fingerprint as the extraction cache (PDF
+hash, prompt, model and sampling config) and keeps the raw response text, the
+streamed chunks and the token counts. Replaying serves them back through the
+client interface PDFProcessor already uses, so re-rendering a month of POs
+after a template change costs no API calls.
+"""
+import asyncio
+import json
+import os
+import pathlib
+import threading
+import time
+from types import SimpleNamespace
+
+from config.settings import RECORDINGS_DIR
+from core.cache import ExtractionCache, pdf_sha256
+
+RESPONSE_MODES = ('record', 'replay')
+
+class RecordingNotFound(LookupError):
+    """Raised in replay mode for a request that was never recorded"""
+
+class ResponseStore:
+    """Directory of recorded responses, one JSON file per request fingerprint"""
+
+    def __init__(self, directory=RECORDINGS_DIR):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def describe(request):
+        """Return the fingerprint fields of generate_content keyword arguments"""
+        part, prompt = request['contents']
+        config = request['config']
+        return {
+            'pdf_bytes': part.inline_data.data,
+            'prompt': prompt,
+            'model': request['model'],
+            'temperature': config.temperature,
+            'top_p': config.top_p,
+        }
+
+    def key(self, request):
+        return ExtractionCache.make_key(**self.describe(request))
+
+    def _entry_path(self, key):
+        return self.directory / f"{key}.json"
+
+    def load(self, request):
+        """Return the recorded entry for request, or raise RecordingNotFound"""
+        key = self.key(request)
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            fields = self.describe(request)
+            raise RecordingNotFound(
+                f"No recorded response for PDF {pdf_sha256(fields['pdf_bytes'])[:12]} "
+                f"with model {fields['model']} in {self.directory}"
+            ) from None
+
+    def save(self, request, text, usage_metadata, latency_seconds, chunks=None):
+        fields = self.describe(request)
+        entry = {
+            'recorded_at': time.time(),
+            'pdf_sha256': pdf_sha256(fields.pop('pdf_bytes')),
+            **fields,
+            'latency_seconds': round(latency_seconds, 3),
+            'text': text,
+            'chunks': chunks,
+            'usage': {
+                'prompt_token_count': getattr(usage_metadata, 'prompt_token_count', None),
+                'candidates_token_count': getattr(usage_metadata, 'candidates_token_count', None),
+            },
+        }
+        entry_path = self._entry_path(self.key(request))
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            # A missed recording must not fail the extraction it came from
+            print(f"Error writing recorded response: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+def _usage(entry):
+    return SimpleNamespace(**entry.get('usage') or {})
+
+class _RecordingModels:
+    def __init__(self, models, store):
+        self._models = models
+        self._store = store
+
+    def generate_content(self, **request):
+        start_time = time.perf_counter()
+        response = self._models.generate_content(**request)
+        self._store.save(request, response.text, getattr(response, 'usage_metadata', None),
+                         time.perf_counter() - start_time)
+        return response
+
+    def generate_content_stream(self, **request):
+        start_time = time.perf_counter()
+        chunks = []
+        usage_metadata = None
+        for chunk in self._models.generate_content_stream(**request):
+            chunks.append(chunk.text or '')
+            usage_metadata = getattr(chunk, 'usage_metadata', None) or usage_metadata
+            yield chunk
+        # Only a stream that ran to completion is recorded
+        self._store.save(request, ''.join(chunks), usage_metadata, time.perf_counter() - start_time, chunks)
+
+class _RecordingAsyncModels:
+    def __init__(self, models, store):
+        self._models = models
+        self._store = store
+
+    async def generate_content(self, **request):
+        start_time = time.perf_counter()
+        response = await self._models.generate_content(**request)
+        self._store.save(request, response.text, getattr(response, 'usage_metadata', None),
+                         time.perf_counter() - start_time)
+        return response
+
+class RecordingClient:
+    """Wraps a Gemini client and records every successful response"""
+
+    def __init__(self, client, store):
+        self.models = _RecordingModels(client.models, store)
+        self.aio = SimpleNamespace(models=_RecordingAsyncModels(client.aio.models, store))
+
+class _ReplayModels:
+    def __init__(self, store, simulate_latency):
+        self._store = store
+        self._simulate_latency = simulate_latency
+
+    def _delay(self, entry, parts=1):
+        return entry.get('latency_seconds', 0.0) / parts if self._simulate_latency else 0.0
+
+    def generate_content(self, **request):
+        entry = self._store.load(request)
+        time.sleep(self._delay(entry))
+        return SimpleNamespace(text=entry['text'], usage_metadata=_usage(entry))
+
+    def generate_content_stream(self, **request):
+        entry = self._store.load(request)
+        chunks = entry.get('chunks') or [entry['text']]
+        for index, chunk in enumerate(chunks):
+            time.sleep(self._delay(entry, len(chunks)))
+            last = index == len(chunks) - 1
+            yield SimpleNamespace(text=chunk, usage_metadata=_usage(entry) if last else None)
+
+class _ReplayAsyncModels(_ReplayModels):
+    async def generate_content(self, **request):
+        entry = self._store.load(request)
+        await asyncio.sleep(self._delay(entry))
+        return SimpleNamespace(text=entry['text'], usage_metadata=_usage(entry))
+
+class ReplayClient:
+    """Serves recorded responses; requests without a recording raise RecordingNotFound.
+
+    simulate_latency=True sleeps for the recorded latency, for perf runs that
+    should see realistic response timing.
+    """
+
+    def __init__(self, store, simulate_latency=False):
+        self.models = _ReplayModels(store, simulate_latency)
+        self.aio = SimpleNamespace(models=_ReplayAsyncModels(store, simulate_latency))
@@ -0,0 +1,112 @@
+"""Client for core.server, usable wherever the GUI expects a PDFProcessor.
+
+Extractions go to the shared server, so every copy of the app uses its cache
+and its Gemini quota. Rendering stays local in the GUI, since updating the
+header of the last PO patches the workbook it already holds; render() is
+there for scripts that want the server's template instead.
+"""
+import json
+import pathlib
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from config.settings import SERVER_REQUEST_TIMEOUT_SECONDS
+from core.cache import pdf_sha256
+from core.excel_generator import RenderedPO
+from core.metrics import default_metrics, stage, note
+from core.pdf_processor import PDFProcessor
+from core.progress import publish, UPLOAD_STARTED, BYTES_UPLOADED, ITEMS_RECEIVED
+
+class ServerError(Exception):
+    """The server could not be reached or answered with an error"""
+
+class RemoteBackend:
+    def __init__(self, server_url, timeout=SERVER_REQUEST_TIMEOUT_SECONDS, metrics=None):
+        self.server_url = server_url.rstrip('/')
+        self.timeout = timeout
+        self.metrics = metrics or default_metrics
+
+    def _request(self, path, data, content_type, query=None):
+        url = f"{self.server_url}{path}"
+        if query:
+            url += f"?{urllib.parse.urlencode(query)}"
+        request = urllib.request.Request(url, data=data, headers={'Content-Type': content_type},
+                                         method='GET' if data is None else 'POST')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error')
+            except ValueError:
+                message = None
+            raise ServerError(f"Server error {e.code}: {message or e.reason}") from e
+        except OSError as e:
+            raise ServerError(f"Could not reach the PO server at {self.server_url}: {e}") from e
+
+    def _request_json(self, path, payload, query=None):
+        body, _ = self._request(path, json.dumps(payload).encode('utf-8'), 'application/json', query)
+        return json.loads(body)
+
+    def health(self):
+        body, _ = self._request('/health', None, 'application/json')
+        return json.loads(body)
+
+    def warm_up(self):
+        """Check that the server is reachable"""
+        return self.health()
+
+    def extract_po_data(self, filepath, gui_data, use_cache=True, refresh_cache=False, chunked=None,
+                        on_header=None, on_item=None):
+        """Extract through the server; same contract as PDFProcessor.extract_po_data.
+
+        The server answers with the complete extraction, so on_header and
+        on_item are called once it arrives. chunked is decided by the server.
+        """
+        filepath = pathlib.Path(filepath)
+        with self.metrics.record('extract', file=filepath.name, remote=self.server_url):
+            with stage('read_pdf'):
+                pdf_bytes = filepath.read_bytes()
+            note(pdf_bytes=len(pdf_bytes))
+            publish(UPLOAD_STARTED, bytes=len(pdf_bytes))
+            with stage('server'):
+                try:
+                    body, _ = self._request('/extract', pdf_bytes, 'application/pdf', {
+                        'filename': filepath.name,
+                        'use_cache': int(use_cache),
+                        'refresh': int(refresh_cache),
+                    })
+                finally:
+                    publish(BYTES_UPLOADED, bytes=len(pdf_bytes))
+            result = json.loads(body)
+            extracted_data = result['extraction']
+            note(item_count=len(extracted_data.get('items') or []), coalesced=result.get('coalesced'))
+            publish(ITEMS_RECEIVED, count=len(extracted_data.get('items') or []), final=True)
+
+        PDFProcessor._replay(extracted_data, on_header, on_item)
+        if gui_data is None:
+            return extracted_data
+        return self.attach_gui_data(extracted_data, gui_data)
+
+    def attach_gui_data(self, extracted_data, gui_data):
+        """Return a copy of the extraction with the GUI header fields added"""
+        return dict(extracted_data, gui_data=gui_data)
+
+    def record_po(self, filepath, po_number):
+        """Link po_number to the quotation in the server's archive"""
+        try:
+            sha256 = pdf_sha256(pathlib.Path(filepath).read_bytes())
+            self._request_json('/po', {'pdf_sha256': sha256, 'po_number': po_number})
+        except Exception as e:
+            print(f"Error archiving PO number: {e}")
+
+    def render(self, po_data, gui_data=None, output_path=None):
+        """Render on the server; same contract as ExcelGenerator.render()"""
+        if gui_data is None:
+            gui_data = po_data.get('gui_data', {})
+        extracted_data = {k: v for k, v in po_data.items() if k != 'gui_data'}
+        payload = json.dumps({'extraction': extracted_data, 'gui_data': gui_data}).encode('utf-8')
+        data, headers = self._request('/render', payload, 'application/json')
+        rendered = RenderedPO(data, int(headers.get('X-Item-Count', 0)), float(headers.get('X-Total', 0)))
+        return rendered.deliver(output_path)
@@ -0,0 +1,120 @@
+"""Render POs on a pool of worker processes, so openpyxl renders are not serialised by the GIL.
+
+Each worker parses the template once when it starts and keeps it for every
+render. The parent sends a compact payload holding only the fields the
+renderer reads, and gets the finished workbook bytes back.
+"""
+import atexit
+import contextlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import EXCEL_RENDER_BACKEND, EXCEL_RENDER_PROCESSES
+from core.excel_generator import ExcelGenerator, RenderedPO, report_created
+from core.metrics import MetricsLog, default_metrics
+
+ITEM_FIELDS = ('quantity', 'unit', 'description', 'unitPrice')
+HEADER_FIELDS = ('companyName', 'address', 'pic', 'terms', 'quotationNumber')
+
+# The generator of the current worker process, created by _init_worker
+_worker_generator = None
+
+def compact_payload(po_data, gui_data):
+    """Strip an extraction down to what the renderer reads"""
+    payload = {field: po_data[field] for field in HEADER_FIELDS if field in po_data}
+    payload['items'] = [
+        {field: item.get(field) for field in ITEM_FIELDS}
+        for item in po_data.get('items', [])
+    ]
+    return payload, gui_data if gui_data is not None else po_data.get('gui_data', {})
+
+def _init_worker(backend):
+    global _worker_generator
+    # The parent records each render, so workers never write to the metrics file
+    _worker_generator = ExcelGenerator(backend=backend, metrics=MetricsLog(enabled=False))
+    _worker_generator.warm_up()
+
+def _render_in_worker(po_data, gui_data):
+    # Renders print progress; a pool of workers printing over each other helps nobody
+    with contextlib.redirect_stdout(io.StringIO()):
+        rendered = _worker_generator.render(po_data, gui_data)
+    return rendered.data, rendered.item_count, rendered.total, rendered.timings
+
+def _warm(_):
+    return os.getpid()
+
+class ProcessRenderPool:
+    """Drop-in for ExcelGenerator.render() that renders in worker processes.
+
+    render() blocks the calling thread until its PO is done, so call it from
+    as many threads as there are processes to keep them all busy.
+    """
+
+    def __init__(self, max_workers=EXCEL_RENDER_PROCESSES or os.cpu_count(), backend=EXCEL_RENDER_BACKEND,
+                 metrics=None):
+        self.max_workers = max(1, max_workers)
+        self.backend = backend
+        self.metrics = metrics or default_metrics
+        self._executor = None
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, initializer=_init_worker, initargs=(self.backend,)
+                )
+                atexit.register(self.shutdown)
+        return self._executor
+
+    def _submit(self, function, *args):
+        future = self.executor.submit(function, *args)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def warm_up(self, wait=True):
+        """Start every worker so each parses the template before the first render"""
+        # Submitting one task per worker before any is idle makes the executor start them all
+        futures = [self._submit(_warm, index) for index in range(self.max_workers)]
+        if wait:
+            for future in futures:
+                future.result()
+
+    def render(self, po_data, gui_data=None, output_path=None):
+        """Render in a worker process; same contract as ExcelGenerator.render()"""
+        record = self.metrics.start('render', backend=self.backend, processes=self.max_workers)
+        try:
+            payload, gui_data = compact_payload(po_data, gui_data)
+            data, item_count, total, timings = self._submit(_render_in_worker, payload, gui_data).result()
+            start_time = time.perf_counter()
+            rendered = RenderedPO(data, item_count, total, timings).deliver(output_path)
+            rendered.timings['write'] = time.perf_counter() - start_time
+            record.stages.update(rendered.timings)
+            record.note(item_count=item_count)
+        except Exception as e:
+            record.finish(error=e)
+            raise
+        record.finish()
+        report_created(output_path)
+        return rendered
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pending = list(self._futures)
+        # Renders that have not started are dropped; shutdown(cancel_futures=True) would need Python 3.9
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
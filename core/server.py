@@ -0,0 +1,252 @@
+"""HTTP service that extracts quotations and renders POs for every copy of the app in the office.
+
+All clients share one extraction cache, one Gemini rate limiter and one warm
+template, and identical uploads that arrive together cost a single Gemini call.
+There is no authentication, so only bind to an address on a trusted network.
+
+Endpoints:
+    GET  /health                          counters, as JSON
+    POST /extract?filename=q.pdf&refresh=1   body: the PDF; returns {"extraction", "pdf_sha256", "coalesced"}
+    POST /render                          body: {"extraction", "gui_data"}; returns the .xlsx
+    POST /po                              body: {"pdf_sha256", "po_number"}; links the PO in the archive
+
+Usage:
+    python -m core.server [--host 0.0.0.0] [--port 8765]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.settings import (
+    SERVER_HOST, SERVER_PORT, SERVER_MAX_UPLOAD_BYTES, EXCEL_RENDER_BACKEND, GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_MAX_CONCURRENCY
+)
+from core.cache import pdf_sha256
+from core.excel_generator import ExcelGenerator
+from core.pdf_processor import PDFProcessor
+from core.rate_limit import RateLimiter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+class RequestCoalescer:
+    """Run one call per key at a time; callers arriving while it runs share its result or error"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def run(self, key, function):
+        """Return (result, coalesced), where coalesced is True if another caller did the work"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            # Later callers go through the extraction cache instead
+            with self._lock:
+                del self._in_flight[key]
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+class POService:
+    """The shared PDFProcessor and ExcelGenerator behind the HTTP endpoints"""
+
+    def __init__(self, pdf_processor=None, excel_generator=None):
+        self.pdf_processor = pdf_processor or PDFProcessor()
+        self.excel_generator = excel_generator or ExcelGenerator()
+        self.coalescer = RequestCoalescer()
+        self.started_at = time.time()
+        self._counter_lock = threading.Lock()
+        self.counters = {'extractions': 0, 'coalesced': 0, 'renders': 0, 'errors': 0}
+
+    def count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def warm_up(self):
+        """Parse the template and load Gemini before the first request"""
+        self.excel_generator.warm_up()
+        try:
+            self.pdf_processor.warm_up()
+        except Exception as e:
+            # Anything that fails here fails again, with a proper error, on the first extraction
+            print(f"Gemini warm-up failed: {e}")
+
+    def extract(self, pdf_bytes, filename, use_cache=True, refresh_cache=False):
+        sha256 = pdf_sha256(pdf_bytes)
+        extracted_data, coalesced = self.coalescer.run(
+            (sha256, use_cache, refresh_cache),
+            lambda: self.pdf_processor.extract_pdf_bytes(
+                pdf_bytes, filename, use_cache=use_cache, refresh_cache=refresh_cache
+            )
+        )
+        self.count('coalesced' if coalesced else 'extractions')
+        return {'extraction': extracted_data, 'pdf_sha256': sha256, 'coalesced': coalesced}
+
+    def render(self, extracted_data, gui_data):
+        rendered = self.excel_generator.render(extracted_data, gui_data=gui_data)
+        self.count('renders')
+        return rendered
+
+    def link_po(self, sha256, po_number):
+        self.pdf_processor.record_po(None, po_number, sha256=sha256)
+
+    def health(self):
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return dict(
+            counters,
+            status='ok',
+            uptime_seconds=round(time.time() - self.started_at, 1),
+            in_flight=self.coalescer.in_flight,
+            backend=self.excel_generator.backend,
+        )
+
+class BadRequest(ValueError):
+    pass
+
+class POServiceHandler(BaseHTTPRequestHandler):
+    """Maps the endpoints onto self.server.service"""
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/health':
+            self._send_json(self.server.service.health())
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        service = self.server.service
+        try:
+            if url.path == '/extract':
+                pdf_bytes = self._read_body()
+                if not pdf_bytes.startswith(b'%PDF'):
+                    raise BadRequest("The request body is not a PDF")
+                self._send_json(service.extract(
+                    pdf_bytes,
+                    query.get('filename', 'upload.pdf'),
+                    use_cache=query.get('use_cache', '1') != '0',
+                    refresh_cache=query.get('refresh', '0') == '1',
+                ))
+            elif url.path == '/render':
+                body = self._read_json()
+                if not isinstance(body.get('extraction'), dict):
+                    raise BadRequest("Missing 'extraction'")
+                rendered = service.render(body['extraction'], body.get('gui_data') or {})
+                self._send(HTTPStatus.OK, rendered.data, XLSX_CONTENT_TYPE, {
+                    'X-Item-Count': str(rendered.item_count),
+                    'X-Total': repr(rendered.total),
+                })
+            elif url.path == '/po':
+                body = self._read_json()
+                if not body.get('pdf_sha256') or not body.get('po_number'):
+                    raise BadRequest("Missing 'pdf_sha256' or 'po_number'")
+                service.link_po(body['pdf_sha256'], body['po_number'])
+                self._send_json({'status': 'ok'})
+            else:
+                self._send_error(HTTPStatus.NOT_FOUND, f"No such endpoint: {url.path}")
+        except BadRequest as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            service.count('errors')
+            print(f"Error handling {url.path}: {e}")
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e) or type(e).__name__)
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            raise BadRequest("Content-Length is required")
+        if length > self.server.max_upload_bytes:
+            raise BadRequest(f"Upload of {length} bytes exceeds the {self.server.max_upload_bytes} byte limit")
+        return self.rfile.read(length)
+
+    def _read_json(self):
+        try:
+            body = json.loads(self._read_body())
+        except ValueError:
+            raise BadRequest("The request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise BadRequest("The request body must be a JSON object")
+        return body
+
+    def _send(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, payload, status=HTTPStatus.OK):
+        data = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self._send(status, data, 'application/json; charset=utf-8')
+
+    def _send_error(self, status, message):
+        self._send_json({'error': message}, status)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+class POServer(ThreadingHTTPServer):
+    """Threaded HTTP server; each request runs on its own daemon thread"""
+
+    daemon_threads = True
+
+    def __init__(self, address, service, max_upload_bytes=SERVER_MAX_UPLOAD_BYTES):
+        super().__init__(address, POServiceHandler)
+        self.service = service
+        self.max_upload_bytes = max_upload_bytes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve quotation extraction and PO rendering over HTTP")
+    parser.add_argument('--host', default=SERVER_HOST, help="Address to listen on")
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--rpm', type=int, default=GEMINI_REQUESTS_PER_MINUTE,
+                        help="Gemini requests per minute, shared by every client")
+    parser.add_argument('--backend', choices=['openpyxl', 'xml'], default=EXCEL_RENDER_BACKEND,
+                        help="Excel render backend")
+    args = parser.parse_args(argv)
+
+    service = POService(
+        PDFProcessor(rate_limiter=RateLimiter(args.rpm, GEMINI_MAX_CONCURRENCY)),
+        ExcelGenerator(backend=args.backend)
+    )
+    service.warm_up()
+    server = POServer((args.host, args.port), service)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
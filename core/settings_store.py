@@ -0,0 +1,189 @@
+"""Write-behind store for the remembered form details, with named purchaser profiles.
+
+Changes are kept in memory and written by a background thread once they have
+settled for debounce_seconds, so typing never waits on the disk. Each write
+goes to a temporary file that replaces user_settings.json atomically.
+"""
+import atexit
+import copy
+import json
+import os
+import pathlib
+import threading
+import time
+
+from config.settings import USER_SETTINGS_PATH, DEFAULT_USER_SETTINGS, SETTINGS_SAVE_DEBOUNCE_SECONDS
+
+SETTINGS_VERSION = 2
+DEFAULT_PROFILE = "Default"
+PROFILE_FIELDS = [field for field in DEFAULT_USER_SETTINGS if field != 'remember_details']
+
+def _default_profile():
+    return {field: DEFAULT_USER_SETTINGS[field] for field in PROFILE_FIELDS}
+
+class SettingsStore:
+    """Thread-safe store of form profiles; call close() (or flush()) before exiting"""
+
+    def __init__(self, path=USER_SETTINGS_PATH, debounce_seconds=SETTINGS_SAVE_DEBOUNCE_SECONDS):
+        self.path = pathlib.Path(path)
+        self.debounce_seconds = debounce_seconds
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._data = self._load()
+        self._dirty = False
+        # Change counter, so an older snapshot never overwrites a newer one
+        self._changes = 0
+        self._written = 0
+        self._write_after = 0.0
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_behind, name="settings-writer")
+        self._writer.daemon = True
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        data = None
+        try:
+            if self.path.exists():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+        except Exception as e:
+            print(f"Error loading user settings: {e}")
+        if not isinstance(data, dict):
+            data = {}
+
+        if 'profiles' not in data:
+            # Version 1 held a single set of details at the top level
+            profile = _default_profile()
+            profile.update({field: data[field] for field in PROFILE_FIELDS if field in data})
+            data = {
+                'version': SETTINGS_VERSION,
+                'remember_details': bool(data.get('remember_details', False)),
+                'active_profile': DEFAULT_PROFILE,
+                'profiles': {DEFAULT_PROFILE: profile},
+            }
+        if not data['profiles']:
+            data['profiles'] = {DEFAULT_PROFILE: _default_profile()}
+        if data.get('active_profile') not in data['profiles']:
+            data['active_profile'] = next(iter(data['profiles']))
+        return data
+
+    @property
+    def remember_details(self):
+        with self._condition:
+            return self._data['remember_details']
+
+    @property
+    def active_profile(self):
+        with self._condition:
+            return self._data['active_profile']
+
+    def profile_names(self):
+        with self._condition:
+            return list(self._data['profiles'])
+
+    def profile(self, name=None):
+        """Return a copy of the fields of a profile, the active one by default"""
+        with self._condition:
+            fields = _default_profile()
+            fields.update(self._data['profiles'][name or self._data['active_profile']])
+            return fields
+
+    def update_profile(self, fields, name=None):
+        """Change fields of a profile (the active one by default), creating it if needed"""
+        with self._condition:
+            name = name or self._data['active_profile']
+            profile = self._data['profiles'].setdefault(name, _default_profile())
+            changed = {field: value for field, value in fields.items()
+                       if field in PROFILE_FIELDS and profile.get(field) != value}
+            if changed:
+                profile.update(changed)
+                self._schedule()
+
+    def set_remember_details(self, remember):
+        with self._condition:
+            if self._data['remember_details'] != bool(remember):
+                self._data['remember_details'] = bool(remember)
+                self._schedule()
+
+    def switch_profile(self, name):
+        """Make name the active profile, creating it from the defaults if it does not exist"""
+        with self._condition:
+            self._data['profiles'].setdefault(name, _default_profile())
+            self._data['active_profile'] = name
+            self._schedule()
+
+    def delete_profile(self, name):
+        """Remove a profile; the last one cannot be deleted"""
+        with self._condition:
+            if name not in self._data['profiles'] or len(self._data['profiles']) == 1:
+                return False
+            del self._data['profiles'][name]
+            if self._data['active_profile'] == name:
+                self._data['active_profile'] = next(iter(self._data['profiles']))
+            self._schedule()
+            return True
+
+    def _schedule(self):
+        # Called with the condition held; every change pushes the write back
+        self._dirty = True
+        self._changes += 1
+        self._write_after = time.monotonic() + self.debounce_seconds
+        self._condition.notify()
+
+    def _write_behind(self):
+        with self._condition:
+            while not self._closed:
+                if not self._dirty:
+                    self._condition.wait()
+                    continue
+                delay = self._write_after - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                self._write_locked()
+
+    def _write_locked(self):
+        # The snapshot is taken under the lock; the disk write happens outside it
+        snapshot, changes = copy.deepcopy(self._data), self._changes
+        self._dirty = False
+        self._condition.release()
+        try:
+            with self._write_lock:
+                if changes > self._written:
+                    self._write(snapshot)
+                    self._written = changes
+        finally:
+            self._condition.acquire()
+
+    def _write(self, data):
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving user settings: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    def flush(self):
+        """Write pending changes now, from the calling thread"""
+        with self._condition:
+            if self._dirty:
+                self._write_locked()
+        # Wait for a write the background thread may have in flight
+        with self._write_lock:
+            pass
+
+    def close(self):
+        """Flush pending changes and stop the writer thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._writer.join()
+        self.flush()
@@ -0,0 +1,58 @@
+import hashlib
+import io
+import pathlib
+import pickle
+import threading
+
+from config.settings import TEMPLATE_PATH
+
+class TemplatePool:
+    """Parse the PO template once and hand out cheap independent copies.
+
+    The parsed workbook is kept as a pickle snapshot; unpickling it is an
+    order of magnitude faster than openpyxl.load_workbook and every copy is
+    fully independent, so renders on different threads never share state.
+    """
+
+    def __init__(self, template_path=TEMPLATE_PATH):
+        self.template_path = pathlib.Path(template_path)
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stat_signature = None
+        self._content_hash = None
+
+    def checkout(self):
+        """Return a fresh workbook parsed from the template"""
+        stat = self.template_path.stat()
+        stat_signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._snapshot is None or stat_signature != self._stat_signature:
+                self._reload(stat_signature)
+            snapshot = self._snapshot
+        workbook = pickle.loads(snapshot)
+        for worksheet in workbook.worksheets:
+            # DimensionHolder does not pickle its default factory, so rebind it
+            worksheet.row_dimensions.default_factory = worksheet._add_row
+            worksheet.column_dimensions.default_factory = worksheet._add_column
+        return workbook
+
+    def invalidate(self):
+        """Drop the parsed template so the next checkout re-parses it"""
+        with self._lock:
+            self._snapshot = None
+            self._stat_signature = None
+            self._content_hash = None
+
+    def _reload(self, stat_signature):
+        template_bytes = self.template_path.read_bytes()
+        content_hash = hashlib.sha256(template_bytes).hexdigest()
+        # A touched but unchanged template keeps its snapshot
+        if self._snapshot is None or content_hash != self._content_hash:
+            import openpyxl
+            workbook = openpyxl.load_workbook(io.BytesIO(template_bytes))
+            self._snapshot = pickle.dumps(workbook, protocol=pickle.HIGHEST_PROTOCOL)
+            self._content_hash = content_hash
+        self._stat_signature = stat_signature
+
+# Shared by every ExcelGenerator in the process
+default_template_pool = TemplatePool()
@@ -1,5 +1,4 @@
 import re
-from num2words import num2words
 from datetime import datetime
 
 def format_address_for_excel(address, max_length=45):
@@ -36,6 +35,7 @@ def validate_po_number_format(po_number):
     return re.match(po_pattern, po_number) is not None
 
 def number_to_ringgit(amount):
+    from num2words import num2words
     try:
         amount_str = f"{amount:.2f}"
     except ValueError:
@@ -69,4 +69,18 @@ def number_to_ringgit(amount):
 
 def extract_project_number(po_number):
     """Extract project number from PO number by removing the last part"""
-    return re.sub(r'-\d{3}M$', '', po_number)
\ No newline at end of file
+    return re.sub(r'-\d{3}M$', '', po_number)
+
+def safe_filename(name):
+    """Replace the characters Windows or POSIX reject in a file name, and trailing dots and spaces"""
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', str(name)).rstrip('. ')
+
+def percentile(values, pct):
+    """Return the pct-th percentile (0-100) of values using linear interpolation"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
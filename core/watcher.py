@@ -0,0 +1,381 @@
+"""Watch an inbox folder and turn every quotation PDF saved into it into a purchase order.
+
+A PDF is picked up once it has stopped changing for WATCH_SETTLE_SECONDS and
+ends with a PDF trailer, so files still being copied in are left alone. Each
+PO goes through the job queue, a few at a time. The PDF, its sidecar and the
+.xlsx then move to the done folder, or to the failed folder with an
+.error.txt. A PDF whose content was already processed moves to done/duplicates
+without another Gemini request.
+
+Header fields, lowest precedence first:
+    inbox/defaults.json                   for every quotation
+    the subfolder name                    "P-250719-001M Warehouse Fit-out" gives the PO number and project name
+    inbox/<subfolder>/defaults.json       for every quotation in that subfolder
+    <quotation>.json next to the PDF      for that quotation alone
+
+With the optional watchdog package, new files are noticed straight away
+through inotify (or its equivalent); without it the inbox is polled.
+
+Usage:
+    python -m core.watcher [--inbox watch/inbox] [--done watch/done] [--failed watch/failed]
+"""
+import argparse
+import json
+import os
+import pathlib
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+from config.settings import (
+    WATCH_INBOX_DIR, WATCH_DONE_DIR, WATCH_FAILED_DIR, WATCH_LEDGER_PATH, WATCH_POLL_INTERVAL_SECONDS,
+    WATCH_SETTLE_SECONDS, WATCH_INCOMPLETE_TIMEOUT_SECONDS, WATCH_MAX_IN_FLIGHT, JOB_QUEUE_MAX_WORKERS
+)
+from core.batch import build_gui_data
+from core.cache import pdf_sha256
+from core.excel_generator import ExcelGenerator
+from core.jobs import JobQueue, JOB_DONE
+from core.pdf_processor import PDFProcessor
+from core.utils import safe_filename
+
+DEFAULTS_FILE = "defaults.json"
+FOLDER_PO_NUMBER_RE = re.compile(r'^(P-\d{6}-\d{3}M)\b[\s_-]*(.*)$')
+# A complete PDF ends with %%EOF, possibly followed by a line break or a little padding
+PDF_TRAILER_BYTES = 1024
+
+def read_fields(path):
+    """Return the header fields in a JSON file, or {} if there is none"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            fields = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(fields, dict):
+        raise ValueError(f"{path.name} must hold a JSON object")
+    return fields
+
+def folder_fields(folder_name):
+    """Header fields named by a subfolder: a leading PO number, then the project name"""
+    match = FOLDER_PO_NUMBER_RE.match(folder_name)
+    if match:
+        fields = {'po_number': match.group(1)}
+        if match.group(2).strip():
+            fields['project_name'] = match.group(2).strip()
+        return fields
+    return {'project_name': folder_name}
+
+def has_pdf_trailer(path):
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - PDF_TRAILER_BYTES))
+        return b'%%EOF' in f.read()
+
+def unique_path(path):
+    """Return path, or path with a counter added if something is already there"""
+    candidate = path
+    counter = 1
+    while candidate.exists():
+        candidate = path.with_name(f"{path.stem} ({counter}){path.suffix}")
+        counter += 1
+    return candidate
+
+class ProcessedLedger:
+    """Content hashes of the quotations already turned into POs, kept in a JSON file"""
+
+    def __init__(self, path=WATCH_LEDGER_PATH):
+        self.path = pathlib.Path(path)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, sha256):
+        with self._lock:
+            return self._entries.get(sha256)
+
+    def add(self, sha256, **fields):
+        with self._lock:
+            self._entries[sha256] = dict(fields, processed_at=datetime.now().isoformat(timespec='seconds'))
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+class InboxWatcher:
+    """Feeds settled PDFs from the inbox into a JobQueue and files away the results"""
+
+    def __init__(self, inbox=WATCH_INBOX_DIR, done_dir=WATCH_DONE_DIR, failed_dir=WATCH_FAILED_DIR,
+                 ledger=None, pdf_processor=None, excel_generator=None, max_workers=JOB_QUEUE_MAX_WORKERS,
+                 max_in_flight=WATCH_MAX_IN_FLIGHT, settle_seconds=WATCH_SETTLE_SECONDS,
+                 poll_interval=WATCH_POLL_INTERVAL_SECONDS, incomplete_timeout=WATCH_INCOMPLETE_TIMEOUT_SECONDS):
+        self.inbox = pathlib.Path(inbox)
+        self.done_dir = pathlib.Path(done_dir)
+        self.failed_dir = pathlib.Path(failed_dir)
+        for directory in (self.inbox, self.done_dir, self.failed_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+        self.ledger = ledger or ProcessedLedger()
+        self.job_queue = JobQueue(pdf_processor or PDFProcessor(), excel_generator or ExcelGenerator(),
+                                  max_workers=max_workers, on_change=self._on_job_changed)
+        # Files stay in the inbox until a slot frees up, so a flood of PDFs never piles up in memory
+        self.max_in_flight = max_in_flight
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.incomplete_timeout = incomplete_timeout
+        self.counters = {'done': 0, 'failed': 0, 'duplicates': 0}
+        # Reentrant: submit() reports the queued job to _on_job_changed on the calling thread
+        self._lock = threading.RLock()
+        # path -> (size, mtime_ns, unchanged since)
+        self._candidates = {}
+        # path -> sha256 of the PDFs with a job in the queue, and job id -> path
+        self._in_flight = {}
+        self._jobs = {}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+
+    def start_observer(self):
+        """Wake the scanner on file system events; returns False if watchdog is not installed"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+        wake = self._wake
+
+        class WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        self._observer = Observer()
+        self._observer.schedule(WakeHandler(), str(self.inbox), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def run(self):
+        """Scan until stop() is called"""
+        if self.start_observer():
+            print(f"Watching {self.inbox} for quotations")
+        else:
+            print(f"Polling {self.inbox} for quotations every {self.poll_interval:g}s (pip install watchdog to react instantly)")
+        try:
+            while not self._stopped.is_set():
+                self.scan()
+                self._wake.wait(self._next_wait())
+                self._wake.clear()
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _next_wait(self):
+        with self._lock:
+            pending = bool(self._candidates)
+        if self._observer is None or pending:
+            # Settling files have to be looked at again whether or not anything happens
+            return self.poll_interval
+        # Events wake the scanner; the occasional rescan catches anything they missed
+        return max(self.poll_interval, 60.0)
+
+    def inbox_pdfs(self):
+        """PDFs in the inbox and its subfolders, oldest first"""
+        pdfs = []
+        for path in self.inbox.rglob('*'):
+            if path.suffix.lower() != '.pdf' or not path.is_file() or path.name.startswith('.'):
+                continue
+            try:
+                pdfs.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        return [path for _, path in sorted(pdfs)]
+
+    def scan(self):
+        """Queue every settled PDF there is room for; returns how many were queued"""
+        now = time.monotonic()
+        queued = 0
+        seen = set()
+        for path in self.inbox_pdfs():
+            seen.add(path)
+            with self._lock:
+                if path in self._in_flight:
+                    continue
+                if len(self._in_flight) >= self.max_in_flight:
+                    break
+            if self._settled(path, now):
+                queued += self._claim(path)
+        with self._lock:
+            # Forget files that were removed or renamed before they settled
+            for path in set(self._candidates) - seen:
+                del self._candidates[path]
+        return queued
+
+    def _settled(self, path, now):
+        """True once path has not changed for settle_seconds and looks like a complete PDF"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            previous = self._candidates.get(path)
+            if previous is None or previous[:2] != signature:
+                self._candidates[path] = signature + (now,)
+                return False
+            unchanged_for = now - previous[2]
+        if unchanged_for < self.settle_seconds:
+            return False
+        try:
+            if has_pdf_trailer(path):
+                return True
+        except OSError:
+            return False
+        if unchanged_for >= self.incomplete_timeout:
+            self._fail(path, None, f"No PDF trailer after {unchanged_for:.0f}s unchanged; the file looks incomplete")
+            with self._lock:
+                self._candidates.pop(path, None)
+        return False
+
+    def _claim(self, path):
+        with self._lock:
+            self._candidates.pop(path, None)
+        try:
+            sha256 = pdf_sha256(path.read_bytes())
+            gui_data = self.header_fields(path)
+        except Exception as e:
+            self._fail(path, None, f"Could not read the quotation: {e}")
+            return 0
+
+        processed = self.ledger.get(sha256)
+        with self._lock:
+            duplicate_of = next((other for other, other_sha256 in self._in_flight.items() if other_sha256 == sha256), None)
+            if processed is None and duplicate_of is None:
+                self._in_flight[path] = sha256
+        if processed is not None or duplicate_of is not None:
+            original = processed['file'] if processed is not None else duplicate_of.name
+            try:
+                self._move_duplicate(path, original)
+            except OSError as e:
+                # Left in the inbox, so the next scan tries again
+                print(f"Could not move duplicate {path.name} out of the inbox: {e}")
+            return 0
+
+        # Held across submit(), so a job cannot finish before it is registered
+        with self._lock:
+            job = self.job_queue.submit(gui_data)
+            self._jobs[job.id] = path
+        print(f"Queued {path.relative_to(self.inbox)} as job {job.id}")
+        return 1
+
+    def header_fields(self, path):
+        """Build the gui_data for a quotation from defaults, its folder name and its sidecar"""
+        defaults = read_fields(self.inbox / DEFAULTS_FILE)
+        if path.parent != self.inbox:
+            folder = path.parent.relative_to(self.inbox).parts[0]
+            defaults.update(folder_fields(folder))
+            defaults.update(read_fields(self.inbox / folder / DEFAULTS_FILE))
+        manifest = {'*': defaults, path.name: read_fields(path.with_suffix('.json'))}
+        return build_gui_data(path, manifest)
+
+    def _on_job_changed(self, job):
+        # Called from the job queue's worker threads
+        if not job.finished:
+            return
+        with self._lock:
+            path = self._jobs.pop(job.id, None)
+            sha256 = self._in_flight.get(path)
+        if path is None:
+            return
+        try:
+            if job.status == JOB_DONE:
+                self._file_done(path, job, sha256)
+            else:
+                self._fail(path, job, job.error or job.status)
+        except Exception as e:
+            # Saving the PO or moving the files failed; move what is left out of the inbox
+            self._fail(path, job, f"Could not file the finished PO: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(path, None)
+            self.job_queue.remove(job.id)
+            # A slot is free, so look for the next PDF without waiting for the poll
+            self._wake.set()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _target_dir(self, root, path):
+        target = root / path.parent.relative_to(self.inbox)
+        target.mkdir(parents=True, exist_ok=True)
+        return target
+
+    def _move_with_sidecar(self, path, target_dir):
+        moved = shutil.move(str(path), str(unique_path(target_dir / path.name)))
+        sidecar = path.with_suffix('.json')
+        if sidecar.exists():
+            shutil.move(str(sidecar), str(unique_path(target_dir / sidecar.name)))
+        return pathlib.Path(moved)
+
+    def _file_done(self, path, job, sha256):
+        target_dir = self._target_dir(self.done_dir, path)
+        # Named after the PO number like batch mode; quotations sharing a folder's PO number add their own name
+        output_path = target_dir / f"{safe_filename(job.gui_data.get('po_number') or '') or path.stem}.xlsx"
+        if output_path.exists():
+            output_path = unique_path(output_path.with_name(f"{output_path.stem}_{path.stem}.xlsx"))
+        output_path = job.result.save(output_path)
+        self._move_with_sidecar(path, target_dir)
+        self.ledger.add(sha256, file=path.name, output=str(output_path),
+                        po_number=job.gui_data.get('po_number'))
+        self._count('done')
+        print(f"✅ {path.name} -> {output_path}")
+
+    def _move_duplicate(self, path, original):
+        target_dir = self._target_dir(self.done_dir / "duplicates", path)
+        self._move_with_sidecar(path, target_dir)
+        self._count('duplicates')
+        print(f"Skipped {path.name}: same content as {original}")
+
+    def _fail(self, path, job, error):
+        # Filing may fail after the quotation has left the inbox; then only the failure is recorded
+        if path.exists():
+            try:
+                target_dir = self._target_dir(self.failed_dir, path)
+                moved = self._move_with_sidecar(path, target_dir)
+                moved.with_name(f"{moved.name}.error.txt").write_text(f"{error}\n", encoding='utf-8')
+            except OSError as e:
+                print(f"Could not move {path.name} to {self.failed_dir}: {e}")
+        self._count('failed')
+        print(f"❌ {path.name}: {error}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate POs for quotations saved into an inbox folder")
+    parser.add_argument('--inbox', default=WATCH_INBOX_DIR)
+    parser.add_argument('--done', default=WATCH_DONE_DIR)
+    parser.add_argument('--failed', default=WATCH_FAILED_DIR)
+    parser.add_argument('-w', '--workers', type=int, default=JOB_QUEUE_MAX_WORKERS, help="Concurrent jobs")
+    parser.add_argument('--settle', type=float, default=WATCH_SETTLE_SECONDS,
+                        help="Seconds a PDF must stay unchanged before it is processed")
+    parser.add_argument('--poll', type=float, default=WATCH_POLL_INTERVAL_SECONDS, help="Polling interval in seconds")
+    args = parser.parse_args(argv)
+
+    watcher = InboxWatcher(args.inbox, args.done, args.failed, max_workers=max(1, args.workers),
+                           settle_seconds=args.settle, poll_interval=args.poll)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    print(f"Done: {watcher.counters['done']}, failed: {watcher.counters['failed']}, "
+          f"duplicates: {watcher.counters['duplicates']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
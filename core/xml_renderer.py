@@ -0,0 +1,292 @@
+import io
+import numbers
+import pathlib
+import posixpath
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+from config.settings import TEMPLATE_PATH
+
+ROW_RE = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+ATTR_RE = re.compile(r'([\w:]+)="([^"]*)"')
+CELL_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+RANGE_RE = re.compile(r'([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?')
+DIMENSION_RE = re.compile(r'<dimension ref="[^"]*"/>')
+MERGE_CELLS_RE = re.compile(r'<mergeCells\b[^>]*>(.*?)</mergeCells>', re.S)
+MERGE_REF_RE = re.compile(r'<mergeCell ref="([^"]+)"/>')
+ROW_BREAKS_RE = re.compile(r'<rowBreaks\b[^>]*?(?:/>|>.*?</rowBreaks>)', re.S)
+CALC_PR_RE = re.compile(r'<calcPr\b([^>]*?)/>')
+FORMULA_RE = re.compile(r'<f\b[^>]*?(?:/>|>.*?</f>)', re.S)
+STYLE_ATTR_RE = re.compile(r' s="[^"]*"')
+ILLEGAL_CHARACTERS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+# Elements that may follow rowBreaks in a worksheet, in schema order
+AFTER_ROW_BREAKS = (
+    '<colBreaks', '<customProperties', '<cellWatches', '<ignoredErrors', '<smartTags', '<drawing',
+    '<legacyDrawing', '<legacyDrawingHF', '<picture', '<oleObjects', '<controls', '<webPublishItems',
+    '<tableParts', '<extLst', '</worksheet>',
+)
+ROW_HEIGHT_ATTRS = ('ht', 'customHeight')
+
+def column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+def _attrs_to_xml(attrs):
+    return ''.join(f' {name}="{value}"' for name, value in attrs.items())
+
+class _TemplateCell:
+    __slots__ = ('column', 'letters', 'attrs', 'style', 'inner')
+
+    def __init__(self, letters, attrs, inner, column=None, style=None):
+        self.letters = letters
+        self.column = column or column_index(letters)
+        self.attrs = attrs
+        self.inner = inner
+        # The ' s="N"' part of attrs, reused when a value replaces the template content
+        if style is None:
+            match = STYLE_ATTR_RE.search(attrs)
+            style = match.group(0) if match else ''
+        self.style = style
+
+    def to_xml(self, row):
+        if self.inner is None:
+            return f'<c r="{self.letters}{row}"{self.attrs}/>'
+        return f'<c r="{self.letters}{row}"{self.attrs}>{self.inner}</c>'
+
+class XmlTemplate:
+    """The PO template's worksheet precompiled into a fill-in structure.
+
+    Rendering substitutes cell values, shifts the rows below an insertion
+    point and streams the sheet XML straight into a new xlsx archive; every
+    other part of the template is copied through unchanged.
+    """
+
+    def __init__(self, template_path=TEMPLATE_PATH):
+        self.template_path = pathlib.Path(template_path)
+        self._lock = threading.Lock()
+        self._stat_signature = None
+        self._compiled = None
+
+    def render(self, output, cell_values, insert_at, insert_rows, style_rows, page_break_row):
+        """Write a filled-in copy of the template to output (a path or binary file object).
+
+        cell_values maps coordinates in the final layout (e.g. 'I63') to values;
+        insert_rows blank rows are inserted before insert_at, styled by cycling
+        through style_rows, and everything from insert_at down moves with them.
+        """
+        compiled = self.compiled()
+        sheet_xml = compiled.render_sheet(cell_values, insert_at, insert_rows, style_rows, page_break_row)
+
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in compiled.parts:
+                archive.writestr(name, sheet_xml if name == compiled.sheet_name else data)
+        return output
+
+    def compiled(self):
+        """Return the compiled template, recompiling it when the file changes"""
+        stat = self.template_path.stat()
+        stat_signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._compiled is None or stat_signature != self._stat_signature:
+                self._compiled = _CompiledTemplate(self.template_path.read_bytes())
+                self._stat_signature = stat_signature
+            return self._compiled
+
+class _CompiledTemplate:
+    def __init__(self, template_bytes):
+        with zipfile.ZipFile(io.BytesIO(template_bytes)) as archive:
+            parts = [(info.filename, archive.read(info.filename)) for info in archive.infolist()]
+        contents = dict(parts)
+
+        self.sheet_name = self._first_sheet_name(contents)
+        calc_chain_name = next((name for name, _ in parts if name.endswith('calcChain.xml')), None)
+
+        # Rows move, so drop the calculation chain and ask Excel to recalculate on open
+        self.parts = []
+        for name, data in parts:
+            if name == calc_chain_name:
+                continue
+            if name == '[Content_Types].xml':
+                data = re.sub(rb'<Override PartName="/[^"]*calcChain\.xml"[^>]*/>', b'', data)
+            elif name == 'xl/_rels/workbook.xml.rels':
+                data = re.sub(rb'<Relationship [^>]*Target="[^"]*calcChain\.xml"[^>]*/>', b'', data)
+            elif name == 'xl/workbook.xml':
+                data = self._force_full_calc(data)
+            self.parts.append((name, data))
+
+        self._compile_sheet(contents[self.sheet_name].decode('utf-8'))
+
+    @staticmethod
+    def _first_sheet_name(contents):
+        workbook_xml = contents['xl/workbook.xml'].decode('utf-8')
+        rels_xml = contents['xl/_rels/workbook.xml.rels'].decode('utf-8')
+        rel_id = re.search(r'<sheet\b[^>]*\br:id="([^"]+)"', workbook_xml).group(1)
+        target = re.search(r'<Relationship\b[^>]*\bId="%s"[^>]*\bTarget="([^"]+)"' % re.escape(rel_id), rels_xml)
+        if target is None:
+            target = re.search(r'<Relationship\b[^>]*\bTarget="([^"]+)"[^>]*\bId="%s"' % re.escape(rel_id), rels_xml)
+        target = target.group(1)
+        if target.startswith('/'):
+            return target.lstrip('/')
+        return posixpath.normpath(posixpath.join('xl', target))
+
+    @staticmethod
+    def _force_full_calc(workbook_xml):
+        text = workbook_xml.decode('utf-8')
+        match = CALC_PR_RE.search(text)
+        if match is None:
+            return workbook_xml
+        attrs = dict(ATTR_RE.findall(match.group(1)))
+        attrs['fullCalcOnLoad'] = '1'
+        text = text[:match.start()] + f'<calcPr{_attrs_to_xml(attrs)}/>' + text[match.end():]
+        return text.encode('utf-8')
+
+    def _compile_sheet(self, sheet_xml):
+        data_start = sheet_xml.index('<sheetData')
+        data_open_end = sheet_xml.index('>', data_start) + 1
+        if sheet_xml[data_open_end - 2] == '/':
+            rows_xml, tail = '', sheet_xml[data_open_end:]
+        else:
+            data_end = sheet_xml.index('</sheetData>', data_open_end)
+            rows_xml, tail = sheet_xml[data_open_end:data_end], sheet_xml[data_end + len('</sheetData>'):]
+
+        self.head = sheet_xml[:data_start] + '<sheetData>'
+        dimension = DIMENSION_RE.search(self.head)
+        self.max_column_letters = 'A'
+
+        self.rows = {}
+        for row_match in ROW_RE.finditer(rows_xml):
+            row_attrs = dict(ATTR_RE.findall(row_match.group(1)))
+            row_num = int(row_attrs.pop('r'))
+            cells = {}
+            for cell_match in CELL_RE.finditer(row_match.group(2) or ''):
+                cell_attrs = dict(ATTR_RE.findall(cell_match.group(1)))
+                letters = CELL_REF_RE.match(cell_attrs.pop('r')).group(1)
+                inner = cell_match.group(2)
+                formula = FORMULA_RE.search(inner) if inner else None
+                if formula is not None:
+                    # Cached results would be stale once rows move
+                    inner = formula.group(0)
+                    cell_attrs.pop('t', None)
+                cell = _TemplateCell(letters, _attrs_to_xml(cell_attrs), inner)
+                cells[cell.column] = cell
+                if column_index(letters) > column_index(self.max_column_letters):
+                    self.max_column_letters = letters
+            self.rows[row_num] = (row_attrs, cells)
+
+        if dimension is not None:
+            self.head_before_dimension = self.head[:dimension.start()]
+            self.head_after_dimension = self.head[dimension.end():]
+        else:
+            self.head_before_dimension, self.head_after_dimension = self.head, ''
+
+        merges = MERGE_CELLS_RE.search(tail)
+        self.merges = []
+        if merges is not None:
+            self.merges = [RANGE_RE.fullmatch(ref).groups() for ref in MERGE_REF_RE.findall(merges.group(1))]
+            tail = tail[:merges.start()] + '\0MERGES\0' + tail[merges.end():]
+
+        row_breaks = ROW_BREAKS_RE.search(tail)
+        if row_breaks is not None:
+            tail = tail[:row_breaks.start()] + '\0BREAKS\0' + tail[row_breaks.end():]
+        else:
+            position = min(tail.index(tag) for tag in AFTER_ROW_BREAKS if tag in tail)
+            tail = tail[:position] + '\0BREAKS\0' + tail[position:]
+        self.tail = tail
+
+    def render_sheet(self, cell_values, insert_at, insert_rows, style_rows, page_break_row):
+        values_by_row = {}
+        for coordinate, value in cell_values.items():
+            letters, row = CELL_REF_RE.fullmatch(coordinate).groups()
+            values_by_row.setdefault(int(row), {})[column_index(letters)] = (letters, value)
+
+        parts = []
+        last_row = 0
+        for row_num, row_attrs, cells in self._layout_rows(insert_at, insert_rows, style_rows):
+            row_values = values_by_row.pop(row_num, None)
+            parts.append(self._row_xml(row_num, row_attrs, cells, row_values))
+            last_row = row_num
+        # Values outside every template row get rows of their own
+        for row_num in sorted(values_by_row):
+            parts.append(self._row_xml(row_num, {}, {}, values_by_row[row_num]))
+            last_row = max(last_row, row_num)
+        parts.sort(key=lambda part: part[0])
+
+        merges = []
+        for min_letters, min_row, max_letters, max_row in self.merges:
+            min_row = int(min_row)
+            max_row = int(max_row or min_row)
+            if min_row >= insert_at:
+                min_row += insert_rows
+                max_row += insert_rows
+            merges.append(f'<mergeCell ref="{min_letters}{min_row}:{max_letters or min_letters}{max_row}"/>')
+        merges_xml = f'<mergeCells count="{len(merges)}">{"".join(merges)}</mergeCells>' if merges else ''
+        breaks_xml = (
+            f'<rowBreaks count="1" manualBreakCount="1"><brk id="{page_break_row}" max="16383" man="1"/></rowBreaks>'
+        )
+
+        return ''.join([
+            self.head_before_dimension,
+            f'<dimension ref="A1:{self.max_column_letters}{max(last_row, 1)}"/>',
+            self.head_after_dimension,
+            ''.join(xml for _, xml in parts),
+            '</sheetData>',
+            self.tail.replace('\0MERGES\0', merges_xml).replace('\0BREAKS\0', breaks_xml),
+        ]).encode('utf-8')
+
+    def _layout_rows(self, insert_at, insert_rows, style_rows):
+        """Yield (row_num, row_attrs, cells) for the final layout"""
+        for row_num, (row_attrs, cells) in self.rows.items():
+            if row_num < insert_at:
+                yield row_num, row_attrs, cells
+            else:
+                yield row_num + insert_rows, row_attrs, cells
+
+        # New rows carry only the styles and heights of their source rows
+        style_templates = []
+        for source_row in style_rows:
+            source_attrs, source_cells = self.rows.get(source_row, ({}, {}))
+            row_attrs = {name: source_attrs[name] for name in ROW_HEIGHT_ATTRS if name in source_attrs}
+            cells = {
+                column: _TemplateCell(cell.letters, cell.style, None, column, cell.style)
+                for column, cell in source_cells.items() if cell.style
+            }
+            style_templates.append((row_attrs, cells))
+
+        for offset in range(insert_rows):
+            row_attrs, cells = style_templates[offset % len(style_templates)]
+            yield insert_at + offset, row_attrs, cells
+
+    def _row_xml(self, row_num, row_attrs, cells, row_values):
+        if row_values:
+            cells = dict(cells)
+            for column, (letters, value) in row_values.items():
+                template_cell = cells.get(column)
+                style = template_cell.style if template_cell is not None else ''
+                cells[column] = self._value_cell(letters, column, style, value)
+        cells_xml = ''.join(cells[column].to_xml(row_num) for column in sorted(cells))
+        return row_num, f'<row r="{row_num}"{_attrs_to_xml(row_attrs)}>{cells_xml}</row>'
+
+    @staticmethod
+    def _value_cell(letters, column, style, value):
+        if value is None or value == '':
+            return _TemplateCell(letters, style, None, column, style)
+        if isinstance(value, bool):
+            return _TemplateCell(letters, f'{style} t="b"', f'<v>{int(value)}</v>', column, style)
+        if isinstance(value, numbers.Number):
+            # Same precision openpyxl writes floats with
+            number = '%.16g' % value if isinstance(value, float) else str(value)
+            return _TemplateCell(letters, style, f'<v>{number}</v>', column, style)
+        text = ILLEGAL_CHARACTERS_RE.sub('', str(value))
+        if text.startswith('=') and len(text) > 1:
+            return _TemplateCell(letters, style, f'<f>{escape(text[1:])}</f>', column, style)
+        inline_string = f'<is><t xml:space="preserve">{escape(text)}</t></is>'
+        return _TemplateCell(letters, f'{style} t="inlineStr"', inline_string, column, style)
+
+# Shared by every ExcelGenerator in the process
+default_xml_template = XmlTemplate()
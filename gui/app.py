@@ -1,7 +1,6 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
-import pathlib
 import subprocess
 import sys
 import time
@@ -9,20 +8,35 @@ import threading
 from datetime import datetime
 
 from gui.components import GUIComponents
+from gui.job_panel import JobQueuePanel
 from core.pdf_processor import PDFProcessor
+from core.remote import RemoteBackend
 from core.excel_generator import ExcelGenerator
+from core.prefetch import ExtractionPrefetcher
+from core.jobs import JobQueue
 from core.utils import validate_po_number_format, extract_project_number
-from config.settings import load_user_settings, save_user_settings
+from core.settings_store import SettingsStore
+from core.progress import ProgressChannel, ProgressTracker, TASK_FINISHED, JOB_CHANGED
+from config.settings import PROGRESS_POLL_INTERVAL_MS, PROGRESS_MAX_EVENTS_PER_POLL, SERVER_URL
 
 class POGUI:
-    def __init__(self, root):
+    def __init__(self, root, server_url=SERVER_URL):
         self.root = root
         self.root.title("Purchase Order Generator")
-        self.root.geometry("600x550")
+        self.root.geometry("650x840")
         
-        # Initialize processors
-        self.pdf_processor = PDFProcessor()
+        # Initialize processors; with a server, extraction uses its shared cache and Gemini quota
+        self.pdf_processor = RemoteBackend(server_url) if server_url else PDFProcessor()
         self.excel_generator = ExcelGenerator()
+        self.extraction_prefetcher = ExtractionPrefetcher(self.pdf_processor)
+        # Queued jobs use the stateless render(), so they never touch the last PO kept for header updates
+        self.job_queue = JobQueue(self.pdf_processor, self.excel_generator)
+
+        # Worker threads publish progress here and the Tk loop drains it; they never touch widgets
+        self.progress_channel = ProgressChannel()
+        self.progress = ProgressTracker()
+        # Events of earlier quotations are ignored once another one is chosen
+        self.progress_task = 0
         
         # Variables
         self.po_number = tk.StringVar()
@@ -33,26 +47,74 @@ class POGUI:
         self.director_manager = tk.StringVar()
         self.quotation_file = tk.StringVar()
         self.remember_details = tk.BooleanVar(value=False)
+        self.profile_name = tk.StringVar()
+        self.refresh_extraction = tk.BooleanVar(value=False)
         
         # Track saved file path
         self.saved_filepath = None
+
+        # Last generated PO, held in memory until it is saved
+        self.rendered_po = None
         
-        # Track generation start time and state
+        # Set while a PO is being generated; only touched on the Tk thread
         self.generation_start_time = None
-        self.is_generating = False
+
+        # Extraction behind the last generated PO
+        self.rendered_extraction = None
         
         # Track if we're currently loading settings (to avoid auto-save during load)
         self.is_loading_settings = False
         
-        # Load saved settings
-        self.user_settings = load_user_settings()
+        # Load saved settings; changes are written in the background, debounced
+        self.settings_store = SettingsStore()
+        self.profile_name.set(self.settings_store.active_profile)
         self.load_saved_settings()
         
         # Set up auto-save tracking
         self.setup_auto_save()
         
         self.create_widgets()
-        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Job workers report through the channel too, so the job list is only updated from the Tk loop
+        self.job_queue.on_change = lambda job: self.progress_channel.publish(None, JOB_CHANGED, job=job)
+        self.root.after(PROGRESS_POLL_INTERVAL_MS, self.drain_progress)
+
+        # Load Gemini and the template once the window is up instead of before it appears
+        self.root.after(100, self.start_warm_up)
+
+        # Start extracting as soon as a quotation is chosen, while the header is filled in
+        self.quotation_file.trace_add('write', self.prefetch_extraction)
+        self.refresh_extraction.trace_add('write', self.prefetch_extraction)
+        
+    def start_warm_up(self):
+        """Import and initialise the heavy dependencies in a background thread"""
+        warm_up_thread = threading.Thread(target=self._warm_up)
+        warm_up_thread.daemon = True
+        warm_up_thread.start()
+
+    def _warm_up(self):
+        try:
+            self.pdf_processor.warm_up()
+            self.excel_generator.warm_up()
+        except Exception as e:
+            # Anything that fails here fails again, with a proper error, on first use
+            print(f"Warm-up failed: {e}")
+
+    def prefetch_extraction(self, *args):
+        """Extract the selected quotation in the background until Generate needs it"""
+        filepath = self.quotation_file.get()
+        self.progress_task += 1
+        self.progress.reset()
+        if not filepath or not os.path.isfile(filepath):
+            self.extraction_prefetcher.discard()
+            return
+        try:
+            # The prefetch thread inherits this context, so it reports to the channel
+            with self.progress_channel.reporting(self.progress_task):
+                self.extraction_prefetcher.start(filepath, refresh_cache=self.refresh_extraction.get())
+        except OSError as e:
+            print(f"Could not prefetch extraction: {e}")
+
     def setup_auto_save(self):
         """Set up trace to auto-save when fields change and remember_details is checked"""
         # Track changes to form fields
@@ -85,43 +147,80 @@ class POGUI:
         """Load saved settings into the form"""
         self.is_loading_settings = True
         
-        if self.user_settings.get('remember_details', False):
-            self.po_number.set(self.user_settings.get('po_number', ''))
-            self.project_name.set(self.user_settings.get('project_name', ''))
-            self.purchaser_name.set(self.user_settings.get('purchaser_name', ''))
-            self.phone_code.set(self.user_settings.get('phone_code', '+60'))
-            self.phone_number_only.set(self.user_settings.get('phone_number_only', ''))
-            self.director_manager.set(self.user_settings.get('director_manager', ''))
+        if self.settings_store.remember_details:
+            self._fill_profile_fields(self.settings_store.profile())
             self.remember_details.set(True)
         else:
             self.remember_details.set(False)
             
         self.is_loading_settings = False
+
+    def _fill_profile_fields(self, profile):
+        self.po_number.set(profile.get('po_number', ''))
+        self.project_name.set(profile.get('project_name', ''))
+        self.purchaser_name.set(profile.get('purchaser_name', ''))
+        self.phone_code.set(profile.get('phone_code', '+60'))
+        self.phone_number_only.set(profile.get('phone_number_only', ''))
+        self.director_manager.set(profile.get('director_manager', ''))
         
     def save_current_settings(self, silent=False):
-        """Save current form settings"""
-        settings = {
+        """Save current form settings; the store writes them to disk off the UI thread"""
+        self.settings_store.set_remember_details(self.remember_details.get())
+        self.settings_store.update_profile({
             'po_number': self.po_number.get(),
             'project_name': self.project_name.get(),
             'purchaser_name': self.purchaser_name.get(),
             'phone_code': self.phone_code.get(),
             'phone_number_only': self.phone_number_only.get(),
             'director_manager': self.director_manager.get(),
-            'remember_details': self.remember_details.get()
-        }
-        
-        if save_user_settings(settings):
-            self.user_settings = settings
-            if not silent:
-                if self.remember_details.get():
-                    self.status_label.config(text="Details saved successfully! Auto-save enabled.", foreground="green")
-                else:
-                    self.status_label.config(text="Details saved. Auto-save disabled.", foreground="orange")
-            return True
-        else:
-            if not silent:
-                self.status_label.config(text="Error saving details", foreground="red")
-            return False
+        })
+        if not silent:
+            if self.remember_details.get():
+                self.status_label.config(text="Details saved successfully! Auto-save enabled.", foreground="green")
+            else:
+                self.status_label.config(text="Details saved. Auto-save disabled.", foreground="orange")
+        return True
+
+    def on_profile_selected(self, event=None):
+        """Switch to the chosen purchaser profile and fill in its details"""
+        name = self.profile_name.get()
+        if not name or name == self.settings_store.active_profile:
+            return
+        self.settings_store.switch_profile(name)
+        self.is_loading_settings = True
+        self._fill_profile_fields(self.settings_store.profile(name))
+        self.is_loading_settings = False
+        self.status_label.config(text=f"Loaded profile: {name}", foreground="green")
+
+    def save_profile_as(self):
+        """Save the current details under a new or existing profile name"""
+        name = simpledialog.askstring("Save Profile", "Profile name:", parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        self.settings_store.switch_profile(name)
+        self.save_current_settings(silent=True)
+        self.profile_combo.config(values=self.settings_store.profile_names())
+        self.profile_name.set(name)
+        self.status_label.config(text=f"Saved profile: {name}", foreground="green")
+
+    def delete_profile(self):
+        name = self.profile_name.get()
+        if not messagebox.askyesno("Delete Profile", f"Delete the profile \"{name}\"?"):
+            return
+        if not self.settings_store.delete_profile(name):
+            messagebox.showerror("Error", "The last profile cannot be deleted.")
+            return
+        self.profile_combo.config(values=self.settings_store.profile_names())
+        self.profile_name.set(self.settings_store.active_profile)
+        self.is_loading_settings = True
+        self._fill_profile_fields(self.settings_store.profile())
+        self.is_loading_settings = False
+
+    def on_close(self):
+        """Write any pending settings before the window goes away"""
+        self.settings_store.close()
+        self.root.destroy()
         
     def create_widgets(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -155,6 +254,15 @@ class POGUI:
         self.date_entry = GUIComponents.create_date_picker(main_frame, "PO Issue Date:", row_counter)
         row_counter += 1
         
+        # Purchaser profile
+        profile_frame, self.profile_combo = GUIComponents.create_profile_selector(
+            main_frame, "Profile:", self.profile_name, row_counter, self.settings_store.profile_names()
+        )
+        self.profile_combo.bind("<<ComboboxSelected>>", self.on_profile_selected)
+        ttk.Button(profile_frame, text="Save As Profile...", command=self.save_profile_as).pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_frame, text="Delete", command=self.delete_profile).pack(side=tk.LEFT)
+        row_counter += 1
+        
         # Purchaser Name
         GUIComponents.create_labeled_entry(main_frame, "Purchaser Name:", self.purchaser_name, row_counter)
         row_counter += 1
@@ -188,6 +296,12 @@ class POGUI:
             text="Remember details for next time (auto-save)", 
             variable=self.remember_details
         ).pack(side=tk.LEFT)
+
+        ttk.Checkbutton(
+            remember_frame,
+            text="Re-extract quotation (ignore cache)",
+            variable=self.refresh_extraction
+        ).pack(side=tk.LEFT, padx=(10, 0))
         
         # Buttons frame
         button_frame = ttk.Frame(main_frame)
@@ -201,6 +315,9 @@ class POGUI:
         )
         self.generate_button.pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(button_frame, text="Add to Queue",
+                  command=self.add_to_queue).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(button_frame, text="Clear Form", 
                   command=self.clear_form).pack(side=tk.LEFT, padx=5)
         
@@ -208,6 +325,15 @@ class POGUI:
         self.status_label = ttk.Label(main_frame, text="", foreground="blue")
         self.status_label.grid(row=row_counter, column=0, columnspan=3, pady=10)
         row_counter += 1
+
+        # Progress of the PO being generated, with the time spent in each stage
+        self.progress_bar = ttk.Progressbar(main_frame, mode="determinate", maximum=100)
+        self.progress_bar.grid(row=row_counter, column=0, columnspan=3, sticky=(tk.W, tk.E), padx=20)
+        self.progress_bar.grid_remove()
+        row_counter += 1
+        self.timings_label = ttk.Label(main_frame, text="", foreground="gray", wraplength=600)
+        self.timings_label.grid(row=row_counter, column=0, columnspan=3, pady=(2, 0))
+        row_counter += 1
         
         # Save As button
         self.save_as_button = ttk.Button(
@@ -229,27 +355,57 @@ class POGUI:
         )
         self.open_file_button.grid(row=row_counter, column=0, columnspan=3, pady=5)
         self.open_file_button.grid_remove()
+        row_counter += 1
+
+        # Job queue
+        self.job_panel = JobQueuePanel(main_frame, self.job_queue)
+        self.job_panel.grid(row=row_counter, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        main_frame.rowconfigure(row_counter, weight=1)
+        
+    def drain_progress(self):
+        """Apply the progress events published since the last call; runs on the Tk loop"""
+        # Bounded, so a flood of events is spread over several calls instead of freezing the window
+        events = self.progress_channel.drain(PROGRESS_MAX_EVENTS_PER_POLL)
+        changed_jobs = {}
+        for event in events:
+            if event.kind == JOB_CHANGED:
+                changed_jobs[event.fields['job'].id] = event.fields['job']
+            elif event.kind == TASK_FINISHED:
+                self._on_generation_finished(event.fields)
+            elif event.task == self.progress_task:
+                self.progress.apply(event)
+        for job in changed_jobs.values():
+            self.job_panel.on_job_changed(job)
+        self.show_generation_progress()
+        self.root.after(PROGRESS_POLL_INTERVAL_MS if len(events) < PROGRESS_MAX_EVENTS_PER_POLL else 1,
+                        self.drain_progress)
+
+    def show_generation_progress(self):
+        """Show the elapsed time, items received, progress bar and stage timings"""
+        if self.generation_start_time is None:
+            return
+        self.progress_bar['value'] = self.progress.fraction * 100
+        self.timings_label.config(text=self.progress.describe_stages())
+
+        elapsed_time = time.time() - self.generation_start_time
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
         
-    def update_elapsed_time(self):
-        """Update the elapsed time in the status label"""
-        if self.is_generating and self.generation_start_time:
-            elapsed_time = time.time() - self.generation_start_time
-            minutes = int(elapsed_time // 60)
-            seconds = int(elapsed_time % 60)
-            
-            if minutes > 0:
-                time_text = f"{minutes}m {seconds}s"
-            else:
-                time_text = f"{seconds}s"
-                
-            self.status_label.config(
-                text=f"Generating Purchase Order... (Elapsed: {time_text})", 
-                foreground="blue"
-            )
+        if minutes > 0:
+            time_text = f"{minutes}m {seconds}s"
+        else:
+            time_text = f"{seconds}s"
+
+        progress_text = f"Elapsed: {time_text}"
+        if self.progress.items:
+            progress_text += f", {self.progress.items} items received"
+        if self.progress.rows_done:
+            progress_text += f", {self.progress.rows_done} rows written"
             
-            # Schedule next update if still generating
-            if self.is_generating:
-                self.root.after(1000, self.update_elapsed_time)
+        self.status_label.config(
+            text=f"Generating Purchase Order... ({progress_text})", 
+            foreground="blue"
+        )
         
     def open_saved_file(self):
         """Open the saved file with the default application"""
@@ -307,6 +463,8 @@ class POGUI:
             self.save_current_settings(silent=True)
             
         self.status_label.config(text="Form cleared")
+        self.progress_bar.grid_remove()
+        self.timings_label.config(text="")
         self.hide_save_button()
         self.hide_open_file_button()
         
@@ -353,7 +511,7 @@ class POGUI:
         return True
     
     def save_as_dialog(self):
-        if not self.excel_generator.temp_filepath or not os.path.exists(self.excel_generator.temp_filepath):
+        if self.rendered_po is None:
             messagebox.showerror("Error", "No generated file found. Please generate the PO first.")
             return
             
@@ -368,8 +526,7 @@ class POGUI:
         
         if filepath:
             try:
-                import shutil
-                shutil.copy2(self.excel_generator.temp_filepath, filepath)
+                self.rendered_po.save(filepath)
                 
                 self.saved_filepath = filepath
                 short_path = self._shorten_file_path(filepath)
@@ -379,7 +536,7 @@ class POGUI:
                 )
                 
                 self.show_open_file_button()
-                self.excel_generator.cleanup_temp_file()
+                self.rendered_po = None
                 self.hide_save_button()
                 
                 messagebox.showinfo("Success", f"Purchase Order saved successfully!\n\nLocation: {filepath}")
@@ -407,33 +564,55 @@ class POGUI:
             
         return shortened
 
-    def _generate_po_thread(self, gui_data):
-        """Run the PO generation in a separate thread"""
-        try:
-            # Process PDF and generate Excel
-            filepath = pathlib.Path(gui_data['quotation_file'])
-            extracted_data = self.pdf_processor.extract_po_data(filepath, gui_data)
-            self.excel_generator.generate_po_excel(extracted_data)
-            
-            # Stop timing and calculate final elapsed time
-            elapsed_time = time.time() - self.generation_start_time
-            self.is_generating = False
-            
-            minutes = int(elapsed_time // 60)
-            seconds = int(elapsed_time % 60)
-            
-            if minutes > 0:
-                time_text = f"{minutes}m {seconds}s"
+    def _generate_po_thread(self, task, gui_data, rendered_extraction, refresh_extraction=False):
+        """Run the PO generation in a separate thread, reporting back through the progress channel"""
+        with self.progress_channel.reporting(task):
+            try:
+                # Process PDF and generate Excel
+                extracted_data = self.extraction_prefetcher.finished(
+                    gui_data['quotation_file'], refresh_cache=refresh_extraction
+                )
+                if extracted_data is not None and extracted_data is rendered_extraction:
+                    # Same quotation as the last PO, so only the header fields need updating
+                    rendered_po = self.excel_generator.update_header(gui_data)
+                else:
+                    # Join the extraction started when the quotation was selected, filling rows as items arrive
+                    streaming_po = self.excel_generator.start_po(gui_data)
+                    extracted_data = self.extraction_prefetcher.result(
+                        gui_data['quotation_file'], refresh_cache=refresh_extraction,
+                        on_header=streaming_po.set_header, on_item=streaming_po.add_item
+                    )
+                    rendered_po = self.excel_generator.generate_po_excel(
+                        extracted_data, gui_data=gui_data, streaming_po=streaming_po
+                    )
+                self.pdf_processor.record_po(gui_data['quotation_file'], gui_data.get('po_number'))
+            except Exception as e:
+                self.progress_channel.publish(task, TASK_FINISHED, error=str(e))
             else:
-                time_text = f"{seconds}s"
-            
-            # Update UI in main thread
-            self.root.after(0, lambda: self._on_generation_success(time_text))
-            
-        except Exception as e:
-            self.is_generating = False
-            # Update UI in main thread
-            self.root.after(0, lambda: self._on_generation_error(str(e)))
+                self.progress_channel.publish(task, TASK_FINISHED, error=None,
+                                              rendered_po=rendered_po, extracted_data=extracted_data)
+
+    def _on_generation_finished(self, result):
+        """Take over the generated PO on the Tk thread"""
+        elapsed_time = time.time() - self.generation_start_time
+        self.generation_start_time = None
+        if result['error'] is not None:
+            self._on_generation_error(result['error'])
+            return
+
+        self.rendered_po = result['rendered_po']
+        self.rendered_extraction = result['extracted_data']
+        self.progress_bar['value'] = 100
+        self.timings_label.config(text=self.progress.describe_stages())
+
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
+        
+        if minutes > 0:
+            time_text = f"{minutes}m {seconds}s"
+        else:
+            time_text = f"{seconds}s"
+        self._on_generation_success(time_text)
     
     def _on_generation_success(self, time_text):
         """Handle successful generation in main thread"""
@@ -447,9 +626,31 @@ class POGUI:
     def _on_generation_error(self, error_message):
         """Handle generation error in main thread"""
         self.generate_button.config(state="normal")
+        self.progress_bar.grid_remove()
         self.status_label.config(text="Error generating PO", foreground="red")
         messagebox.showerror("Error", f"An error occurred while generating the PO:\n{error_message}")
 
+    def _collect_gui_data(self):
+        """Return the header fields and quotation file entered in the form"""
+        return {
+            'po_number': self.po_number.get(),
+            'project_number': extract_project_number(self.po_number.get()),
+            'project_name': self.project_name.get(),
+            'po_issue_date': self.date_entry.get_date().strftime("%d/%m/%Y"),
+            'purchaser_name': self.purchaser_name.get(),
+            'purchaser_phone': self.phone_code.get().strip() + self.phone_number_only.get().strip() if self.phone_number_only.get() else "",
+            'director_manager': self.director_manager.get(),
+            'quotation_file': self.quotation_file.get()
+        }
+
+    def add_to_queue(self):
+        """Queue a PO for the current form and leave the form free for the next quotation"""
+        if not self.validate_inputs():
+            return
+        job = self.job_queue.submit(self._collect_gui_data(), refresh_cache=self.refresh_extraction.get())
+        self.status_label.config(text=f"Queued job {job.id}: {os.path.basename(job.quotation_file)}", foreground="blue")
+        self.quotation_file.set("")
+
     def generate_po(self):
         if not self.validate_inputs():
             return
@@ -458,38 +659,31 @@ class POGUI:
             # Disable generate button to prevent multiple clicks
             self.generate_button.config(state="disabled")
             
-            # Start timing and set generation state
+            # Start timing; drain_progress keeps the status up to date from here on
             self.generation_start_time = time.time()
-            self.is_generating = True
+            self.progress.reset_render()
             
             # Update status with initial elapsed time
             self.status_label.config(text="Generating Purchase Order... (Elapsed: 0s)", foreground="blue")
+            self.progress_bar.grid()
             self.hide_save_button()
             self.hide_open_file_button()
-            self.root.update()
-            
-            # Start the elapsed time updater
-            self.update_elapsed_time()
+            self.show_generation_progress()
             
             # Prepare GUI data
-            gui_data = {
-                'po_number': self.po_number.get(),
-                'project_number': extract_project_number(self.po_number.get()),
-                'project_name': self.project_name.get(),
-                'po_issue_date': self.date_entry.get_date().strftime("%d/%m/%Y"),
-                'purchaser_name': self.purchaser_name.get(),
-                'purchaser_phone': self.phone_code.get().strip() + self.phone_number_only.get().strip() if self.phone_number_only.get() else "",
-                'director_manager': self.director_manager.get(),
-                'quotation_file': self.quotation_file.get()
-            }
+            gui_data = self._collect_gui_data()
             
             # Start generation in a separate thread
-            generation_thread = threading.Thread(target=self._generate_po_thread, args=(gui_data,))
+            generation_thread = threading.Thread(
+                target=self._generate_po_thread,
+                args=(self.progress_task, gui_data, self.rendered_extraction, self.refresh_extraction.get())
+            )
             generation_thread.daemon = True
             generation_thread.start()
 
         except Exception as e:
-            self.is_generating = False
+            self.generation_start_time = None
+            self.progress_bar.grid_remove()
             self.generate_button.config(state="normal")
             self.status_label.config(text="Error generating PO", foreground="red")
             messagebox.showerror("Error", f"An error occurred while generating the PO:\n{str(e)}")
\ No newline at end of file
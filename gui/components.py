@@ -70,6 +70,25 @@ class GUIComponents:
         
         return code_combo, number_entry
 
+    @staticmethod
+    def create_profile_selector(parent, label_text, variable, row, profiles):
+        """Create a profile dropdown; returns the frame for action buttons and the combobox"""
+        ttk.Label(parent, text=label_text).grid(row=row, column=0, sticky=tk.W, pady=5)
+
+        profile_frame = ttk.Frame(parent)
+        profile_frame.grid(row=row, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+
+        profile_combo = ttk.Combobox(
+            profile_frame,
+            textvariable=variable,
+            values=profiles,
+            width=20,
+            state="readonly"
+        )
+        profile_combo.pack(side=tk.LEFT, padx=(0, 5))
+
+        return profile_frame, profile_combo
+
     @staticmethod
     def create_file_browser(parent, label_text, variable, row, filetypes):
         """Create file browser with entry and browse button"""
@@ -0,0 +1,132 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import os
+
+from core.jobs import JOB_DONE, JOB_FAILED, JOB_CANCELLED
+
+class JobQueuePanel(ttk.LabelFrame):
+    """List of queued PO jobs with their status and timings"""
+
+    COLUMNS = (
+        ('po_number', "PO Number", 120),
+        ('quotation', "Quotation", 170),
+        ('status', "Status", 80),
+        ('items', "Items", 50),
+        ('time', "Time", 60),
+    )
+
+    def __init__(self, parent, job_queue):
+        super().__init__(parent, text="Job Queue", padding="5")
+        self.job_queue = job_queue
+        self.columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(
+            self, columns=[name for name, _, _ in self.COLUMNS], show="headings", height=6, selectmode="browse"
+        )
+        for name, heading, width in self.COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor=tk.W)
+        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tree.configure(yscrollcommand=scrollbar.set)
+
+        button_frame = ttk.Frame(self)
+        button_frame.grid(row=1, column=0, columnspan=2, pady=(5, 0))
+        ttk.Button(button_frame, text="Cancel", command=self.cancel_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Retry", command=self.retry_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save As...", command=self.save_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Remove", command=self.remove_selected).pack(side=tk.LEFT, padx=5)
+
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self.show_details())
+        self.details_label = ttk.Label(self, text="", foreground="red", wraplength=520)
+        self.details_label.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+
+        self._tick()
+
+    def on_job_changed(self, job):
+        """Refresh a job's row; call on the Tk thread, e.g. from the drained progress channel"""
+        self._show_job(job)
+
+    def _show_job(self, job):
+        if job.id not in self.job_queue.jobs:
+            return
+        values = (
+            job.gui_data.get('po_number', ''),
+            os.path.basename(job.quotation_file),
+            job.status,
+            job.items_received or '',
+            f"{job.elapsed_seconds:.0f}s" if job.started_at is not None else '',
+        )
+        row_id = str(job.id)
+        if self.tree.exists(row_id):
+            self.tree.item(row_id, values=values)
+        else:
+            self.tree.insert('', tk.END, iid=row_id, values=values)
+        if self._selected_job() is job:
+            self.show_details()
+
+    def _tick(self):
+        # Keep the elapsed time of running jobs moving
+        for job in list(self.job_queue.jobs.values()):
+            if job.started_at is not None and not job.finished:
+                self._show_job(job)
+        self.after(1000, self._tick)
+
+    def _selected_job(self):
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        return self.job_queue.jobs.get(int(selection[0]))
+
+    def show_details(self):
+        """Show why the selected job failed, or its timings once done"""
+        job = self._selected_job()
+        if job is None:
+            self.details_label.config(text="")
+        elif job.status == JOB_FAILED:
+            self.details_label.config(text=f"Error: {job.error}", foreground="red")
+        elif job.status == JOB_DONE:
+            self.details_label.config(
+                text=f"Extraction {job.extract_seconds:.1f}s, rendering {job.render_seconds:.1f}s",
+                foreground="green"
+            )
+        else:
+            self.details_label.config(text="")
+
+    def cancel_selected(self):
+        job = self._selected_job()
+        if job is not None:
+            self.job_queue.cancel(job.id)
+
+    def retry_selected(self):
+        job = self._selected_job()
+        if job is not None and job.status in (JOB_FAILED, JOB_CANCELLED):
+            self.job_queue.retry(job.id)
+
+    def remove_selected(self):
+        job = self._selected_job()
+        if job is not None and self.job_queue.remove(job.id):
+            self.tree.delete(str(job.id))
+            self.details_label.config(text="")
+
+    def save_selected(self):
+        job = self._selected_job()
+        if job is None or job.status != JOB_DONE:
+            messagebox.showerror("Error", "Select a finished job to save.")
+            return
+
+        po_number = job.gui_data.get('po_number')
+        filepath = filedialog.asksaveasfilename(
+            title="Save Purchase Order As",
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
+            initialfile=f"{po_number}.xlsx" if po_number else f"PO_job{job.id}.xlsx"
+        )
+        if filepath:
+            try:
+                job.result.save(filepath)
+                messagebox.showinfo("Success", f"Purchase Order saved successfully!\n\nLocation: {filepath}")
+            except Exception as e:
+                messagebox.showerror("Save Error", f"Could not save file: {str(e)}")
@@ -1,14 +1,27 @@
+import argparse
 import tkinter as tk
 from gui.app import POGUI
 
 def main():
+    from config.settings import SERVER_URL
+    parser = argparse.ArgumentParser(description="Purchase Order Generator")
+    parser.add_argument('--server', default=SERVER_URL,
+                        help="Extract through the PO server at this URL, e.g. http://po-server:8765")
+    args = parser.parse_args()
+
     # Create necessary directories
     from config.settings import TEMP_DIR, JSONS_DIR
     TEMP_DIR.mkdir(exist_ok=True)
     JSONS_DIR.mkdir(exist_ok=True)
+
+    # Remove POs left behind by earlier runs whose save was cancelled
+    from core.excel_generator import sweep_temp_files
+    removed = sweep_temp_files()
+    if removed:
+        print(f"Removed {removed} orphaned temporary file(s)")
     
     root = tk.Tk()
-    app = POGUI(root)
+    app = POGUI(root, server_url=args.server)
     root.mainloop()
 
 if __name__ == "__main__":
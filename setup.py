@@ -13,7 +13,12 @@ setup(
         "python-dotenv>=1.0.0",
         "num2words>=0.5.10",
         "tkcalendar>=1.6.1",
+        "pypdf>=5.0",
     ],
+    extras_require={
+        # Downsamples images in large scanned quotations before upload
+        "images": ["pillow>=9.1.0"],
+    },
     python_requires=">=3.8",
     entry_points={
         'console_scripts': [